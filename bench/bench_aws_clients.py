@@ -0,0 +1,110 @@
+"""
+Per-invocation latency and TLS handshakes: a client built per call (the old
+handlers) versus the shared aws_clients client, against a local HTTPS stand-in
+for DynamoDB. Every accepted connection on the stand-in is one handshake.
+
+    python bench/bench_aws_clients.py [invocations] [calls per invocation]
+"""
+import http.server
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+import boto3  # noqa: E402
+import aws_clients  # noqa: E402
+
+
+class StandIn:
+    """HTTPS server answering every DynamoDB call with an empty GetItem result."""
+
+    def __init__(self):
+        self.connections = 0
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as DynamoDB does
+            disable_nagle_algorithm = True
+            wbufsize = 64 * 1024  # headers and body in one segment
+
+            def setup(self):
+                super().setup()
+                stand_in.connections += 1
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = b"{}"
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-amz-json-1.0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._dir = tempfile.mkdtemp()
+        cert, key = os.path.join(self._dir, "cert.pem"), os.path.join(self._dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+                       check=True, capture_output=True)
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.url = f"https://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+def run(mode: str, endpoint: str, invocations: int, calls: int) -> list:
+    shared = boto3.session.Session().client("dynamodb", endpoint_url=endpoint, verify=False,
+                                            config=aws_clients._config("dynamodb"))
+    latencies = []
+    for _ in range(invocations):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            if mode == "per_call":
+                client = boto3.client("dynamodb", region_name=aws_clients.REGION, endpoint_url=endpoint, verify=False)
+            else:
+                client = shared
+            client.get_item(TableName="sg_courses", Key={"courseID": {"S": "c1"}})
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main(invocations: int = 50, calls: int = 3) -> dict:
+    import urllib3
+    urllib3.disable_warnings()
+    results = {}
+    for mode in ("per_call", "shared"):
+        with StandIn() as stand_in:
+            latencies = sorted(run(mode, stand_in.url, invocations, calls))
+            results[mode] = {
+                "handshakes_per_invocation": round(stand_in.connections / invocations, 2),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        args = [int(a) for a in sys.argv[1:3]]
+    except ValueError:
+        sys.exit(__doc__)
+    print(json.dumps(main(*args), indent=2))
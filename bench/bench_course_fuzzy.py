@@ -0,0 +1,94 @@
+"""
+Fuzzy course-name lookups over a synthetic catalogue: dictionary build time
+and size, then per-query latency for one-typo queries. "lookup" is the
+edit-distance-bounded dictionary lookup (course_fuzzy.lookup_token); "match"
+adds collecting and ranking the docs that hold the matched tokens. The
+substring scan searchGolfCourses did before is timed alongside; it finds
+nothing for a misspelled name.
+
+    python bench/bench_course_fuzzy.py [catalogue size] [queries]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import course_fuzzy  # noqa: E402
+
+_SYLLABLES = ["pine", "oak", "eagle", "ridge", "hurst", "brook", "meadow", "stone", "wood", "lake",
+              "crest", "hollow", "willow", "haven", "field", "cedar", "bay", "glen", "falls", "spring",
+              "ash", "bridge", "by", "chester", "dale", "elm", "ford", "gate", "ham", "hill",
+              "kirk", "land", "mont", "moor", "ness", "port", "shire", "ton", "vale", "wick"]
+_SUFFIXES = ["Golf Club", "Country Club", "Golf Links", "National", "Golf Course", "Resort"]
+
+
+def catalogue(size: int, rng: random.Random) -> list:
+    docs = []
+    for i in range(size):
+        words = ["".join(rng.sample(_SYLLABLES, rng.randint(2, 3))).capitalize() for _ in range(rng.randint(1, 2))]
+        docs.append({"courseID": f"c{i}", "club_name": " ".join(words + [rng.choice(_SUFFIXES)])})
+    return docs
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return rng.choice([word[:i] + word[i + 1:],                          # deletion
+                       word[:i] + word[i + 1] + word[i] + word[i + 2:],  # transposition
+                       word[:i] + rng.choice("aeiou") + word[i + 1:]])   # substitution
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3)
+
+
+def main(size: int = 100000, queries: int = 500) -> dict:
+    rng = random.Random(7)
+    docs = catalogue(size, rng)
+
+    t0 = time.perf_counter()
+    state = course_fuzzy.build(docs)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    lookup_ms, fuzzy_ms, scan_ms, found = [], [], [], 0
+    for doc in rng.sample(docs, queries):
+        word = doc["club_name"].split()[0]
+        query = typo(word, rng)
+        t0 = time.perf_counter()
+        course_fuzzy.lookup_token(query.lower(), course_fuzzy.allowed_distance(query), state)
+        lookup_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        matches = course_fuzzy.match(query, limit=25, state=state)
+        fuzzy_ms.append((time.perf_counter() - t0) * 1000)
+        found += any(d is doc for d, _ in matches) or len(matches) == 25
+
+        q = query.lower()
+        t0 = time.perf_counter()
+        [d for d in docs if q in d["club_name"].lower()]
+        scan_ms.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "catalogue": size,
+        "build_ms": round(build_ms),
+        "tokens": len(state["token_docs"]),
+        "deletes": len(state["deletes"]),
+        "tail_deletes": len(state["tail_deletes"]),
+        "lookup": {"p50_ms": percentile(lookup_ms, 0.5), "p99_ms": percentile(lookup_ms, 0.99)},
+        "match": {"p50_ms": percentile(fuzzy_ms, 0.5), "p99_ms": percentile(fuzzy_ms, 0.99),
+                  "mean_ms": round(statistics.mean(fuzzy_ms), 3),
+                  "recall": round(found / queries, 3)},
+        "substring_scan": {"p50_ms": percentile(scan_ms, 0.5), "p99_ms": percentile(scan_ms, 0.99)},
+    }
+
+
+if __name__ == "__main__":
+    try:
+        args = [int(a) for a in sys.argv[1:3]]
+    except ValueError:
+        sys.exit(__doc__)
+    print(json.dumps(main(*args), indent=2))
@@ -0,0 +1,103 @@
+"""
+Cold-cache course-name resolution as the catalogue grows: the keyed Query per
+courseID (course_names.resolve_course_names) versus the full sg_courses scan
+the handlers used before.
+
+The stand-in table keeps DynamoDB's cost model rather than its API surface:
+a Query reads only its partition, a Scan reads every item in pages of about
+1 MB, and each request costs one round trip. (moto is no use here: its Query
+walks the whole table in memory, so it grows with the catalogue.)
+
+    python bench/bench_course_names.py [catalogue sizes, comma-separated] [ids per call] [round trip ms]
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import aws_clients  # noqa: E402
+import course_names  # noqa: E402
+import dynamo_scan  # noqa: E402
+
+REPEATS = 5
+ITEMS_PER_SCAN_PAGE = 4000   # ~250-byte course items per 1 MB page
+
+
+class CoursesStandIn:
+    def __init__(self, size: int, round_trip_ms: float):
+        self.partitions = {f"c{i}": [{"courseID": f"c{i}", "courseName": f"Course {i}"}] for i in range(size)}
+        self.order = list(self.partitions)
+        self.position = {cid: i for i, cid in enumerate(self.order)}
+        self.round_trip = round_trip_ms / 1000
+        self.requests = 0
+        self.items_read = 0
+        self._lock = threading.Lock()
+
+    def _charge(self, items: int):
+        with self._lock:
+            self.requests += 1
+            self.items_read += items
+        time.sleep(self.round_trip)
+
+    def query(self, KeyConditionExpression, Limit=None, **kwargs):
+        items = self.partitions.get(KeyConditionExpression.get_expression()["values"][1], [])[:Limit]
+        self._charge(len(items))
+        return {"Items": items}
+
+    def scan(self, ExclusiveStartKey=None, **kwargs):
+        start = self.position[ExclusiveStartKey["courseID"]] + 1 if ExclusiveStartKey else 0
+        page = [self.partitions[cid][0] for cid in self.order[start:start + ITEMS_PER_SCAN_PAGE]]
+        self._charge(len(page))
+        resp = {"Items": page}
+        if start + ITEMS_PER_SCAN_PAGE < len(self.order):
+            resp["LastEvaluatedKey"] = {"courseID": page[-1]["courseID"]}
+        return resp
+
+
+def scan_lookup(course_ids) -> dict:
+    wanted = set(course_ids)
+    return {item["courseID"]: item["courseName"]
+            for item in dynamo_scan.scan_items(aws_clients.table(course_names.COURSES_TABLE_NAME))
+            if item["courseID"] in wanted}
+
+
+def timed(table, lookup, course_ids) -> dict:
+    samples = []
+    table.requests = table.items_read = 0
+    for _ in range(REPEATS):
+        course_names._CACHE.clear()
+        t0 = time.perf_counter()
+        found = lookup(course_ids)
+        samples.append((time.perf_counter() - t0) * 1000)
+        assert len(found) == len(course_ids), found
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "requests": table.requests // REPEATS,
+        "items_read": table.items_read // REPEATS,
+    }
+
+
+def main(sizes=(100, 1000, 10000, 100000), ids: int = 10, round_trip_ms: float = 5.0) -> dict:
+    results = {}
+    for size in sizes:
+        table = CoursesStandIn(size, round_trip_ms)
+        aws_clients._tables[course_names.COURSES_TABLE_NAME] = table
+        course_ids = [f"c{i * size // ids}" for i in range(ids)]
+        results[size] = {
+            "keyed_query": timed(table, course_names.resolve_course_names, course_ids),
+            "full_scan": timed(table, scan_lookup, course_ids),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        args = [[int(s) for s in sys.argv[1].split(",")]] if len(sys.argv) > 1 else []
+        args += [int(a) for a in sys.argv[2:3]] + [float(a) for a in sys.argv[3:4]]
+    except ValueError:
+        sys.exit(__doc__)
+    print(json.dumps(main(*args), indent=2))
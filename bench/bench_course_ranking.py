@@ -0,0 +1,57 @@
+"""
+merge_dedup_rank before and after course_ranking: dedup plus top-`cap` ranking
+of local and external search results, per call, at several candidate counts.
+The old implementation is the reference copy kept in tests/test_course_ranking.py.
+
+    python bench/bench_course_ranking.py [candidates, comma-separated] [cap]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [os.path.join(_ROOT, "src"), os.path.join(_ROOT, "tests")]
+
+from test_course_ranking import legacy_merge_dedup_rank, new_merge_dedup_rank, random_results  # noqa: E402
+
+
+REPEATS = 15
+
+
+def per_call_us(fns: dict, *args) -> dict:
+    """Best per-call time of each function, alternating between them so load spikes hit both."""
+    number = max(1, 20000 // sum(len(a) for a in args[:2]))
+    best = {}
+    for _ in range(REPEATS):
+        for name, fn in fns.items():
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn(*args)
+            best[name] = min(best.get(name, float("inf")), (time.perf_counter() - t0) / number * 1e6)
+    return {name: round(us, 1) for name, us in best.items()}
+
+
+def main(sizes=(50, 500, 5000), cap: int = 20) -> dict:
+    rng = random.Random(3)
+    results = {}
+    for size in sizes:
+        local = random_results(rng, size // 2, "local")
+        external = random_results(rng, size - size // 2, "external")
+        for r in local + external:
+            r["club_name"] += f" {rng.randrange(size)}"  # mostly distinct keys, as in real results
+        assert new_merge_dedup_rank(local, external, "pine", cap) == legacy_merge_dedup_rank(local, external, "pine", cap)
+        timings = per_call_us({"legacy_us": legacy_merge_dedup_rank, "course_ranking_us": new_merge_dedup_rank},
+                              local, external, "pine", cap)
+        results[size] = dict(timings, speedup=round(timings["legacy_us"] / timings["course_ranking_us"], 2))
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        args = [[int(s) for s in sys.argv[1].split(",")]] if len(sys.argv) > 1 else []
+        args += [int(a) for a in sys.argv[2:3]]
+    except ValueError:
+        sys.exit(__doc__)
+    print(json.dumps(main(*args), indent=2))
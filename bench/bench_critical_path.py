@@ -0,0 +1,100 @@
+"""
+Critical path of one cold scan through the real extract_scores: its I/O
+stages (secret, original download, cache lookups, preprocessing, model call)
+are replaced by sleeps of the given latencies, everything else runs as in
+production, and the scan's wall time is compared with the same stages back to
+back. Stage timings are the ones extract_scores logs in its "scan" metric.
+Defaults approximate a cold container: Secrets Manager and the S3 GET a few
+hundred ms each, a ~2.5 s model call.
+
+    python bench/bench_critical_path.py [card|player] [stage=ms ...]
+
+e.g. python bench/bench_critical_path.py player secret=600 model=1800
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+os.environ.setdefault("SG_TRACING", "0")
+
+import extractScores  # noqa: E402
+
+LATENCIES_MS = {"secret": 250, "download": 180, "lookup": 8, "preprocess": 220, "model": 2500}
+HOLES = {str(h): 4 for h in range(1, 19)}
+ANSWERS = {
+    "card_scores": json.dumps({"players": [{"name": "Mike", "scores": HOLES, "out": 36, "in": 36}]}),
+    "player_scores": extractScores.render_row({"scores": HOLES}),
+}
+
+
+class ScanMetrics(logging.Handler):
+    """Keeps the stage timings of the "scan" metric lines extract_scores logs."""
+
+    def __init__(self):
+        super().__init__()
+        self.stages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith('{"metric": "scan"'):
+            self.stages.append(json.loads(message)["stages"])
+
+
+def inject(latencies_ms: dict) -> list:
+    """Swap extract_scores' I/O for sleeps; returns the stages each call ran, in order."""
+    ran = []
+
+    def sleep(stage, result=None):
+        def fn(*args, **kwargs):
+            ran.append(stage)
+            time.sleep(latencies_ms[stage] / 1000)
+            return result if not callable(result) else result(*args, **kwargs)
+        return fn
+
+    extractScores._openai_key = sleep("secret", "key")
+    extractScores.load_original_bytes = sleep("download", lambda url: url.encode())
+    extractScores.api_cache.lookup = sleep("lookup")
+    extractScores.api_cache.store = lambda namespace, key, value: None
+    extractScores.preprocess_image = sleep("preprocess", ("https://stub/card.jpg", None))
+    extractScores.call_model = sleep("model", lambda prompt, url, validate=None, **kw: ANSWERS[prompt])
+    extractScores.LOCAL_BACKENDS = []
+    return ran
+
+
+def main(mode: str = "card", latencies_ms: dict = None) -> dict:
+    latencies_ms = dict(LATENCIES_MS, **(latencies_ms or {}))
+    extractScores.EXTRACTION_MODE = mode
+    ran = inject(latencies_ms)
+    metrics = ScanMetrics()
+    extractScores.logger.addHandler(metrics)
+    # A fresh URL per run, so the content hash (and every cache key) is new
+    t0 = time.perf_counter()
+    extractScores.extract_scores(f"s3://bench/card-{time.time_ns()}.jpg", "Mike")
+    wall_ms = (time.perf_counter() - t0) * 1000
+    extractScores.logger.removeHandler(metrics)
+    return {
+        "mode": mode,
+        "latencies_ms": latencies_ms,
+        "sequential_ms": round(sum(latencies_ms[stage] for stage in ran), 1),
+        "graph_ms": round(wall_ms, 1),
+        "stages": metrics.stages[-1],
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    mode = args.pop(0) if args[:1] in (["card"], ["player"]) else "card"
+    overrides = {}
+    for arg in args:
+        stage, _, ms = arg.partition("=")
+        if stage not in LATENCIES_MS:
+            sys.exit(__doc__)
+        try:
+            overrides[stage] = float(ms)
+        except ValueError:
+            sys.exit(__doc__)
+    print(json.dumps(main(mode, overrides), indent=2))
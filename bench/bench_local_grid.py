@@ -0,0 +1,78 @@
+"""
+Accuracy and latency of the local grid backend over a labeled corpus:
+corpus_dir/labels.json maps image file name -> {"firstName", "scores":
+{"1".."18": int}} (scorecard_local.load_labels). Reports how many cards the
+local path would accept at the confidence threshold, hole accuracy on those
+(the error rate the fast path ships) and over all cards it read, and per-card
+ms. --train fits the digit model on the corpus first and benchmarks with it.
+
+    python bench/bench_local_grid.py <corpus dir> [threshold]
+    python bench/bench_local_grid.py --train <corpus dir> [model.npz]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PIL import Image  # noqa: E402
+
+import scorecard_local  # noqa: E402
+
+
+def benchmark(corpus_dir: str, threshold: float = None, backend: scorecard_local.LocalGridBackend = None) -> dict:
+    threshold = scorecard_local.CONFIDENCE_THRESHOLD if threshold is None else threshold
+    backend = backend or scorecard_local.LocalGridBackend()
+    labels = scorecard_local.load_labels(corpus_dir)
+
+    timings, accepted, detected = [], 0, 0
+    holes_right = {"accepted": 0, "detected": 0}
+    holes_seen = {"accepted": 0, "detected": 0}
+    for file_name, label in sorted(labels.items()):
+        image = Image.open(os.path.join(corpus_dir, file_name))
+        t0 = time.perf_counter()
+        result = backend.extract(image, label.get("firstName"))
+        timings.append((time.perf_counter() - t0) * 1000)
+        if result is None:
+            continue
+        detected += 1
+        right = sum(result["scores"][h] == int(v) for h, v in label["scores"].items())
+        buckets = ["detected"]
+        if min(result["confidence"].values()) >= threshold:
+            accepted += 1
+            buckets.append("accepted")
+        for b in buckets:
+            holes_right[b] += right
+            holes_seen[b] += len(label["scores"])
+
+    timings.sort()
+    n = len(labels)
+    return {
+        "cards": n,
+        "model": backend.version,
+        "detected": detected,
+        "accepted": accepted,
+        "escalation_rate": round(1 - accepted / n, 3) if n else None,
+        "hole_accuracy_accepted": round(holes_right["accepted"] / holes_seen["accepted"], 4) if holes_seen["accepted"] else None,
+        "hole_accuracy_detected": round(holes_right["detected"] / holes_seen["detected"], 4) if holes_seen["detected"] else None,
+        "ms_p50": round(timings[len(timings) // 2], 1) if timings else None,
+        "ms_p95": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 1) if timings else None,
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--train"]:
+        if len(args) not in (2, 3):
+            sys.exit(__doc__)
+        classifier = scorecard_local.train(args[1], args[2] if len(args) > 2 else None)
+        print(json.dumps(benchmark(args[1], backend=scorecard_local.LocalGridBackend(classifier)), indent=2))
+        sys.exit()
+    if len(args) not in (1, 2) or not os.path.isdir(args[0]):
+        sys.exit(__doc__)
+    try:
+        threshold = float(args[1]) if len(args) > 1 else None
+    except ValueError:
+        sys.exit(__doc__)
+    print(json.dumps(benchmark(args[0], threshold), indent=2))
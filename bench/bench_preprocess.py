@@ -0,0 +1,159 @@
+"""
+Scorecard preprocessing paths over a corpus of photos: per-stage time,
+encoded (upload) size and peak memory. "png" is the original full-resolution
+lossless path; the others downsize to TARGET_LONG_EDGE first and encode
+JPEG or WebP. "_numpy" paths swap the ImageEnhance chain for the fused
+enhance_image_numpy pass. Each photo and path runs in its own process so the max RSS
+growth over the process's pre-decode baseline is that path's peak alone.
+
+Without a corpus directory, phone-sized synthetic cards (12 MP JPEG with a
+printed grid, handwritten-looking digits, uneven lighting and sensor noise)
+are generated into a temporary directory.
+
+    python bench/bench_preprocess.py [corpus dir | number of synthetic cards]
+"""
+import glob
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+os.environ.setdefault("SG_TRACING", "0")
+
+# name -> (PREPROCESS_MODE, PREPROCESS_FORMAT, PREPROCESS_PIPELINE)
+CONFIGS = {
+    "png": ("png", "PNG", "pillow"),
+    "resized_jpeg": ("resized", "JPEG", "pillow"),
+    "resized_webp": ("resized", "WEBP", "pillow"),
+    "png_numpy": ("png", "PNG", "numpy"),
+    "resized_jpeg_numpy": ("resized", "JPEG", "numpy"),
+}
+
+
+def synthetic_card(path: str, seed: int, size=(4032, 3024)):
+    """A portrait phone photo of a scorecard, saved the way a phone camera would (JPEG q92)."""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    rng = random.Random(seed)
+    w, h = size[1], size[0]   # portrait
+    card = Image.new("L", (w, h), 235)
+    draw = ImageDraw.Draw(card)
+    rows, cols = 8, 22
+    x0, y0, cw, rh = w // 12, h // 6, (w - w // 6) // cols, (h // 2) // rows
+    font = ImageFont.load_default(size=int(rh * 0.55))
+    for r in range(rows + 1):
+        draw.line([(x0, y0 + r * rh), (x0 + cols * cw, y0 + r * rh)], fill=60, width=4)
+    for c in range(cols + 1):
+        draw.line([(x0 + c * cw, y0), (x0 + c * cw, y0 + rows * rh)], fill=60, width=4)
+    for r in range(rows):
+        for c in range(1, cols):
+            if rng.random() < 0.85:
+                draw.text((x0 + c * cw + cw // 4 + rng.randint(-6, 6), y0 + r * rh + rh // 5 + rng.randint(-6, 6)),
+                          str(rng.randint(2, 9)), fill=rng.randint(10, 70), font=font)
+    card = card.rotate(rng.uniform(-3, 3), resample=Image.BICUBIC, fillcolor=200).filter(ImageFilter.GaussianBlur(1.2))
+
+    a = np.asarray(card, dtype=np.float32)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    a *= 0.75 + 0.25 * (xx / w) * (1 - yy / h)          # lighting falloff
+    a += np.random.default_rng(seed).normal(0, 6, a.shape)  # sensor noise
+    rgb = np.clip(a, 0, 255).astype(np.uint8)[..., None] * np.array([1.0, 0.97, 0.9])
+    Image.fromarray(rgb.astype(np.uint8), "RGB").save(path, "JPEG", quality=92)
+
+
+def peak_rss_kb() -> int:
+    """High-water RSS of this process image. ru_maxrss would carry over the parent's peak across exec."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_one(config: str, path: str) -> dict:
+    """Decode, enhance and encode one photo with one config, in this process."""
+    mode, fmt, pipeline = CONFIGS[config]
+    os.environ.update(PREPROCESS_MODE=mode, PREPROCESS_FORMAT=fmt, PREPROCESS_PIPELINE=pipeline)
+    import extractScores
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    baseline_kb = peak_rss_kb()
+
+    ms = {}
+    t0 = time.perf_counter()
+    image = extractScores.decode_image(raw)
+    ms["decode"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if pipeline == "numpy":
+        image = extractScores.enhance_image_numpy(image)
+    else:
+        image = extractScores.enhance_image(image)
+    ms["enhance"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    buf, _ = extractScores.encode_image(image)
+    ms["encode"] = (time.perf_counter() - t0) * 1000
+
+    return {
+        "ms": ms,
+        "bytes": buf.getbuffer().nbytes,
+        "size": list(image.size),
+        "peak_rss_growth_mb": (peak_rss_kb() - baseline_kb) / 1024,
+    }
+
+
+def main(corpus: str = None, cards: int = 3) -> dict:
+    workdir = None
+    if corpus:
+        paths = sorted(p for ext in ("jpg", "jpeg", "png", "heic", "webp")
+                       for p in glob.glob(os.path.join(corpus, f"*.{ext}")))
+    else:
+        workdir = tempfile.mkdtemp()
+        paths = [os.path.join(workdir, f"card{i}.jpg") for i in range(cards)]
+        for i, path in enumerate(paths):
+            synthetic_card(path, seed=i)
+
+    results = {"photos": len(paths),
+               "original_mb": round(statistics.median(os.path.getsize(p) for p in paths) / 2 ** 20, 2)}
+    for config in CONFIGS:
+        runs = [json.loads(subprocess.run([sys.executable, __file__, "--run", config, path],
+                                          check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+                for path in paths]
+        results[config] = {
+            "output": "x".join(map(str, runs[0]["size"])),
+            **{f"{stage}_ms": round(statistics.median(r["ms"][stage] for r in runs), 1)
+               for stage in ("decode", "enhance", "encode")},
+            "total_ms": round(statistics.median(sum(r["ms"].values()) for r in runs), 1),
+            "upload_kb": round(statistics.median(r["bytes"] for r in runs) / 1024),
+            "peak_rss_growth_mb": round(statistics.median(r["peak_rss_growth_mb"] for r in runs), 1),
+        }
+    if workdir:
+        for path in paths:
+            os.remove(path)
+        os.rmdir(workdir)
+    return results
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        print(json.dumps(run_one(*sys.argv[2:4])))
+        sys.exit()
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    if arg is None:
+        kwargs = {}
+    elif arg.isdigit():
+        kwargs = {"cards": int(arg)}
+    elif os.path.isdir(arg):
+        kwargs = {"corpus": arg}
+    else:
+        sys.exit(__doc__)
+    print(json.dumps(main(**kwargs), indent=2))
@@ -0,0 +1,102 @@
+"""
+Prompt layout sanity check for player_scores calls (every player of every
+card): "tail_after_image" is prompts.vision_messages, "text_then_image" is the
+same rendered prompt with its tail (the player's name) before the image, so
+calls for one card can share only the text prefix, not the image.
+Cached tokens are counted the way production counts them, through
+prompts.record_usage and prompts.get_stats.
+
+By default the calls go to the stub model server, which imitates the
+provider's prefix cache (1024-token minimum, 128-token steps). That only shows
+the layout gives a prefix cache something to reuse, not that the provider
+caches it. With --live the same calls go to the OpenAI API (OPENAI_API_KEY,
+billed), and cached_ratio is the provider's own count.
+
+    python bench/bench_prompt_layout.py [cards] [players per card]
+    python bench/bench_prompt_layout.py --live <model> [cards] [players per card]
+"""
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [os.path.join(_ROOT, "src"), os.path.join(_ROOT, "tests")]
+
+from PIL import Image  # noqa: E402
+
+import prompts  # noqa: E402
+from stub_model_server import StubModelServer  # noqa: E402
+
+PROMPT = "player_scores"
+
+
+def card_url(seed: int) -> str:
+    """A distinct small JPEG per card as a data URL (the live API rejects bytes that aren't an image)."""
+    rng = random.Random(seed)
+    image = Image.new("L", (256, 192), 230)
+    image.putdata([rng.randrange(180, 256) for _ in range(256 * 192)])
+    buf = BytesIO()
+    image.save(buf, "JPEG", quality=80)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def run_layout(client, model: str, build, cards: int, players: int) -> dict:
+    prompts.STATS.clear()
+    latencies = []
+    for card in range(cards):
+        url = card_url(random.getrandbits(32))
+        for player in range(players):
+            t0 = time.perf_counter()
+            response = client.chat.completions.create(model=model, messages=build(url, f"Player{card}{player}"),
+                                                      max_tokens=1)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            prompts.record_usage(PROMPT, response.usage)
+    stats = prompts.get_stats()[f"{PROMPT}@{prompts.version(PROMPT)}"]
+    return {
+        "calls": stats["calls"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "cached_tokens": stats["cached_tokens"],
+        "cached_ratio": stats["cached_ratio"],
+        "median_ms": round(statistics.median(latencies), 1),
+    }
+
+
+def main(cards: int = 5, players: int = 4, live_model: str = None, ms_per_1k_uncached: float = 40.0) -> dict:
+    template = prompts.get(PROMPT)
+    layouts = {
+        "text_then_image": lambda url, name: [{"role": "user", "content": [
+            {"type": "text", "text": template.render(first_name=name)},
+            {"type": "image_url", "image_url": {"url": url}},
+        ]}],
+        "tail_after_image": lambda url, name: prompts.vision_messages(PROMPT, url, first_name=name),
+    }
+    results = {"source": f"openai:{live_model}" if live_model else "stub (simulated prefix cache)"}
+    for layout, build in layouts.items():
+        if live_model:
+            import openai
+            results[layout] = run_layout(openai.OpenAI(max_retries=0), live_model, build, cards, players)
+        else:
+            with StubModelServer(default_reply="{}", prefix_cache=True, ms_per_1k_uncached=ms_per_1k_uncached) as server:
+                results[layout] = run_layout(server.client(), "stub", build, cards, players)
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    live_model = None
+    if args[:1] == ["--live"]:
+        if len(args) < 2:
+            sys.exit(__doc__)
+        live_model, args = args[1], args[2:]
+    try:
+        counts = [int(a) for a in args]
+    except ValueError:
+        sys.exit(__doc__)
+    if len(counts) > 2 or any(n < 1 for n in counts):
+        sys.exit(__doc__)
+    print(json.dumps(main(*counts, live_model=live_model), indent=2))
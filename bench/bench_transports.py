@@ -0,0 +1,80 @@
+"""
+How the preprocessed image reaches the model, per transport: median per-stage
+ms against a local stub of the model endpoint, so the numbers cover
+preprocessing, S3 and the image hand-off but not inference. Every run uses a
+fresh artifact key (no reuse) so each transport is measured on the cold path.
+"inline-fallback" is inline transport with INLINE_MAX_BYTES at 0: what an
+image over the threshold costs (encode, then upload and presign anyway).
+
+    python bench/bench_transports.py <s3-or-https-image-url> [runs]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path[:0] = [os.path.join(_ROOT, "src"), os.path.join(_ROOT, "tests")]
+
+import extractScores  # noqa: E402
+from stub_model_server import StubModelServer  # noqa: E402
+
+
+def run_transport(client, image_url: str, raw: bytes, image_hash: str, transport: str, runs: int) -> dict:
+    rows, used = [], set()
+    for _ in range(runs):
+        stats = {}
+        t0 = time.perf_counter()
+        model_url, _ = extractScores.preprocess_image(
+            image_url, "bench", stats=stats, raw=raw,
+            image_hash=f"{image_hash}-bench-{uuid.uuid4().hex[:8]}", transport=transport)
+        t1 = time.perf_counter()
+        client.chat.completions.create(model="stub", messages=[{
+            "role": "user",
+            "content": [{"type": "image_url", "image_url": {"url": model_url}}],
+        }])
+        t2 = time.perf_counter()
+        stats["ms"]["model"] = round((t2 - t1) * 1000, 1)
+        stats["ms"]["total"] = round((t2 - t0) * 1000, 1)
+        rows.append(stats["ms"])
+        used.add(stats["transport"])
+    stages = {stage for row in rows for stage in row}
+    return {
+        "used": sorted(used),
+        "encoded_bytes": stats["bytes"]["encode"],
+        "ms": {stage: round(statistics.median(row.get(stage, 0) for row in rows), 1) for stage in stages},
+    }
+
+
+def compare_transports(image_url: str, runs: int = 3, transports=("url", "inline", "inline-fallback")) -> dict:
+    t0 = time.perf_counter()
+    raw = extractScores.load_original_bytes(image_url)
+    results = {"load_original_ms": round((time.perf_counter() - t0) * 1000, 1),
+               "inline_max_bytes": extractScores.INLINE_MAX_BYTES}
+    image_hash = extractScores.content_hash(raw)
+    inline_max_bytes = extractScores.INLINE_MAX_BYTES
+    with StubModelServer() as server:
+        client = server.client()
+        for case in transports:
+            if case != "inline-fallback":
+                results[case] = run_transport(client, image_url, raw, image_hash, case, runs)
+                continue
+            extractScores.INLINE_MAX_BYTES = 0
+            try:
+                results[case] = run_transport(client, image_url, raw, image_hash, "inline", runs)
+            finally:
+                extractScores.INLINE_MAX_BYTES = inline_max_bytes
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        image_url = sys.argv[1]
+        runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    except (IndexError, ValueError):
+        sys.exit(__doc__)
+    if runs < 1 or len(sys.argv) > 3:
+        sys.exit(__doc__)
+    print(json.dumps(compare_transports(image_url, runs), indent=2))
@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from botocore.exceptions import BotoCoreError, ClientError
+import aws_clients
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Two tiers for golfcourseapi responses (and scorecard extraction results): an
+# in-process LRU per warm container, then a DynamoDB table shared by every
+# container (TTL attribute "expiresAt").
+CACHE_TABLE_NAME = os.environ.get("SG_API_CACHE_TABLE", "sg_api_cache")
+_MAX_ENTRIES = 1024
+
+# namespace -> seconds: fresh TTL, TTL for negative results, stale-while-revalidate window
+POLICIES = {
+    "search": {"ttl": 6 * 3600, "negative_ttl": 600, "stale": 24 * 3600},
+    "course": {"ttl": 7 * 24 * 3600, "negative_ttl": 3600, "stale": 7 * 24 * 3600},
+    # Model output for (image hash, player, prompt version); never served stale
+    "scan": {"ttl": 7 * 24 * 3600, "negative_ttl": 0, "stale": 0},
+}
+
+_LRU = OrderedDict()   # "namespace|key" -> (value, stored_at, negative)
+_LOCK = threading.Lock()
+_REVALIDATING = set()
+
+STATS = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(namespace: str, what: str):
+    with _STATS_LOCK:
+        ns = STATS.setdefault(namespace, {"memory_hits": 0, "table_hits": 0, "misses": 0,
+                                          "negative_hits": 0, "stale_served": 0, "errors": 0})
+        ns[what] += 1
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def _lru_get(cache_key: str):
+    with _LOCK:
+        entry = _LRU.get(cache_key)
+        if entry is not None:
+            _LRU.move_to_end(cache_key)
+        return entry
+
+
+def _lru_put(cache_key: str, entry):
+    with _LOCK:
+        _LRU[cache_key] = entry
+        _LRU.move_to_end(cache_key)
+        while len(_LRU) > _MAX_ENTRIES:
+            _LRU.popitem(last=False)
+
+
+def _table_get(cache_key: str):
+    try:
+        item = aws_clients.table(CACHE_TABLE_NAME).get_item(Key={"cacheKey": cache_key}).get("Item")
+    except (ClientError, BotoCoreError) as e:
+        # Throttling, timeouts, an unreachable endpoint: all just a miss
+        logger.warning(f"API cache read failed for {cache_key}: {e}")
+        return None
+    if not item:
+        return None
+    return item.get("value"), float(item["storedAt"]), bool(item.get("negative"))
+
+
+def _table_put(cache_key: str, entry, policy):
+    value, stored_at, negative = entry
+    ttl = policy["negative_ttl"] if negative else policy["ttl"]
+    item = {
+        "cacheKey": cache_key,
+        "storedAt": int(stored_at),
+        "negative": negative,
+        # DynamoDB TTL deletes the row once even a stale read is no longer allowed
+        "expiresAt": int(stored_at + ttl + policy["stale"]),
+    }
+    if value is not None:
+        item["value"] = value
+    try:
+        aws_clients.table(CACHE_TABLE_NAME).put_item(Item=item)
+    except (ClientError, BotoCoreError) as e:
+        # e.g. a course JSON over the 400 KB item limit; the LRU still has it
+        logger.warning(f"API cache write failed for {cache_key}: {e}")
+
+
+def _age_state(entry, policy, now):
+    """'fresh', 'stale' or 'expired' for a cached entry."""
+    _, stored_at, negative = entry
+    ttl = policy["negative_ttl"] if negative else policy["ttl"]
+    age = now - stored_at
+    if age < ttl:
+        return "fresh"
+    if not negative and age < ttl + policy["stale"]:
+        return "stale"
+    return "expired"
+
+
+def _store(namespace, cache_key, value, policy):
+    entry = (value, time.time(), value is None)
+    _lru_put(cache_key, entry)
+    _table_put(cache_key, entry, policy)
+    return entry
+
+
+def _revalidate(namespace, cache_key, fetch, policy):
+    with _LOCK:
+        if cache_key in _REVALIDATING:
+            return
+        _REVALIDATING.add(cache_key)
+
+    def run():
+        try:
+            _store(namespace, cache_key, fetch(), policy)
+        except Exception as e:
+            _count(namespace, "errors")
+            logger.warning(f"Revalidation of {cache_key} failed: {e}")
+        finally:
+            with _LOCK:
+                _REVALIDATING.discard(cache_key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_or_fetch(namespace: str, key: str, fetch):
+    """
+    Return the cached value for (namespace, key), calling fetch() on a miss.
+    fetch() returns a JSON string, or None for a negative result (not found /
+    no matches) which is cached under the shorter negative TTL. Stale entries
+    are served while a background fetch refreshes them.
+    """
+    policy = POLICIES[namespace]
+    cache_key = f"{namespace}|{key}"
+    now = time.time()
+
+    stale_entry = None
+    for tier, getter in (("memory_hits", _lru_get), ("table_hits", _table_get)):
+        entry = getter(cache_key)
+        if entry is None:
+            continue
+        state = _age_state(entry, policy, now)
+        if state == "fresh":
+            _count(namespace, tier)
+            if entry[2]:
+                _count(namespace, "negative_hits")
+            if tier == "table_hits":
+                _lru_put(cache_key, entry)
+            return entry[0]
+        if state == "stale" and stale_entry is None:
+            stale_entry = entry
+
+    if stale_entry is not None:
+        _count(namespace, "stale_served")
+        _lru_put(cache_key, stale_entry)
+        _revalidate(namespace, cache_key, fetch, policy)
+        return stale_entry[0]
+
+    _count(namespace, "misses")
+    return _store(namespace, cache_key, fetch(), policy)[0]
+
+
+def lookup(namespace: str, key: str):
+    """Fresh cached value for (namespace, key) or None; for callers that store results themselves."""
+    policy = POLICIES[namespace]
+    cache_key = f"{namespace}|{key}"
+    now = time.time()
+    for tier, getter in (("memory_hits", _lru_get), ("table_hits", _table_get)):
+        entry = getter(cache_key)
+        if entry is not None and entry[0] is not None and _age_state(entry, policy, now) == "fresh":
+            _count(namespace, tier)
+            if tier == "table_hits":
+                _lru_put(cache_key, entry)
+            return entry[0]
+    _count(namespace, "misses")
+    return None
+
+
+def store(namespace: str, key: str, value: str):
+    """Cache a successful result computed outside get_or_fetch (see lookup)."""
+    _store(namespace, f"{namespace}|{key}", value, POLICIES[namespace])
+
+
+def get_stats() -> dict:
+    """Per-namespace counters plus hit rate (memory + table hits over lookups)."""
+    with _STATS_LOCK:
+        counts = {ns: dict(c) for ns, c in STATS.items()}
+    out = {}
+    for ns, c in counts.items():
+        lookups = c["memory_hits"] + c["table_hits"] + c["stale_served"] + c["misses"]
+        hits = lookups - c["misses"]
+        out[ns] = dict(c, hit_rate=round(hits / lookups, 3) if lookups else None)
+    return out
@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Lambda sets AWS_REGION; the fallback is the region everything is deployed in
+REGION = os.environ.get("AWS_REGION", "us-east-2")
+
+# One client per service per warm container. botocore clients are thread-safe,
+# so the pools below are shared by any worker threads a handler starts.
+_BASE_CONFIG = dict(
+    region_name=REGION,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 4},
+)
+
+# Per-service pool size and timeouts (seconds)
+_SERVICE_CONFIG = {
+    "s3":             dict(max_pool_connections=16, connect_timeout=2, read_timeout=20),
+    "dynamodb":       dict(max_pool_connections=32, connect_timeout=1, read_timeout=5),
+    "secretsmanager": dict(max_pool_connections=4,  connect_timeout=1, read_timeout=3),
+    "sqs":            dict(max_pool_connections=8,  connect_timeout=1, read_timeout=5),
+}
+
+_clients = {}
+_resources = {}
+_tables = {}
+_lock = threading.Lock()
+
+
+def _config(service: str) -> Config:
+    return Config(**_BASE_CONFIG, **_SERVICE_CONFIG.get(service, {}))
+
+
+def client(service: str):
+    """Return the container-wide low-level client for service, creating it on first use."""
+    c = _clients.get(service)
+    if c is None:
+        with _lock:
+            c = _clients.get(service)
+            if c is None:
+                logger.info(f"Creating shared {service} client")
+                c = _clients[service] = boto3.session.Session().client(service, config=_config(service))
+    return c
+
+
+def resource(service: str):
+    """Return the container-wide boto3 resource for service (only dynamodb is used)."""
+    r = _resources.get(service)
+    if r is None:
+        with _lock:
+            r = _resources.get(service)
+            if r is None:
+                logger.info(f"Creating shared {service} resource")
+                r = _resources[service] = boto3.session.Session().resource(service, config=_config(service))
+    return r
+
+
+def s3():
+    return client("s3")
+
+
+def secretsmanager():
+    return client("secretsmanager")
+
+
+def sqs():
+    return client("sqs")
+
+
+def dynamodb():
+    return resource("dynamodb")
+
+
+def table(name: str):
+    """Cached dynamodb.Table handle so handlers don't rebuild it per request."""
+    t = _tables.get(name)
+    if t is None:
+        db = dynamodb()
+        with _lock:
+            t = _tables.get(name)
+            if t is None:
+                t = _tables[name] = db.Table(name)
+    return t
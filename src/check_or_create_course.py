@@ -1,12 +1,19 @@
 import json
+import os
 import urllib.error
+import time
 import uuid
-import boto3
+import aws_clients
+import tracing
+import dynamo_scan
 import logging
 from decimal import Decimal
 import urllib.request
-from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr
+import secrets_cache
+import api_cache
+import course_search_index
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -17,35 +24,45 @@ ALLOWED_ORIGINS = [
     "http://localhost:3000"
 ]
 
-dynamodb = boto3.resource("dynamodb")
-COURSES_TABLE = dynamodb.Table("sg_courses")
+dynamodb = aws_clients.dynamodb()
+COURSES_TABLE = aws_clients.table("sg_courses")
+# externalCourseID (partition key) -> courseID. One item per external course;
+# the conditional put on it is what makes course creation single-flight.
+EXTERNAL_ID_TABLE = aws_clients.table(os.environ.get("SG_COURSE_EXTERNAL_IDS_TABLE", "sg_course_external_ids"))
+# Migration: courses created before sg_course_external_ids existed have no
+# mapping item until backfill_external_id_map() runs (python
+# check_or_create_course.py, once, after creating the table). Until then a
+# mapping miss falls back to the old sg_courses scan and adopts the course it
+# finds, so nothing is duplicated; set SG_COURSE_EXTERNAL_IDS_BACKFILLED=1 after
+# the backfill to drop that scan from new-course creation.
+EXTERNAL_IDS_BACKFILLED = os.environ.get("SG_COURSE_EXTERNAL_IDS_BACKFILLED") == "1"
+# A pending claim older than the lease is taken over; a fresh one is waited on
+# for up to CLAIM_WAIT_SECONDS before the caller is told to retry (202).
+CLAIM_LEASE_SECONDS = int(os.environ.get("SG_COURSE_CLAIM_LEASE_SECONDS", "60"))
+CLAIM_WAIT_SECONDS = float(os.environ.get("SG_COURSE_CLAIM_WAIT_SECONDS", "5"))
+_CLAIM_POLL_SECONDS = 0.25
+
+# Map the prebuilt trigram index once per container (see course_search_index)
+course_search_index.load_index()
 EXTERNAL_COURSE_LOOKUP_API = "https://c8h20trzmh.execute-api.us-east-2.amazonaws.com/DEV?course_id="
+EXTERNAL_API_TIMEOUT_SECONDS = float(os.environ.get("GOLFCOURSEAPI_TIMEOUT_SECONDS", "10"))
 
 def fetch_course_data_from_external_api(external_course_id):
-    """Fetch full course JSON from external API."""  
+    """Fetch full course JSON from external API (cached; see api_cache)."""
+    raw_data = api_cache.get_or_fetch(
+        "course", str(external_course_id),
+        lambda: fetch_course_json(external_course_id)
+    )
+    return json.loads(raw_data, parse_float=Decimal) if raw_data else None
 
-    secret_name = "golfCourseAPI"
-    region_name = "us-east-2"
 
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )    
+def fetch_course_json(external_course_id):
+    """Raw course JSON from golfcourseapi, or None on 404 (cached as a negative result)."""
 
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        # For a list of exceptions thrown, see
-        # https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
-        raise e
+    secret_name = "golfCourseAPI"
 
-    # secret = get_secret_value_response['SecretString']
-    secret = json.loads(get_secret_value_response['SecretString'])
-    api_key = secret.get("Authorization")   
+    # Cached per warm container; ClientError propagates to the caller
+    api_key = secrets_cache.get_secret_value(secret_name, "Authorization")
       
             
     url = f"https://api.golfcourseapi.com/v1/courses/{external_course_id}"    
@@ -56,14 +73,168 @@ def fetch_course_data_from_external_api(external_course_id):
     )       
 
     try:
-        with urllib.request.urlopen(req) as response:
-            raw_data = response.read()
-            return json.loads(raw_data, parse_float=Decimal)
+        with urllib.request.urlopen(req, timeout=EXTERNAL_API_TIMEOUT_SECONDS) as response:
+            return response.read().decode("utf-8")
     except urllib.error.HTTPError as he:
         body = he.read().decode(errors='replace')
         logger.error(f"External API HTTPError {he.code}: {he.reason} — body: {body!r}")
+        if he.code == 404:
+            return None
+        secrets_cache.invalidate_on_auth_error(secret_name, he)
         raise    
 
+def get_mapping(external_course_id):
+    """Keyed, consistent read of the externalCourseID mapping item, or None."""
+    resp = EXTERNAL_ID_TABLE.get_item(
+        Key={"externalCourseID": external_course_id},
+        ConsistentRead=True
+    )
+    return resp.get("Item")
+
+
+def is_stale_claim(mapping):
+    """A pending claim older than the lease: its owner is presumed dead. Claims from before claimedAt count as stale."""
+    return (mapping.get("status") == "pending"
+            and time.time() - float(mapping.get("claimedAt", 0)) >= CLAIM_LEASE_SECONDS)
+
+
+def claim_external_id(external_course_id, course_name, stale_claim=None):
+    """
+    Create-if-absent for the externalCourseID mapping, or, given stale_claim,
+    take over that expired pending claim (only if nobody has touched it since).
+    Returns the courseID we now own, or None when another request got there first.
+    """
+    course_id = str(uuid.uuid4())
+    kwargs = {"ConditionExpression": "attribute_not_exists(externalCourseID)"}
+    if stale_claim is not None:
+        kwargs = {
+            "ConditionExpression": "courseID = :old AND #s = :pending",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {":old": stale_claim["courseID"], ":pending": "pending"},
+        }
+    try:
+        EXTERNAL_ID_TABLE.put_item(
+            Item={
+                "externalCourseID": external_course_id,
+                "courseID": course_id,
+                "courseName": course_name,
+                "status": "pending",
+                "claimedAt": int(time.time())
+            },
+            **kwargs
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return None
+    if stale_claim is not None:
+        logger.warning(f"Took over stale claim {stale_claim['courseID']} for externalCourseID {external_course_id}")
+        # The dead owner may have written its course item before marking the mapping ready
+        delete_course_item(stale_claim["courseID"], stale_claim.get("courseName", course_name))
+    return course_id
+
+
+def mark_ready(external_course_id, course_id):
+    """Flip our claim to ready. False if it is no longer ours (taken over after our lease ran out)."""
+    try:
+        EXTERNAL_ID_TABLE.update_item(
+            Key={"externalCourseID": external_course_id},
+            UpdateExpression="SET #s = :ready",
+            ConditionExpression="courseID = :cid AND #s = :pending",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":ready": "ready", ":pending": "pending", ":cid": course_id}
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def release_external_id(external_course_id, course_id):
+    """Drop our claim (only if it is still ours and still pending) so a later request can retry creation."""
+    try:
+        EXTERNAL_ID_TABLE.delete_item(
+            Key={"externalCourseID": external_course_id},
+            ConditionExpression="courseID = :cid AND #s = :pending",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":cid": course_id, ":pending": "pending"}
+        )
+    except ClientError as e:
+        logger.warning(f"Could not release claim for {external_course_id}: {e}")
+
+
+def delete_course_item(course_id, course_name):
+    """Best-effort removal of a course item whose mapping never became ready."""
+    try:
+        COURSES_TABLE.delete_item(Key={"courseID": course_id, "courseName": course_name})
+    except ClientError as e:
+        logger.warning(f"Could not delete orphaned course {course_id}: {e}")
+
+
+def backfill_external_id_map():
+    """One-off: add mapping items for courses created before sg_course_external_ids existed."""
+    for course in dynamo_scan.parallel_scan(
+        COURSES_TABLE, ProjectionExpression="courseID, courseName, externalCourseID"
+    ):
+        ext_id = course.get("externalCourseID")
+        if not ext_id or ext_id == "N/A":
+            continue
+        try:
+            EXTERNAL_ID_TABLE.put_item(
+                Item={
+                    "externalCourseID": str(ext_id),
+                    "courseID": course["courseID"],
+                    "courseName": course.get("courseName", ""),
+                    "status": "ready"
+                },
+                ConditionExpression="attribute_not_exists(externalCourseID)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            logger.warning(f"Duplicate course for externalCourseID {ext_id}: {course['courseID']}")
+
+
+def find_unmapped_course(external_course_id):
+    """The pre-migration lookup: scan sg_courses for the externalCourseID. First match or None."""
+    for course in dynamo_scan.scan_items(
+        COURSES_TABLE,
+        FilterExpression=Attr("externalCourseID").eq(external_course_id),
+        ProjectionExpression="courseID, courseName"
+    ):
+        return course
+    return None
+
+
+def adopt_unmapped_course(external_course_id, course):
+    """Write the ready mapping the backfill would have; a mapping written meanwhile wins."""
+    try:
+        EXTERNAL_ID_TABLE.put_item(
+            Item={
+                "externalCourseID": external_course_id,
+                "courseID": course["courseID"],
+                "courseName": course.get("courseName", ""),
+                "status": "ready"
+            },
+            ConditionExpression="attribute_not_exists(externalCourseID)"
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return get_mapping(external_course_id)["courseID"]
+    return course["courseID"]
+
+
+def pending_response():
+    """Another request is still creating this course; the client should retry shortly."""
+    return {
+        "statusCode": 202,
+        "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0], "Retry-After": "1"},
+        "body": json.dumps({"status": "pending", "message": "Course is being created; retry shortly"})
+    }
+
+
 def check_create_course(event):
     """
     Handles the creation or retrieval of a golf course record based on incoming event data.
@@ -80,6 +251,7 @@ def check_create_course(event):
               an error message, or a status indicator.
     Raises:
         Returns a 400 status code if required fields are missing.
+        Returns a 202 status code while a concurrent request is still creating the course.
         Returns a 502 status code if external course data cannot be fetched.
         Returns a 500 status code for unexpected errors.
     """
@@ -100,44 +272,81 @@ def check_create_course(event):
                 "body": json.dumps({"status": "error", "message": "Missing required fields"})
             }
 
-        # Check if course exists already
-        response = COURSES_TABLE.scan(
-            FilterExpression=Attr("externalCourseID").eq(external_course_id)
-        )
-
-        logger.info(f"🔍 DynamoDB response: {response}")
-
-        if response["Items"]:
-            logger.info("✅ Course already exists.")
-            return {
-                "statusCode": 200,
-                "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},                
-                "body": json.dumps({"uuid": response["Items"][0]["courseID"]})
+        if not EXTERNAL_IDS_BACKFILLED and get_mapping(external_course_id) is None:
+            course = find_unmapped_course(external_course_id)
+            if course is not None:
+                logger.info(f"Adopting unmapped course {course['courseID']} for externalCourseID {external_course_id}")
+                return {
+                    "statusCode": 200,
+                    "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},
+                    "body": json.dumps({"uuid": adopt_unmapped_course(external_course_id, course)})
+                }
+
+        # Keyed lookup instead of scanning sg_courses. Only the request that
+        # wins the conditional put creates the course; concurrent requests wait
+        # for it to become ready, then get the winner's courseID.
+        deadline = time.time() + CLAIM_WAIT_SECONDS
+        while True:
+            mapping = get_mapping(external_course_id)
+            if mapping is None or is_stale_claim(mapping):
+                course_id = claim_external_id(external_course_id, course_name, stale_claim=mapping)
+                if course_id:
+                    break
+                continue  # lost the race; read the winner's claim
+            if mapping.get("status") != "pending":
+                logger.info("✅ Course already exists.")
+                return {
+                    "statusCode": 200,
+                    "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},
+                    "body": json.dumps({"uuid": mapping["courseID"]})
+                }
+            if time.time() >= deadline:
+                return pending_response()
+            time.sleep(_CLAIM_POLL_SECONDS)
+
+        # From here on the claim is ours: any failure releases it, and removes
+        # the course item if we got as far as writing it
+        new_course_item = None
+        try:
+            full_course_data = fetch_course_data_from_external_api(external_course_id)
+            logger.info(f"📦 Fetched full course data: {full_course_data}")
+
+            if not full_course_data:
+                release_external_id(external_course_id, course_id)
+                return {
+                    "statusCode": 502,
+                    "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},
+                    "body": json.dumps({"status": "error", "message": "Failed to fetch external course data"})
+                }
+
+            # Save to DynamoDB
+            logger.info("saving new course to DB")
+            item = {
+                "courseID": course_id,
+                "externalCourseID": external_course_id,
+                "courseName": course_name,
+                "course_data": full_course_data
             }
-
-        # Fetch full course data
-        full_course_data = fetch_course_data_from_external_api(external_course_id)
-        logger.info(f"📦 Fetched full course data: {full_course_data}")
-
-        if not full_course_data:
-            return {
-                "statusCode": 502,
-                "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},
-                "body": json.dumps({"status": "error", "message": "Failed to fetch external course data"})
-            }
-
-        # Save to DynamoDB
-        logger.info("saving new course to DB")
-        new_course_item = {
-            "courseID": str(uuid.uuid4()),
-            "externalCourseID": external_course_id,
-            "courseName": course_name,
-            "course_data": full_course_data
-        }
-
-        COURSES_TABLE.put_item(Item=new_course_item)
+            COURSES_TABLE.put_item(Item=item)
+            new_course_item = item
+            if not mark_ready(external_course_id, course_id):
+                # Our lease ran out and another request took the claim over
+                logger.warning(f"Claim on {external_course_id} lost before it was marked ready")
+                delete_course_item(course_id, course_name)
+                return pending_response()
+        except Exception:
+            if new_course_item is not None:
+                delete_course_item(course_id, course_name)
+            release_external_id(external_course_id, course_id)
+            raise
         logger.info("✅ Course inserted into sg_courses")
 
+        # Incremental search index refresh; the course exists either way
+        try:
+            course_search_index.add_course(course_search_index.doc_from_course_item(new_course_item))
+        except Exception as e:
+            logger.warning(f"Search index update failed: {e}")
+
         return {
             "statusCode": 201,
             "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},            
@@ -153,6 +362,7 @@ def check_create_course(event):
         }
 
 
+@tracing.traced
 def lambda_handler(event, context):
     headers = event.get('headers') or {}
     origin = headers.get('origin', '')
@@ -184,16 +394,26 @@ def lambda_handler(event, context):
                 "body": json.dumps({"status": "error", "message": "Missing or too short search_query"})
             }        
 
-        response = COURSES_TABLE.scan(
-    ProjectionExpression="courseID, externalCourseID, courseName"
-        )
-
-        all_courses = response.get("Items", [])
-
-        matches = [
-            course for course in all_courses
-            if "courseName" in course and search_query in course["courseName"].lower()
-        ]
+        docs = course_search_index.search(search_query, limit=None, field="courseName")
+        if docs is not None:
+            matches = [
+                {
+                    "courseID": d["courseID"],
+                    "externalCourseID": d["externalCourseID"],
+                    "courseName": d["courseName"]
+                }
+                for d in docs
+            ]
+        else:
+            all_courses = dynamo_scan.scan_items(
+                COURSES_TABLE,
+                ProjectionExpression="courseID, externalCourseID, courseName"
+            )
+
+            matches = [
+                course for course in all_courses
+                if "courseName" in course and search_query in course["courseName"].lower()
+            ]
 
         logger.info(f"🎯 Matched courses: {json.dumps(matches)}")
 
@@ -210,3 +430,7 @@ def lambda_handler(event, context):
             "headers": {"Access-Control-Allow-Origin": ALLOWED_ORIGINS[0]},
             "body": json.dumps({"message": "Method Not Allowed"})
         }
+
+
+if __name__ == "__main__":
+    backfill_external_id_map()
@@ -0,0 +1,168 @@
+import logging
+import re
+import threading
+import time
+import course_search_index
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# SymSpell-style deletion dictionary over the tokens of local course names.
+# Deletes are generated from the first _PREFIX_LENGTH characters only, which
+# keeps the dictionary small; candidates are then verified on the full token.
+# Long tokens often share a prefix ("pinehurst", "pinehurstbrook"), so for
+# those a second dictionary over the last _PREFIX_LENGTH characters narrows
+# the candidates to tokens that are close at both ends before verifying.
+_MAX_DISTANCE = 2
+_PREFIX_LENGTH = 7
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_state = {"source": None, "docs": [], "token_docs": {}, "deletes": {}, "tail_deletes": {}}
+_lock = threading.Lock()
+
+
+def tokens(text: str) -> list:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def allowed_distance(token: str) -> int:
+    """Short tokens must match exactly; longer ones tolerate more typos."""
+    if len(token) < 4:
+        return 0
+    if len(token) < 8:
+        return 1
+    return _MAX_DISTANCE
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    out = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance; returns max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # A shared prefix or suffix adds nothing; typo candidates are mostly that
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(len(a) + len(b), max_distance + 1)
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            row_min = min(row_min, v)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], max_distance + 1)
+
+
+def build(docs: list) -> dict:
+    """Build the token -> docs map and the deletion dictionary for a list of index docs."""
+    token_docs = {}
+    for n, doc in enumerate(docs):
+        for t in set(tokens(doc["club_name"])):
+            token_docs.setdefault(t, []).append(n)
+    deletes = {}
+    tail_deletes = {}
+    for t in token_docs:
+        for d in _deletes(t[:_PREFIX_LENGTH], _MAX_DISTANCE):
+            deletes.setdefault(d, []).append(t)
+        if len(t) > _PREFIX_LENGTH:
+            for d in _deletes(t[-_PREFIX_LENGTH:], _MAX_DISTANCE):
+                tail_deletes.setdefault(d, []).append(t)
+    return {"docs": docs, "token_docs": token_docs, "deletes": deletes, "tail_deletes": tail_deletes}
+
+
+def _ensure_built() -> bool:
+    """(Re)build lazily from whatever index course_search_index has mapped."""
+    docs_source = course_search_index.mapped_docs()
+    if docs_source is None:
+        return False
+    source, docs = docs_source
+    if _state["source"] is source:
+        return True
+    with _lock:
+        if _state["source"] is not source:
+            t0 = time.time()
+            _state.update(build(docs), source=source)
+            logger.info(f"Built fuzzy course dictionary: {len(_state['token_docs'])} tokens, "
+                        f"{len(_state['deletes'])} deletes in {(time.time() - t0) * 1000:.0f} ms")
+    return True
+
+
+def lookup_token(token: str, max_distance: int, state: dict = None) -> list:
+    """[(dictionary_token, distance)] within max_distance of token, closest first."""
+    state = state or _state
+    if max_distance == 0:
+        return [(token, 0)] if token in state["token_docs"] else []
+    candidates = set()
+    for d in _deletes(token[:_PREFIX_LENGTH], max_distance):
+        candidates.update(state["deletes"].get(d, ()))
+    if len(token) > _PREFIX_LENGTH and candidates:
+        tails = set()
+        for d in _deletes(token[-_PREFIX_LENGTH:], max_distance):
+            tails.update(state["tail_deletes"].get(d, ()))
+        candidates = {c for c in candidates
+                      if abs(len(c) - len(token)) <= max_distance and (len(c) <= _PREFIX_LENGTH or c in tails)}
+    hits = []
+    for c in candidates:
+        dist = edit_distance(token, c, max_distance)
+        if dist <= max_distance:
+            hits.append((c, dist))
+    hits.sort(key=lambda h: h[1])
+    return hits
+
+
+def match(query: str, limit: int = 25, state: dict = None) -> list:
+    """
+    Docs whose club_name contains a (possibly misspelled) version of every query
+    token. Returns [(doc, total_distance)] with the closest matches first.
+    """
+    if state is None:
+        if not _ensure_built():
+            return []
+        state = _state
+    q_tokens = tokens(query)
+    if not q_tokens:
+        return []
+
+    best = None  # doc number -> summed distance over query tokens
+    for qt in q_tokens:
+        per_doc = {}
+        for t, dist in lookup_token(qt, allowed_distance(qt), state):
+            for n in state["token_docs"][t]:
+                if dist < per_doc.get(n, _MAX_DISTANCE + 1):
+                    per_doc[n] = dist
+        if best is None:
+            best = per_doc
+        else:
+            best = {n: d + per_doc[n] for n, d in best.items() if n in per_doc}
+        if not best:
+            return []
+
+    ranked = sorted(best.items(), key=lambda kv: (kv[1], kv[0]))[:limit]
+    return [(state["docs"][n], dist) for n, dist in ranked]
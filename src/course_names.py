@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+import aws_clients
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+COURSES_TABLE_NAME = "sg_courses"
+
+# Bounded LRU of courseID -> courseName, per warm container
+_MAX_ENTRIES = 2048
+_TTL_SECONDS = 3600
+_MAX_WORKERS = 10
+
+_CACHE = OrderedDict()   # courseID -> (courseName, cached_at)
+_LOCK = threading.Lock()
+
+STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _cache_get(course_id: str):
+    with _LOCK:
+        entry = _CACHE.get(course_id)
+        if entry is None:
+            return None
+        name, cached_at = entry
+        if time.time() - cached_at >= _TTL_SECONDS:
+            del _CACHE[course_id]
+            return None
+        _CACHE.move_to_end(course_id)
+        return name
+
+
+def _cache_put(course_id: str, name: str):
+    with _LOCK:
+        _CACHE[course_id] = (name, time.time())
+        _CACHE.move_to_end(course_id)
+        while len(_CACHE) > _MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+            STATS["evictions"] += 1
+
+
+def _lookup_name(course_id: str):
+    """
+    sg_courses is keyed on (courseID, courseName), so a GetItem/BatchGetItem
+    needs the name we are trying to find. A Query on the courseID partition
+    touches only that course's item regardless of catalogue size.
+    """
+    resp = aws_clients.table(COURSES_TABLE_NAME).query(
+        KeyConditionExpression=Key("courseID").eq(course_id),
+        ProjectionExpression="courseID, courseName",
+        Limit=1,
+    )
+    items = resp.get("Items", [])
+    return items[0].get("courseName") if items else None
+
+
+def resolve_course_names(course_ids) -> dict:
+    """Map courseIDs to courseNames using the LRU first, then keyed lookups for the rest."""
+    name_map = {}
+    missing = []
+    for cid in set(course_ids):
+        name = _cache_get(cid)
+        if name is None:
+            missing.append(cid)
+        else:
+            name_map[cid] = name
+    STATS["hits"] += len(name_map)
+    STATS["misses"] += len(missing)
+
+    if missing:
+        workers = min(_MAX_WORKERS, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for cid, name in zip(missing, pool.map(_lookup_name, missing)):
+                if name is None:
+                    logger.warning(f"No sg_courses item for courseID {cid}")
+                    continue
+                name_map[cid] = name
+                _cache_put(cid, name)
+
+    return name_map
+
+
+def get_stats() -> dict:
+    return dict(STATS, cached=len(_CACHE))
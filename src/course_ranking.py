@@ -0,0 +1,149 @@
+import heapq
+
+# Ranking for unified course search results.
+#
+# Each candidate's lowercased fields are computed once (Candidate) and shared
+# by dedup and every scorer. Scorers are plain functions (candidate, ctx) ->
+# float and are combined as a weighted sum; the top `cap` results are pulled
+# with heapq.nsmallest, which keeps sorted()'s stable ordering for ties.
+
+
+def _key(record: dict) -> tuple:
+    location = record.get("location") or {}
+    return (
+        (record.get("club_name") or "").lower(),
+        (location.get("city") or "").lower(),
+        (location.get("state") or "").lower(),
+    )
+
+
+class Candidate:
+    __slots__ = ("record", "name", "city", "state", "hay", "order", "tiebreak")
+
+    def __init__(self, record: dict, key: tuple, order: int):
+        self.record = record
+        self.name, self.city, self.state = key
+        self.hay = f"{self.name} {self.city} {self.state}"
+        self.order = order
+        # Everything after the score in rank()'s sort key; none of it depends on the query
+        self.tiebreak = (
+            record.get("fuzzy_distance") or 0,
+            0 if record.get("source") == "local" else 1,
+            record.get("club_name") or "",
+            order,
+        )
+
+
+# ---------------------------
+# Scorers
+# ---------------------------
+
+def prefix_scorer(c: Candidate, ctx: dict) -> float:
+    q = ctx["q"]
+    return 1.0 if q and (c.name.startswith(q) or c.city.startswith(q)) else 0.0
+
+
+def substring_scorer(c: Candidate, ctx: dict) -> float:
+    q = ctx["q"]
+    return 1.0 if q and q in c.hay else 0.0
+
+
+def fuzzy_scorer(c: Candidate, ctx: dict) -> float:
+    """Typo-tolerant local hits carry fuzzy_distance (see course_fuzzy); closer is better."""
+    d = c.record.get("fuzzy_distance")
+    return 0.0 if d is None else 1.0 / (1 + d)
+
+
+def locality_scorer(c: Candidate, ctx: dict) -> float:
+    """Prefer the caller's city/state when the request supplies them."""
+    city, state = (ctx.get("city") or "").lower(), (ctx.get("state") or "").lower()
+    if city and c.city == city:
+        return 1.0
+    if state and c.state == state:
+        return 0.5
+    return 0.0
+
+
+def popularity_scorer(c: Candidate, ctx: dict) -> float:
+    """Optional popularity in [0, 1] on the record (e.g. share of rounds logged there)."""
+    return float(c.record.get("popularity") or 0)
+
+
+def tiered_scorer(c: Candidate, ctx: dict) -> float:
+    """The original search ranking: prefix 3, substring 2, fuzzy-only 1.5, anything else 1."""
+    q = ctx["q"]
+    if q and (c.name.startswith(q) or c.city.startswith(q)):
+        return 3
+    if q and q in c.hay:
+        return 2
+    if c.record.get("fuzzy_distance") is not None:
+        return 1.5
+    return 1
+
+
+SCORERS = {
+    "tiered": tiered_scorer,
+    "prefix": prefix_scorer,
+    "substring": substring_scorer,
+    "fuzzy": fuzzy_scorer,
+    "locality": locality_scorer,
+    "popularity": popularity_scorer,
+}
+
+DEFAULT_WEIGHTS = {"tiered": 1.0}
+
+
+# ---------------------------
+# Engine
+# ---------------------------
+
+def dedup(local_arr, external_arr) -> list:
+    """
+    Locals always kept (a later local with the same name/city/state replaces the
+    earlier one in place); externals dropped when they collide with anything
+    already kept by name/city/state or externalCourseID.
+    """
+    by_key = {}   # key -> (record, first-seen position)
+    seen_extids = set()
+
+    for r in local_arr:
+        k = _key(r)
+        prev = by_key.get(k)
+        by_key[k] = (r, prev[1] if prev is not None else len(by_key))
+        extid = r.get("externalCourseID")
+        if extid:
+            seen_extids.add(str(extid))
+
+    for r in external_arr:
+        k = _key(r)
+        extid = r.get("externalCourseID")
+        if k in by_key:
+            continue
+        if extid and str(extid) in seen_extids:
+            continue
+        by_key[k] = (r, len(by_key))
+        if extid:
+            seen_extids.add(str(extid))
+
+    return [Candidate(r, k, order) for k, (r, order) in by_key.items()]
+
+
+def rank(candidates, query: str, cap: int = 20, weights: dict = None, ctx: dict = None) -> list:
+    """Top `cap` records by weighted score, then fuzzy distance, locals first, name, input order."""
+    weights = weights or DEFAULT_WEIGHTS
+    scorers = [(SCORERS[name], w) for name, w in weights.items() if w]
+    ctx = dict(ctx or {}, q=(query or "").strip().lower())
+
+    if len(scorers) == 1:
+        (fn, w), = scorers
+
+        def sort_key(c):
+            return -w * fn(c, ctx), c.tiebreak
+    else:
+        def sort_key(c):
+            score = 0
+            for fn, w in scorers:
+                score += w * fn(c, ctx)
+            return -score, c.tiebreak
+
+    return [c.record for c in heapq.nsmallest(cap, candidates, key=sort_key)]
@@ -0,0 +1,433 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+import aws_clients
+import dynamo_scan
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# ---------------------------
+# Config
+# ---------------------------
+INDEX_BUCKET = os.environ.get("SG_SEARCH_INDEX_BUCKET", "golf-scorecards-bucket")
+INDEX_KEY = os.environ.get("SG_SEARCH_INDEX_KEY", "search-index/courses.idx")
+# A bundled index (e.g. in a Lambda layer) skips the S3 download at cold start
+BUNDLED_INDEX_PATH = os.environ.get("SG_SEARCH_INDEX_PATH", "")
+# Courses created since the last build, one small JSON object each; merged into
+# searches at load time and folded into the index by the next build_from_table
+DELTA_PREFIX = os.environ.get("SG_SEARCH_INDEX_DELTA_PREFIX", "search-index/courses-delta/")
+LOCAL_INDEX_PATH = "/tmp/courses.idx"
+_CHECK_INTERVAL_SECONDS = 60  # how often a warm container HEADs the index and lists deltas (in the background)
+_MISSING_RETRY_SECONDS = 60   # how long "no index" is remembered before S3 is asked again
+_DELTA_WORKERS = 8
+_INTERSECT_MAX = 5000  # above this, verify candidates instead of intersecting postings
+
+# ---------------------------
+# File layout (little-endian)
+#   header   : magic, n_docs, n_grams, doc_index_off, gram_table_off, postings_off
+#   doc index: (n_docs + 1) u32 offsets into the doc blob that follows it
+#   doc blob : UTF-8 "courseID \x1f courseName \x1f club_name \x1f city \x1f state \x1f externalCourseID"
+#   grams    : n_grams sorted entries of (12-byte UTF-8 trigram, postings_off u32, count u32)
+#   postings : u32 doc numbers, ascending
+# ---------------------------
+MAGIC = b"SGIDX001"
+_HEADER = struct.Struct("<8sIIIII")
+_GRAM = struct.Struct("<12sII")
+_U32 = struct.Struct("<I")
+_SEP = "\x1f"
+_FIELDS = ("courseID", "courseName", "club_name", "city", "state", "externalCourseID")
+
+_state = {"mm": None, "header": None, "etag": None, "checked_at": 0.0, "missing_at": None,
+          "delta": {}, "generation": None, "docs": None, "docs_for": None}
+_lock = threading.Lock()
+_refresh_thread = None
+
+
+def haystack(doc: dict) -> str:
+    """Same string searchGolfCourses has always substring-matched against."""
+    return f"{doc['club_name']} {doc['city']} {doc['state']}".lower()
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _gram_key(gram: str) -> bytes:
+    return gram.encode("utf-8")[:12].ljust(12, b"\0")
+
+
+# ---------------------------
+# Build
+# ---------------------------
+
+def build_index(docs) -> bytes:
+    """docs: iterable of dicts with the _FIELDS keys. Returns the serialized index."""
+    docs = list(docs)
+    blob = bytearray()
+    offsets = []
+    postings = {}
+    for n, doc in enumerate(docs):
+        offsets.append(len(blob))
+        blob += _SEP.join(str(doc.get(f) or "") for f in _FIELDS).encode("utf-8")
+        for g in trigrams(haystack(doc)) | trigrams((doc.get("courseName") or "").lower()):
+            postings.setdefault(_gram_key(g), []).append(n)
+    offsets.append(len(blob))
+
+    doc_index_off = _HEADER.size
+    gram_table_off = doc_index_off + 4 * len(offsets) + len(blob)
+    postings_off = gram_table_off + _GRAM.size * len(postings)
+
+    gram_table = bytearray()
+    postings_blob = bytearray()
+    for key in sorted(postings):
+        ids = postings[key]
+        gram_table += _GRAM.pack(key, postings_off + len(postings_blob), len(ids))
+        postings_blob += struct.pack(f"<{len(ids)}I", *ids)
+
+    out = bytearray(_HEADER.pack(MAGIC, len(docs), len(postings), doc_index_off, gram_table_off, postings_off))
+    out += struct.pack(f"<{len(offsets)}I", *offsets)
+    out += blob
+    out += gram_table
+    out += postings_blob
+    return bytes(out)
+
+
+def read_docs(buf) -> list:
+    """Decode every doc in a serialized index (used for incremental rebuilds)."""
+    _, n_docs, _, doc_index_off, _, _ = _HEADER.unpack_from(buf, 0)
+    return [_doc_at(buf, doc_index_off, n_docs, n) for n in range(n_docs)]
+
+
+def _doc_at(buf, doc_index_off, n_docs, n) -> dict:
+    start = _U32.unpack_from(buf, doc_index_off + 4 * n)[0]
+    end = _U32.unpack_from(buf, doc_index_off + 4 * (n + 1))[0]
+    base = doc_index_off + 4 * (n_docs + 1)
+    values = bytes(buf[base + start:base + end]).decode("utf-8").split(_SEP)
+    return dict(zip(_FIELDS, values))
+
+
+def unwrap_attrval(v):
+    """Safely unwrap DynamoDB AttributeValue format into plain Python."""
+    if not isinstance(v, dict) or any(k in v for k in ("club_name", "course", "location")):
+        return v
+    if "S" in v: return v["S"]
+    if "N" in v: return v["N"]
+    if "BOOL" in v: return v["BOOL"]
+    if "M" in v: return {k: unwrap_attrval(x) for k, x in v["M"].items()}
+    if "L" in v: return [unwrap_attrval(x) for x in v["L"]]
+    return v
+
+
+def extract_display_fields(item):
+    """Pull out club_name, city, state from course_data JSON or AttributeValue."""
+    courseName = item.get("courseName")
+    course_data = unwrap_attrval(item.get("course_data") or {})
+    course_obj = (course_data.get("course") if isinstance(course_data, dict) else {}) or {}
+    club_name = course_obj.get("club_name") or course_obj.get("course_name") or courseName or ""
+    location = course_obj.get("location") or {}
+    city = location.get("city") or ""
+    state = location.get("state") or ""
+    return club_name, city, state
+
+
+def doc_from_course_item(item: dict) -> dict:
+    """Shape an sg_courses item into an index doc."""
+    club_name, city, state = extract_display_fields(item)
+    return {
+        "courseID": item.get("courseID") or "",
+        "courseName": item.get("courseName") or "",
+        "club_name": club_name,
+        "city": city,
+        "state": state,
+        "externalCourseID": item.get("externalCourseID") or "",
+    }
+
+
+def build_from_table(table_name: str = "sg_courses") -> bytes:
+    """Offline build: scan sg_courses once, publish the index to S3 and drop the deltas it now covers."""
+    started = time.time()
+    items = dynamo_scan.parallel_scan(
+        aws_clients.table(table_name),
+        ProjectionExpression="#cid, #cname, #cdata, externalCourseID",
+        ExpressionAttributeNames={"#cid": "courseID", "#cname": "courseName", "#cdata": "course_data"},
+    )
+    # Sort so rebuilds of an unchanged table produce an identical file
+    docs = sorted((doc_from_course_item(it) for it in items), key=lambda d: d["courseID"])
+    data = build_index(docs)
+    publish_index(data)
+    _compact_deltas(started)
+    return data
+
+
+def publish_index(data: bytes, if_match: str = None) -> str:
+    """Upload a serialized index; with if_match the PUT only succeeds if nobody replaced it meanwhile."""
+    kwargs = {"Bucket": INDEX_BUCKET, "Key": INDEX_KEY, "Body": data, "ContentType": "application/octet-stream"}
+    if if_match:
+        kwargs["IfMatch"] = if_match
+    resp = aws_clients.s3().put_object(**kwargs)
+    logger.info(f"Published course search index ({len(data)} bytes) to s3://{INDEX_BUCKET}/{INDEX_KEY}")
+    return resp.get("ETag")
+
+
+def add_course(doc: dict) -> bool:
+    """
+    Make a course created by check_create_course searchable without rebuilding
+    the index: write it as a delta object (its own key, so concurrent creates
+    never race) and merge it into this container's searches at once. Other
+    containers pick it up on their next refresh. Best effort.
+    """
+    try:
+        aws_clients.s3().put_object(Bucket=INDEX_BUCKET, Key=DELTA_PREFIX + doc["courseID"] + ".json",
+                                    Body=json.dumps(doc).encode("utf-8"), ContentType="application/json")
+    except ClientError as e:
+        logger.warning(f"Could not add course {doc['courseID']} to the search index: {e}")
+        return False
+    with _lock:
+        _state["delta"] = dict(_state["delta"], **{doc["courseID"]: doc})
+        _state["generation"] = object()
+    return True
+
+
+def _list_deltas():
+    """(key, LastModified) of every delta object."""
+    for page in aws_clients.s3().get_paginator("list_objects_v2").paginate(Bucket=INDEX_BUCKET, Prefix=DELTA_PREFIX):
+        for obj in page.get("Contents", []):
+            yield obj["Key"], obj["LastModified"]
+
+
+def _read_delta(key: str) -> dict:
+    return json.loads(aws_clients.s3().get_object(Bucket=INDEX_BUCKET, Key=key)["Body"].read())
+
+
+def _load_deltas():
+    """Fetch delta objects this container has not seen yet."""
+    try:
+        known = {DELTA_PREFIX + cid + ".json" for cid in _state["delta"]}
+        new_keys = [key for key, _ in _list_deltas() if key not in known]
+        if not new_keys:
+            return
+        with ThreadPoolExecutor(max_workers=min(_DELTA_WORKERS, len(new_keys))) as pool:
+            docs = list(pool.map(_read_delta, new_keys))
+    except ClientError as e:
+        logger.warning(f"Could not load course search index deltas: {e}")
+        return
+    with _lock:
+        _state["delta"] = dict(_state["delta"], **{d["courseID"]: d for d in docs})
+        _state["generation"] = object()
+    logger.info(f"Merged {len(docs)} course search index deltas")
+
+
+def _compact_deltas(built_at: float):
+    """Delete deltas written before the build's scan started; the new index has those courses."""
+    stale = [{"Key": key} for key, modified in _list_deltas() if modified.timestamp() < built_at]
+    for i in range(0, len(stale), 1000):
+        aws_clients.s3().delete_objects(Bucket=INDEX_BUCKET, Delete={"Objects": stale[i:i + 1000]})
+    logger.info(f"Compacted {len(stale)} course search index deltas")
+
+
+# ---------------------------
+# Load (cold start) and refresh
+# ---------------------------
+
+def _write_local(data: bytes):
+    tmp = LOCAL_INDEX_PATH + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, LOCAL_INDEX_PATH)
+
+
+def _map(path: str, etag):
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = _HEADER.unpack_from(mm, 0)
+    if header[0] != MAGIC:
+        mm.close()
+        raise ValueError(f"{path} is not a course search index")
+    with _lock:
+        # The old map is left for the GC; a concurrent reader may still hold it
+        _state.update(mm=mm, header=header, etag=etag, checked_at=time.time(), missing_at=None,
+                      generation=object())
+    logger.info(f"Mapped course search index: {header[1]} courses, {header[2]} trigrams")
+
+
+def load_index(force: bool = False) -> bool:
+    """
+    Memory-map the index, downloading it to /tmp first if needed, and merge
+    the deltas. False if unavailable; that answer is kept for
+    _MISSING_RETRY_SECONDS so searches don't each ask S3 again.
+    """
+    if not force:
+        if _state["mm"] is not None:
+            return True
+        missing_at = _state["missing_at"]
+        if missing_at is not None and time.time() - missing_at < _MISSING_RETRY_SECONDS:
+            return False
+    try:
+        if BUNDLED_INDEX_PATH and os.path.exists(BUNDLED_INDEX_PATH):
+            _map(BUNDLED_INDEX_PATH, None)
+        else:
+            obj = aws_clients.s3().get_object(Bucket=INDEX_BUCKET, Key=INDEX_KEY)
+            _write_local(obj["Body"].read())
+            _map(LOCAL_INDEX_PATH, obj["ETag"])
+    except Exception as e:
+        logger.warning(f"Course search index unavailable: {e}")
+        _state["missing_at"] = time.time()
+        return False
+    _load_deltas()
+    return True
+
+
+def _maybe_refresh():
+    """
+    Start a background refresh once _CHECK_INTERVAL_SECONDS have passed; the
+    search that triggers it (and any during it) uses the current map. A refresh
+    frozen with the container carries on at its next invocation.
+    """
+    global _refresh_thread
+    with _lock:
+        if time.time() - _state["checked_at"] < _CHECK_INTERVAL_SECONDS:
+            return
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _state["checked_at"] = time.time()
+        _refresh_thread = threading.Thread(target=_refresh, name="search-index-refresh", daemon=True)
+        _refresh_thread.start()
+
+
+def _refresh():
+    """Remap the index if S3 has a new one, and merge new deltas."""
+    try:
+        if _state["etag"] is not None:  # a bundled index only changes with a deploy
+            try:
+                head = aws_clients.s3().head_object(Bucket=INDEX_BUCKET, Key=INDEX_KEY)
+            except ClientError as e:
+                logger.warning(f"Could not check course search index: {e}")
+                return
+            if head["ETag"] != _state["etag"]:
+                load_index(force=True)
+                return
+        _load_deltas()
+    except Exception as e:
+        logger.warning(f"Course search index refresh failed: {e}")
+
+
+def mapped_docs():
+    """
+    (generation, decoded docs) for the mapped index plus its deltas, or None.
+    Decoded once per generation, which changes whenever either does.
+    """
+    if not load_index():
+        return None
+    generation = _state["generation"]
+    if _state["docs_for"] is not generation:
+        docs = read_docs(_state["mm"])
+        indexed = {d["courseID"] for d in docs}
+        docs += [d for cid, d in _state["delta"].items() if cid not in indexed]
+        _state.update(docs=docs, docs_for=generation)
+    return generation, _state["docs"]
+
+
+# ---------------------------
+# Query
+# ---------------------------
+
+def _posting_ref(mm, header, gram: str):
+    """(offset, count) of a trigram's posting list; count is 0 when absent."""
+    _, _, n_grams, _, gram_table_off, _ = header
+    key = _gram_key(gram)
+    lo, hi = 0, n_grams
+    while lo < hi:
+        mid = (lo + hi) // 2
+        pos = gram_table_off + mid * _GRAM.size
+        k = mm[pos:pos + 12]
+        if k < key:
+            lo = mid + 1
+        elif k > key:
+            hi = mid
+        else:
+            _, off, count = _GRAM.unpack_from(mm, pos)
+            return off, count
+    return 0, 0
+
+
+def _postings(mm, ref):
+    off, count = ref
+    return struct.unpack_from(f"<{count}I", mm, off)
+
+
+def search(query: str, limit: int = 25, field: str = None):
+    """
+    Substring search over the mapped index, then the deltas. Returns a list of
+    docs, or None when no index is loaded (callers fall back to the table scan).
+    field=None matches "club_name city state" like searchGolfCourses;
+    field="courseName" matches the course name only.
+    """
+    if not load_index():
+        return None
+    _maybe_refresh()
+
+    q = (query or "").strip().lower()
+    if not q:
+        return []
+
+    results = _search_mapped(q, limit, field)
+    found = {d["courseID"] for d in results}
+    for doc in _state["delta"].values():
+        if limit and len(results) >= limit:
+            break
+        text = doc["courseName"].lower() if field == "courseName" else haystack(doc)
+        if q in text and doc["courseID"] not in found:
+            results.append(doc)
+    return results
+
+
+def _search_mapped(q: str, limit: int, field: str) -> list:
+    mm, header = _state["mm"], _state["header"]
+    n_docs, doc_index_off = header[1], header[3]
+
+    grams = trigrams(q)
+    if grams:
+        # Only the posting lists we actually walk get unpacked
+        refs = sorted((_posting_ref(mm, header, g) for g in grams), key=lambda r: r[1])
+        if not refs[0][1]:
+            return []
+        if refs[0][1] <= _INTERSECT_MAX:
+            # Intersect smallest posting lists first; lists too long to be
+            # worth unpacking are left to the substring check below
+            candidates = set(_postings(mm, refs[0]))
+            for ref in refs[1:]:
+                if ref[1] > _INTERSECT_MAX:
+                    break
+                candidates.intersection_update(_postings(mm, ref))
+                if not candidates:
+                    return []
+            candidates = sorted(candidates)
+        else:
+            # Very common trigrams: verifying the shortest list lazily is
+            # cheaper than building huge sets, and stops once limit is hit
+            off, count = refs[0]
+            candidates = (n for (n,) in _U32.iter_unpack(mm[off:off + 4 * count]))
+    else:
+        # 1-2 character queries: no trigram to look up, walk every doc
+        candidates = range(n_docs)
+
+    results = []
+    for n in candidates:
+        doc = _doc_at(mm, doc_index_off, n_docs, n)
+        text = doc["courseName"].lower() if field == "courseName" else haystack(doc)
+        if q in text:
+            results.append(doc)
+            if limit and len(results) >= limit:
+                break
+    return results
+
+
+if __name__ == "__main__":
+    build_from_table()
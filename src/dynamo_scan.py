@@ -0,0 +1,86 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Pages buffered between segment workers and the consumer in parallel_scan.
+# Workers block once the buffer is full, so memory stays bounded at roughly
+# max_buffered_pages * 1 MB no matter how big the table is.
+_DEFAULT_BUFFERED_PAGES = 8
+
+_DONE = object()
+
+
+def _iter_pages(operation, kwargs):
+    kwargs = dict(kwargs)
+    while True:
+        resp = operation(**kwargs)
+        yield resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def scan_items(table, **kwargs):
+    """Lazily yield every item of a Scan, following LastEvaluatedKey page by page."""
+    for items in _iter_pages(table.scan, kwargs):
+        yield from items
+
+
+def query_items(table, **kwargs):
+    """Lazily yield every item of a Query, following LastEvaluatedKey page by page."""
+    for items in _iter_pages(table.query, kwargs):
+        yield from items
+
+
+def parallel_scan(table, total_segments: int = 4, max_buffered_pages: int = _DEFAULT_BUFFERED_PAGES, **kwargs):
+    """
+    Scan with Segment/TotalSegments across worker threads, yielding items as pages
+    arrive (no ordering guarantee). Stopping iteration early stops the workers.
+    """
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+
+    def put(value):
+        # Blocking put that gives up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(segment):
+        try:
+            seg_kwargs = dict(kwargs, Segment=segment, TotalSegments=total_segments)
+            for items in _iter_pages(table.scan, seg_kwargs):
+                if not put(items):
+                    return
+        except Exception as e:
+            logger.error(f"Scan segment {segment}/{total_segments} failed: {e}")
+            put(e)
+        finally:
+            put(_DONE)
+
+    threads = [threading.Thread(target=worker, args=(s,), daemon=True) for s in range(total_segments)]
+    for t in threads:
+        t.start()
+
+    try:
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=1)
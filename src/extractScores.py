@@ -1,16 +1,41 @@
+import abc
 import logging
 import json
+import hashlib
+import re
 import openai
 import sys
-import boto3
+import os
+import resource
+import tracemalloc
+import aws_clients
 from botocore.exceptions import ClientError
 from PIL import Image, ImageEnhance
+try:
+    import numpy as np
+except ImportError:  # numpy comes from the Lambda layer; Pillow-only path still works
+    np = None
 import requests
+import requests.adapters
 from io import BytesIO
 import base64
 from datetime import datetime
 import time
-from urllib.parse import urlparse, unquote
+from urllib.parse import urlparse, unquote, quote
+import secrets_cache
+import api_cache
+import course_fuzzy
+import scan_jobs
+import model_client
+import model_router
+import prompts
+import rate_governor
+import tracing
+from stage_graph import StageGraph
+try:
+    import scorecard_local
+except ImportError:  # needs numpy; without it every scan goes to the remote model
+    scorecard_local = None
 
 # Keep Lambda layer path if you rely on it
 sys.path.append('/opt/python/lib/python3.13/site-packages')
@@ -34,15 +59,87 @@ REGION = "us-east-2"
 STORAGE_CLASS = "STANDARD"
 PRESIGN_TTL_SECONDS = 300  # 5 minutes while testing; you can lower to 120 later
 
+# Preprocessing output. "resized" downsizes to TARGET_LONG_EDGE before the
+# enhance steps and encodes JPEG/WebP; "png" is the original full-resolution
+# lossless path. The vision model downsamples anything past ~2048 px anyway.
+PREPROCESS_MODE = os.environ.get("PREPROCESS_MODE", "resized")
+TARGET_LONG_EDGE = int(os.environ.get("TARGET_LONG_EDGE", "2048"))
+OUTPUT_FORMAT = os.environ.get("PREPROCESS_FORMAT", "JPEG").upper()  # JPEG or WEBP
+OUTPUT_QUALITY = int(os.environ.get("PREPROCESS_QUALITY", "85"))
+
+# "numpy" runs contrast + sharpen as one fused array pass (enhance_image_numpy);
+# "pillow" is the original ImageEnhance chain. Falls back to pillow without numpy.
+PREPROCESS_PIPELINE = os.environ.get("PREPROCESS_PIPELINE", "numpy")
+_STRIP_ROWS = 256  # rows per fused pass; bounds the int16 working set to a strip
+
+# Originals larger than this are rejected while streaming, before decode
+MAX_ORIGINAL_BYTES = int(os.environ.get("MAX_ORIGINAL_BYTES", str(25 * 1024 * 1024)))
+_CHUNK_BYTES = 256 * 1024
+# PROFILE_MEMORY=1 adds tracemalloc / max-RSS figures to the preprocess stats
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY") == "1"
+
+# Pooled keep-alive session for non-S3 originals, reused across invocations
+_HTTP = requests.Session()
+_HTTP.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Preprocessed images are content-addressed by the SHA-256 of the original, so a
+# re-scan of the same card reuses the artifact while the 24h lifecycle keeps it.
+# Model output is cached per (image hash, player, prompt version) in api_cache;
+# prompt versions live with the templates in prompts.py.
+EXTRACTION_PROMPT_VERSION = prompts.version("player_scores")
+SCAN_CACHE_STATS = {"artifact_hits": 0, "artifact_misses": 0}
+
+# "card" extracts every player row in one model call and caches the rows per
+# card, so the rest of a group scanning the same card is served by name match;
+# "player" is the original one-row-per-call prompt (also the card-mode fallback).
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "card")
+CARD_PROMPT_VERSION = prompts.version("card_scores")
+CARD_STATS = {"scans": 0, "model_calls": 0, "card_hits": 0, "player_fallbacks": 0}
+
+SECRET_NAME = "openAI_API2"
+
+# Local extraction backends tried, in order, before the remote model (comma-
+# separated names from BACKENDS; empty, the default, disables). A local read is
+# only used when every hole's confidence reaches LOCAL_CONFIDENCE_THRESHOLD.
+# local-grid falls back to rendered-font digit prototypes without a trained
+# digit_model.npz, so leave it off until one ships (bench/bench_local_grid.py
+# --train, then check its accuracy there).
+LOCAL_BACKENDS = [n for n in os.environ.get("EXTRACTION_BACKENDS", "").split(",") if n]
+LOCAL_CONFIDENCE_THRESHOLD = float(os.environ.get("LOCAL_CONFIDENCE_THRESHOLD", "0.9"))
+LOCAL_STATS = {"attempts": 0, "accepted": 0, "escalated": 0, "errors": 0}
+
+# Upload-triggered speculation: an S3 ObjectCreated event under SPECULATION_PREFIX
+# runs the extraction before the client calls the scan endpoint, which then
+# attaches to that run. Runs older than SPECULATION_STALE_SECONDS that never
+# finished (container died) are ignored. The scan request usually lands on a
+# different container from the upload run, so speculation needs the shared
+# DynamoDB job store (SG_SCAN_JOBS_STORE=dynamodb); with the in-memory store it
+# is off.
+SPECULATION_ENABLED = scan_jobs.JOB_STORE == "dynamodb"
+SPECULATION_PREFIX = os.environ.get("SPECULATION_PREFIX", "scorecards/")
+SPECULATION_WAIT_SECONDS = 15
+SPECULATION_STALE_SECONDS = 90
+SPECULATION_STATS = {"attached": 0, "waited": 0, "missed": 0}
+
+# How the preprocessed image reaches the model. "inline" sends a base64 data URL
+# when the encoded image is at most INLINE_MAX_BYTES (no S3 PUT, no presign, no
+# model-side fetch) and falls back to a presigned URL above it; "url" always
+# goes through S3, which is the only mode that reuses content-addressed artifacts.
+IMAGE_TRANSPORT = os.environ.get("IMAGE_TRANSPORT", "inline")
+INLINE_MAX_BYTES = int(os.environ.get("INLINE_MAX_BYTES", str(1024 * 1024)))
+
+_FORMATS = {
+    "PNG":  {"content_type": "image/png",  "ext": "png",  "params": {}},
+    "JPEG": {"content_type": "image/jpeg", "ext": "jpg",  "params": {"optimize": True}},
+    "WEBP": {"content_type": "image/webp", "ext": "webp", "params": {"method": 4}},
+}
+
 # ---------------------------
 # Helpers
 # ---------------------------
 
-def load_original_bytes(image_url: str) -> bytes:
-    """
-    If image_url points to S3, read via boto3 (no HTTP needed).
-    Otherwise, fetch via HTTPS (for truly external sources).
-    """
+def parse_s3_url(image_url: str):
+    """(bucket, key) if image_url is an S3 URL, else (None, None)."""
     u = urlparse(image_url)
     host = (u.netloc or "").lower()
     path = unquote(u.path or "")
@@ -65,22 +162,47 @@ def load_original_bytes(image_url: str) -> bytes:
             if len(p) == 2:
                 bucket, key = p[0], p[1]
 
+    return bucket, key
+
+
+def _read_capped(chunks, limit: int) -> bytes:
+    """Join streamed chunks, failing as soon as the total passes limit."""
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) > limit:
+            raise Exception(f"Original image exceeds {limit} bytes")
+    return bytes(buf)
+
+
+def load_original_bytes(image_url: str) -> bytes:
+    """
+    If image_url points to S3, read via boto3 (no HTTP needed).
+    Otherwise, fetch via HTTPS (for truly external sources).
+    Both paths stream the body and stop at MAX_ORIGINAL_BYTES.
+    """
+    bucket, key = parse_s3_url(image_url)
+
     if bucket and key:
         logger.info(f"Reading original from S3: s3://{bucket}/{key}")
-        s3 = boto3.client("s3", region_name=REGION)
-        obj = s3.get_object(Bucket=bucket, Key=key)
-        return obj["Body"].read()
+        obj = aws_clients.s3().get_object(Bucket=bucket, Key=key)
+        if obj.get("ContentLength", 0) > MAX_ORIGINAL_BYTES:
+            obj["Body"].close()
+            raise Exception(f"Original image is {obj['ContentLength']} bytes (limit {MAX_ORIGINAL_BYTES})")
+        return _read_capped(obj["Body"].iter_chunks(_CHUNK_BYTES), MAX_ORIGINAL_BYTES)
 
     # Fallback to HTTP(S) for non-S3 URLs
     logger.info(f"Fetching original via HTTPS: {image_url[:120]}...")
     try:
-        resp = requests.get(image_url, timeout=30)
-        logger.info(f"GET status={resp.status_code} len={len(resp.content) if resp.ok else 0}")
-        if resp.status_code != 200:
-            # Log a peek into body to aid debugging
-            logger.error(f"Non-200 from HTTPS fetch. Body preview: {resp.text[:200]}")
-            raise Exception(f"HTTP {resp.status_code} when fetching original")
-        return resp.content
+        with _HTTP.get(image_url, timeout=(3, 30), stream=True) as resp:
+            logger.info(f"GET status={resp.status_code} len={resp.headers.get('Content-Length')}")
+            if resp.status_code != 200:
+                # Log a peek into body to aid debugging
+                logger.error(f"Non-200 from HTTPS fetch. Body preview: {resp.text[:200]}")
+                raise Exception(f"HTTP {resp.status_code} when fetching original")
+            if int(resp.headers.get("Content-Length") or 0) > MAX_ORIGINAL_BYTES:
+                raise Exception(f"Original image exceeds {MAX_ORIGINAL_BYTES} bytes")
+            return _read_capped(resp.iter_content(_CHUNK_BYTES), MAX_ORIGINAL_BYTES)
     except requests.RequestException as e:
         raise Exception(f"Network error fetching original: {e}")
 
@@ -88,52 +210,277 @@ def load_original_bytes(image_url: str) -> bytes:
 # Preprocessing
 # ---------------------------
 
-def preprocess_image(image_url: str, first_name: str):
+class StageTimer:
     """
-    - Loads the original (S3 SDK if S3 URL; HTTP otherwise)
-    - Grayscale + rotate portrait to landscape + enhance contrast/sharpness
-    - PUTs a single preprocessed PNG to S3 (private)
-    - Returns a pre-signed GET URL for OpenAI and the object key
+    Collects per-stage wall time (ms) and byte counts for one preprocessing run;
+    each lap is also a tracing span.
     """
-    # Load original bytes (prefers S3 SDK)
-    raw = load_original_bytes(image_url)
+
+    def __init__(self):
+        self.stats = {"ms": {}, "bytes": {}}
+        self._t = time.perf_counter()
+
+    def lap(self, stage: str, nbytes: int = None):
+        now = time.perf_counter()
+        self.stats["ms"][stage] = round((now - self._t) * 1000, 1)
+        if nbytes is not None:
+            self.stats["bytes"][stage] = nbytes
+        tracing.record(stage, (now - self._t) * 1000, bytes=nbytes)
+        self._t = now
+
+
+def decode_image(raw: bytes, mode: str = None):
+    """
+    Decode the original. In resized mode, JPEGs use Pillow's draft path so the
+    decoder emits grayscale at the smallest DCT scale (1/2, 1/4, 1/8) that is
+    still at least TARGET_LONG_EDGE on the long side.
+    """
+    mode = mode or PREPROCESS_MODE
     image = Image.open(BytesIO(raw))
+    if mode == "resized" and image.format == "JPEG" and max(image.size) > TARGET_LONG_EDGE:
+        scale = TARGET_LONG_EDGE / max(image.size)
+        image.draft("L", (round(image.width * scale), round(image.height * scale)))
+    image.load()
+    return image
+
+
+def enhance_image(image, mode: str = None):
+    """Grayscale, optional downsize, rotate portrait to landscape, contrast and sharpness."""
+    mode = mode or PREPROCESS_MODE
 
     # 1) Grayscale
     image = image.convert("L")
 
-    # 2) Rotate portrait to landscape
+    # 2) Downsize first so the remaining steps touch fewer pixels
+    image = _downsize(image, mode)
+
+    # 3) Rotate portrait to landscape
     if image.height > image.width:
         image = image.rotate(90, expand=True)
 
-    # 3) Enhance contrast & sharpness
+    # 4) Enhance contrast & sharpness
     image = ImageEnhance.Contrast(image).enhance(2.0)
     image = ImageEnhance.Sharpness(image).enhance(2.0)
+    return image
+
+
+def _downsize(image, mode: str):
+    if mode == "resized" and max(image.size) > TARGET_LONG_EDGE:
+        scale = TARGET_LONG_EDGE / max(image.size)
+        image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    return image
+
+
+def enhance_image_numpy(image, mode: str = None):
+    """
+    Same result as enhance_image (within +-1 grey level) with fewer full-size
+    copies: Contrast(2.0) and Sharpness(2.0) are fused into one pass over
+    int16 row strips (only the strip is ever widened), and the portrait->
+    landscape rotation is Pillow's transpose.
+
+    Contrast(2.0)  : c = clip(2 * L - mean(L))
+    Sharpness(2.0) : s = clip(2 * c - smooth(c)), smooth = 3x3 [1 1 1; 1 5 1; 1 1 1] / 13,
+                     border pixels unchanged (as Pillow's 3x3 filter leaves them)
+    """
+    mode = mode or PREPROCESS_MODE
+    if image.mode != "L":
+        image = image.convert("L")
+    image = _downsize(image, mode)
+
+    a = np.asarray(image)   # a copy of the pixels; the grey image can go
+    del image
+    mean = int(a.mean() + 0.5)
+    h, w = a.shape
+    out = np.empty_like(a)
+
+    for top in range(0, h, _STRIP_ROWS):
+        bottom = min(top + _STRIP_ROWS, h)
+        # The strip plus one row of context above and below for the 3x3 filter
+        lo, hi = max(top - 1, 0), min(bottom + 1, h)
+        c = a[lo:hi].astype(np.int16)
+        c *= 2
+        c -= mean
+        np.clip(c, 0, 255, out=c)
+        out[top:bottom] = c[top - lo:bottom - lo]
+
+        r0, r1 = max(top, 1), min(bottom, h - 1)   # rows with a full neighbourhood
+        if r1 <= r0 or w <= 2:
+            continue
+        inner = c[r0 - lo:r1 - lo, 1:-1]
+        acc = inner * 5
+        for dy in (-1, 0, 1):
+            for dx in (0, 1, 2):
+                if dy or dx != 1:
+                    acc += c[r0 - lo + dy:r1 - lo + dy, dx:dx + w - 2]
+        # round(acc / 13), then 2 * c - smooth
+        acc *= 2
+        acc += 13
+        acc //= 26
+        acc -= inner
+        acc -= inner
+        np.negative(acc, out=acc)
+        np.clip(acc, 0, 255, out=acc)
+        out[r0:r1, 1:-1] = acc
+
+    del a
+    result = Image.fromarray(out, mode="L")
+    del out
+    # Rotate portrait to landscape (counter-clockwise, like rotate(90, expand=True))
+    if h > w:
+        result = result.transpose(Image.Transpose.ROTATE_90)
+    return result
+
+
+def encode_image(image, mode: str = None):
+    """Encode to an in-memory buffer; returns (buf, format info from _FORMATS)."""
+    mode = mode or PREPROCESS_MODE
+    fmt = "PNG" if mode == "png" else OUTPUT_FORMAT
+    info = _FORMATS[fmt]
+    params = dict(info["params"])
+    if fmt != "PNG":
+        params["quality"] = OUTPUT_QUALITY
 
-    # Save to in-memory buffer (PNG)
     buf = BytesIO()
-    image.save(buf, format="PNG")
+    image.save(buf, format=fmt, **params)
     buf.seek(0)
+    return buf, info
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def artifact_key(image_hash: str, mode: str = None) -> str:
+    """Content-addressed key; the variant covers every setting that changes the output bytes."""
+    mode = mode or PREPROCESS_MODE
+    fmt = _FORMATS["PNG" if mode == "png" else OUTPUT_FORMAT]
+    variant = "png" if mode == "png" else f"{mode}-{TARGET_LONG_EDGE}-q{OUTPUT_QUALITY}"
+    return f"preprocessed/sha256/{image_hash}-{variant}.{fmt['ext']}"
+
+
+def normalize_name(first_name: str) -> str:
+    return " ".join((first_name or "").lower().split())
+
+
+def scan_result_key(image_hash: str, first_name: str) -> str:
+    return f"{image_hash}|{normalize_name(first_name)}|{EXTRACTION_PROMPT_VERSION}"
 
-    # Single PUT of the preprocessed image (PRIVATE)
-    s3 = boto3.client("s3", region_name=REGION)
-    timestamp = int(time.time())
-    object_key = f"preprocessed/preprocessed-{first_name}-{timestamp}.png"
 
+def card_result_key(image_hash: str) -> str:
+    return f"{image_hash}|*|{CARD_PROMPT_VERSION}"
+
+
+def local_result_key(image_hash: str, first_name: str, backend) -> str:
+    # Apart from the model's keys: a local read must not answer for (or outlive) the prompt version
+    return f"{image_hash}|{normalize_name(first_name)}|{backend.name}@{backend.version}"
+
+
+def _artifact_exists(s3, object_key: str) -> bool:
     try:
-        s3.upload_fileobj(
-            buf,
-            BUCKET,
-            object_key,
-            ExtraArgs={
-                "ContentType": "image/png",
-                "StorageClass": STORAGE_CLASS  # Keep STANDARD for 24h lifecycle
-            }
-        )
-        logger.info(f"Uploaded preprocessed image to s3://{BUCKET}/{object_key} StorageClass={STORAGE_CLASS}")
-    except Exception as e:
-        logger.error(f"Failed to upload preprocessed image to S3: {e}")
-        raise
+        s3.head_object(Bucket=BUCKET, Key=object_key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            logger.warning(f"HEAD s3://{BUCKET}/{object_key} failed: {e}")
+        return False
+
+
+def _finish_memory_profile(timer: StageTimer):
+    if PROFILE_MEMORY:
+        # tracemalloc sees Python-side buffers (raw bytes, encode buffer);
+        # Pillow's pixel memory only shows up in the process max RSS
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        timer.stats["memory"] = {
+            "tracemalloc_peak_bytes": peak,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+
+def to_data_url(buf: BytesIO, content_type: str) -> str:
+    return f"data:{content_type};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+
+
+def preprocess_image(image_url: str, first_name: str, stats: dict = None,
+                     raw: bytes = None, image_hash: str = None, transport: str = None):
+    """
+    - Loads the original (S3 SDK if S3 URL; HTTP otherwise) unless `raw` is given
+    - In url transport, reuses the content-addressed artifact when this original was already preprocessed
+    - Otherwise grayscale + downsize (resized mode) + rotate portrait to landscape + enhance contrast/sharpness
+    - Inline transport: returns a base64 data URL when the encoding fits under INLINE_MAX_BYTES
+    - Otherwise PUTs a single preprocessed JPEG/WebP (or PNG in png mode) to S3 (private)
+      and returns a pre-signed GET URL for OpenAI
+    - Returns (image_url_for_model, object_key or None when inlined)
+    - Fills `stats` (if given) with per-stage ms and bytes, plus the transport used
+    """
+    transport = transport or IMAGE_TRANSPORT
+    timer = StageTimer()
+    if PROFILE_MEMORY:
+        tracemalloc.start()
+
+    # Load original bytes (prefers S3 SDK)
+    if raw is None:
+        raw = load_original_bytes(image_url)
+        timer.lap("load_original", len(raw))
+    if image_hash is None:
+        image_hash = content_hash(raw)
+        timer.lap("hash")
+
+    s3 = aws_clients.s3()
+    object_key = artifact_key(image_hash)
+    reused = False
+    if transport != "inline":
+        # Skipped for inline: a HEAD costs about what the S3 fetch it would avoid saves
+        reused = _artifact_exists(s3, object_key)
+        timer.lap("lookup")
+        SCAN_CACHE_STATS["artifact_hits" if reused else "artifact_misses"] += 1
+
+    if reused:
+        del raw
+        logger.info(f"Reusing preprocessed image s3://{BUCKET}/{object_key} for {first_name}")
+    else:
+        image = decode_image(raw)
+        timer.lap("decode")
+
+        if PREPROCESS_PIPELINE == "numpy" and np is not None:
+            image = enhance_image_numpy(image)
+        else:
+            image = enhance_image(image)
+        timer.lap("enhance")
+
+        buf, fmt = encode_image(image)
+        encoded_bytes = buf.getbuffer().nbytes
+        timer.lap("encode", encoded_bytes)
+        del raw
+
+        if transport == "inline" and encoded_bytes <= INLINE_MAX_BYTES:
+            data_url = to_data_url(buf, fmt["content_type"])
+            timer.lap("inline", len(data_url))
+            _finish_memory_profile(timer)
+            timer.stats["transport"] = "inline"
+            logger.info(f"Preprocess stats mode={PREPROCESS_MODE} transport=inline: {json.dumps(timer.stats)}")
+            if stats is not None:
+                stats.update(timer.stats)
+            return data_url, None
+
+        # Single PUT of the preprocessed image (PRIVATE)
+        try:
+            s3.upload_fileobj(
+                buf,
+                BUCKET,
+                object_key,
+                ExtraArgs={
+                    "ContentType": fmt["content_type"],
+                    "StorageClass": STORAGE_CLASS  # Keep STANDARD for 24h lifecycle
+                }
+            )
+            logger.info(f"Uploaded preprocessed image to s3://{BUCKET}/{object_key} StorageClass={STORAGE_CLASS}")
+            timer.lap("upload")
+        except Exception as e:
+            logger.error(f"Failed to upload preprocessed image to S3: {e}")
+            raise
+
+    _finish_memory_profile(timer)
 
     # Pre-signed URL so OpenAI can fetch without public access
     try:
@@ -146,13 +493,109 @@ def preprocess_image(image_url: str, first_name: str):
     except Exception as e:
         logger.error(f"Failed to generate presigned URL: {e}")
         raise
+    timer.lap("presign")
+    timer.stats["transport"] = "url"
+
+    logger.info(f"Preprocess stats mode={PREPROCESS_MODE} transport=url reused={reused}: {json.dumps(timer.stats)}")
+    if stats is not None:
+        stats.update(timer.stats)
 
     return presigned_url, object_key
 
+# ---------------------------
+# Extraction backends
+# ---------------------------
+
+class ExtractionBackend(abc.ABC):
+    """
+    Reads one player's hole scores off a decoded scorecard. extract(image, first_name)
+    returns {"scores": {"1".."18": int}, "confidence": {"1".."18": float in [0, 1]}},
+    or None when the backend can't settle this card. `version` goes into the
+    result cache key; change it whenever the backend would read a card differently.
+    """
+
+    name = "base"
+    version = "0"
+
+    @abc.abstractmethod
+    def extract(self, image, first_name: str):
+        ...
+
+
+BACKENDS = {}
+
+
+def register_backend(backend):
+    if not isinstance(backend, ExtractionBackend):
+        raise TypeError(f"{type(backend).__name__} is not an ExtractionBackend")
+    BACKENDS[backend.name] = backend
+
+
+def local_backends() -> list:
+    return [BACKENDS[n] for n in LOCAL_BACKENDS if n in BACKENDS]
+
+
+if scorecard_local is not None:
+    # scorecard_local can't import this module, so its backend is registered as a virtual subclass
+    ExtractionBackend.register(scorecard_local.LocalGridBackend)
+    register_backend(scorecard_local.LocalGridBackend())
+
+
+def _local_view(raw: bytes):
+    """Grayscale, downsized, landscape; no contrast/sharpen, which only adds edge noise for the grid detector."""
+    image = _downsize(decode_image(raw).convert("L"), PREPROCESS_MODE)
+    if image.height > image.width:
+        image = image.rotate(90, expand=True)
+    return image
+
+
+def try_local_backends(raw: bytes, first_name: str):
+    """(result, backend name) from the first local backend confident on every hole, else None."""
+    backends = local_backends()
+    if not backends:
+        return None
+    try:
+        image = _local_view(raw)
+    except Exception as e:
+        LOCAL_STATS["errors"] += 1
+        logger.warning(f"Decoding for local backends failed: {e}")
+        return None
+    for backend in backends:
+        LOCAL_STATS["attempts"] += 1
+        t0 = time.perf_counter()
+        try:
+            result = backend.extract(image, first_name)
+        except Exception as e:
+            LOCAL_STATS["errors"] += 1
+            logger.warning(f"Local backend {backend.name} failed: {e}")
+            continue
+        ms = round((time.perf_counter() - t0) * 1000, 1)
+        low = None if result is None else min(result["confidence"].values())
+        if low is not None and low >= LOCAL_CONFIDENCE_THRESHOLD:
+            LOCAL_STATS["accepted"] += 1
+            logger.info(f"Local backend {backend.name} accepted in {ms} ms (min confidence {low})")
+            return result, backend.name
+        LOCAL_STATS["escalated"] += 1
+        logger.info(f"Local backend {backend.name} escalating after {ms} ms (min confidence {low})")
+    return None
+
 # ---------------------------
 # Main handler helpers
 # ---------------------------
 
+def scan_cache_stats() -> dict:
+    """Artifact reuse, result-cache and model-call counters for this container."""
+    hits, misses = SCAN_CACHE_STATS["artifact_hits"], SCAN_CACHE_STATS["artifact_misses"]
+    scans = CARD_STATS["scans"]
+    return {
+        "artifacts": dict(SCAN_CACHE_STATS, hit_rate=round(hits / (hits + misses), 3) if hits + misses else None),
+        "results": api_cache.get_stats().get("scan"),
+        "model": dict(CARD_STATS, calls_per_scan=round(CARD_STATS["model_calls"] / scans, 3) if scans else None),
+        "speculation": dict(SPECULATION_STATS),
+        "local": dict(LOCAL_STATS),
+        "router": model_router.get_stats(),
+    }
+
 def cors_headers(origin: str):
     return {
         "Access-Control-Allow-Origin": origin,
@@ -160,125 +603,494 @@ def cors_headers(origin: str):
         "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
     }
 
-def get_secret(event, origin):
-    # Parse request body
-    body = json.loads(event.get("body", "{}"))
-    logger.info(f"Received body keys: {list(body.keys())}")
+class ScanError(Exception):
+    """A scan failure carrying the HTTP status and body the handler should return."""
 
-    imageURL = body.get("fileUrl")  # Keeping your original field name
-    first_name = body.get("firstName", "Unknown")
+    def __init__(self, status_code: int, body: dict):
+        super().__init__(body.get("message"))
+        self.status_code = status_code
+        self.body = body
 
-    logger.info(f"Received imageURL: {('present' if imageURL else 'MISSING')}, firstName={first_name}")
 
-    secret_name = "openAI_API2"
-    region_name = REGION
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
 
-    # Preprocess the image → upload once → get presigned URL
+
+def _json_payload(content: str):
+    """The JSON object in a model answer (inside a ```json fence if there is one); None if unparseable."""
+    m = _JSON_BLOCK_RE.search(content or "")
     try:
-        preprocessed_image_url, object_key = preprocess_image(imageURL, first_name)
-    except Exception as e:
-        logger.error(f"Image preprocessing failed: {e}")
-        return {
-            "statusCode": 400,
-            "headers": cors_headers(origin),
-            "body": json.dumps({"status": "error", "message": "Failed to preprocess image"})
-        }
+        return json.loads(m.group(1) if m else content)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_card_rows(content: str) -> list:
+    """[{"name", "scores": {"1".."18": int}, "out", "in"}] from a card response; [] if it can't be parsed."""
+    data = _json_payload(content)
+    if data is None:
+        logger.warning("Card extraction returned unparseable JSON")
+        return []
+    rows = []
+    for player in (data.get("players") or []) if isinstance(data, dict) else []:
+        name = player.get("name") if isinstance(player, dict) else None
+        scores = player.get("scores") if isinstance(player, dict) else None
+        if not isinstance(name, str) or not isinstance(scores, dict):
+            continue
+        normalized = {}
+        for hole in range(1, 19):
+            try:
+                normalized[str(hole)] = int(scores.get(str(hole), -1))
+            except (TypeError, ValueError):
+                normalized[str(hole)] = -1
+        totals = {k: player.get(k) if isinstance(player.get(k), int) else None for k in ("out", "in")}
+        rows.append(dict({"name": name, "scores": normalized}, **totals))
+    return rows
+
+
+# Plausible per-hole strokes; anything else (including -1 for unreadable) fails validation
+PLAUSIBLE_SCORES = range(1, 16)
+
+
+def _valid_holes(scores) -> bool:
+    if not isinstance(scores, dict):
+        return False
+    values = [scores.get(str(h)) for h in range(1, 19)]
+    return all(isinstance(v, int) and not isinstance(v, bool) and v in PLAUSIBLE_SCORES for v in values)
+
+
+def validate_player_scores(content: str) -> bool:
+    """Single-player answer: 18 integer holes in the plausible range."""
+    return _valid_holes(_json_payload(content))
+
+
+def validate_card(content: str) -> bool:
+    """Card answer: at least one row, every row plausible, and OUT/IN totals (when read) equal the hole sums."""
+    rows = parse_card_rows(content)
+    if not rows:
+        return False
+    for row in rows:
+        if not _valid_holes(row["scores"]):
+            return False
+        values = [row["scores"][str(h)] for h in range(1, 19)]
+        if row.get("out") is not None and row["out"] != sum(values[:9]):
+            return False
+        if row.get("in") is not None and row["in"] != sum(values[9:]):
+            return False
+    return True
+
+
+def match_player(rows: list, first_name: str):
+    """
+    The row whose name matches first_name, tolerating the same typo budget as
+    course search (course_fuzzy). None when nothing matches or the best match is a tie.
+    """
+    q_tokens = course_fuzzy.tokens(first_name)
+    if not q_tokens:
+        return None
+    scored = []
+    for row in rows:
+        name_tokens = course_fuzzy.tokens(row["name"])
+        total = 0
+        for qt in q_tokens:
+            limit = course_fuzzy.allowed_distance(qt)
+            best = min((course_fuzzy.edit_distance(qt, t, limit) for t in name_tokens), default=limit + 1)
+            if best > limit:
+                break
+            total += best
+        else:
+            scored.append((total, row))
+    if not scored:
+        return None
+    scored.sort(key=lambda s: s[0])
+    if len(scored) > 1 and scored[1][0] == scored[0][0]:
+        return None
+    return scored[0][1]
+
+
+def render_row(row: dict) -> str:
+    """Same shape as a single-player response, which the client parses out of the ```json block."""
+    return "```json\n" + json.dumps(row["scores"], indent=2) + "\n```"
 
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
 
+def _openai_key() -> str:
+    # Cached per warm container (see secrets_cache)
     try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+        with tracing.span("secret"):
+            secret_dict = secrets_cache.get_secret_dict(SECRET_NAME)
     except ClientError:
-        return {
-            "statusCode": 405,
-            "headers": cors_headers(origin),
-            "body": json.dumps({"message": "Error returning secrets"})
-        }
+        raise ScanError(405, {"message": "Error returning secrets"})
 
-    secret_dict = json.loads(get_secret_value_response['SecretString'])
     api_key = secret_dict.get("openAI_API2")  # Make sure this key matches what’s stored in AWS Secrets Manager
 
     if not api_key:
         logger.error("No API key found in Secrets Manager")
-        return {
-            "statusCode": 500,
-            "headers": cors_headers(origin),
-            "body": json.dumps({"message": "Invalid API key retrieved"})
-        }
+        raise ScanError(500, {"message": "Invalid API key retrieved"})
 
     logger.info(f"Using OpenAI API Key: {api_key[:5]}********")  # Log only the prefix for safety
+    return api_key
 
-    prompt_text = (
-        "This is a photo of a golf scorecard.\n\n"
-        "• The first column contains player names.\n"
-        "• The next 9 columns (cells 1–9) contain scores for holes 1 through 9, in order.\n"
-        "• The next cell may be the total for holes 1–9 (you can ignore it).\n"
-        "• There may also be 1 or 2 blank cells following the total — ignore those as well.\n"
-        "• The next numeric cell after any blanks should be treated as hole 10.\n"
-        "• The final 9 numeric cells (cells 10–18) contain scores for holes 10 through 18.\n\n"
-        f"Please extract only the scores from the row where the first column contains the name {first_name}.\n"
-        "Ignore all other names and rows. Do not infer values from similar names. Do not return partial rows or best guesses.\n\n"
-        "Some important rules:\n\n"
-        "- Each score must be treated independently, even if there are multiple identical scores in a row (e.g. \"4, 4, 4\"). Do not skip, merge, or assume duplicates are an error.\n"
-        "- If the same digit appears multiple times, return each one separately in the correct order.\n"
-        "- If a score is unreadable, unclear, or missing, set it to -1 in the output.\n"
-        "- Do not include the total column or any summary values in the output.\n\n"
-        "Return the scores for the player as a JSON object with string keys for each hole (from \"1\" to \"18\") and integer values.\n\n"
-        "**Example output format:**\n"
-        "```json\n"
-        "{\n"
-        "  \"1\": 4,\n"
-        "  \"2\": 4,\n"
-        "  \"3\": 4,\n"
-        "  \"4\": 2,\n"
-        "  \"5\": 3,\n"
-        "  ...\n"
-        "  \"18\": 5\n"
-        "}```"
-    )
-
-    logger.info("Calling OpenAI with presigned image URL")
+
+def call_model(prompt: str, image_url: str, validate=None, api_key: str = None, **variables) -> str:
+    """
+    Run the "extract" model cascade (see model_router) on the prompts template
+    `prompt` filled with `variables`; validate decides when to escalate.
+    """
+    openai.api_key = api_key or _openai_key()
+    logger.info(f"Calling OpenAI with {'inline image' if image_url.startswith('data:') else 'presigned image URL'}")
 
     try:
-        openai.api_key = api_key
-
-        response = openai.chat.completions.create(
-            model="chatgpt-4o-latest",
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt_text},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": preprocessed_image_url
-                        },
-                    },
-                ],
-            }],
+        content, model = model_router.complete(
+            "extract",
+            prompts.vision_messages(prompt, image_url, **variables),
+            validate=validate,
+            prompt=prompt,
         )
+    except rate_governor.Shed as e:
+        logger.warning(f"OpenAI call shed: {e}")
+        raise ScanError(429, {"status": "error", "message": "Too many scans right now; please try again shortly",
+                              "retryAfter": int(e.retry_after) + 1})
+    except model_client.ModelUnavailable as e:
+        # Circuit open or out of time: say so rather than hang until the Lambda timeout
+        logger.error(f"OpenAI call not attempted: {e}")
+        raise ScanError(503, {"status": "error", "message": "Score extraction is temporarily unavailable; please try again shortly"})
+    except Exception as e:
+        logger.error(f"OpenAI call failed: {str(e)}")
+        secrets_cache.invalidate_on_auth_error(SECRET_NAME, e)
+        raise ScanError(500, {"status": "error", "message": "Error occurred"})
+
+    CARD_STATS["model_calls"] += 1
+    logger.info(f"Extraction answered by {model}")
+    return content
+
+
+def extract_scores(image_url: str, first_name: str, stages: dict = None) -> dict:
+    """
+    Scores for one player as the model-format message, consulting in order:
+    the per-player result cache, cached whole-card rows (EXTRACTION_MODE=card),
+    the local backends (cached reads, then a fresh read), and finally the model
+    (whole card, then a single player). Returns {"message", "served_from"}.
+    `stages` (if given) receives epoch-ms timestamps as each stage completes.
+    With first_name None (speculative runs) only the card rows, or in player
+    mode the preprocessed artifact, are produced and message is None.
+
+    Independent stages run concurrently on a StageGraph: the OpenAI key is
+    fetched while the original downloads, and both cache lookups run together.
+    """
+    CARD_STATS["scans"] += 1
+    calls_before = CARD_STATS["model_calls"]
+    preprocess_stats = {}
+
+    def mark(stage):
+        if stages is not None:
+            stages[stage] = int(time.time() * 1000)
+
+    def lookup(key_fn, wanted):
+        return (lambda image_hash: api_cache.lookup("scan", key_fn(image_hash)) if wanted else None)
+
+    graph = StageGraph()
+    # Only needed on a cache miss, but free when warm and off the critical path when cold
+    graph.add("secret", _openai_key)
+    graph.add("download", lambda: load_original_bytes(image_url))
+    # Hash the original first: an identical card + player + prompt is answered from cache
+    graph.add("hash", content_hash, deps=("download",))
+    graph.add("result_lookup", lookup(lambda h: scan_result_key(h, first_name), first_name is not None), deps=("hash",))
+    graph.add("card_lookup", lookup(card_result_key, EXTRACTION_MODE == "card"), deps=("hash",))
+
+    try:
+        raw = graph.result("download")
+    except Exception as e:
+        logger.error(f"Loading original image failed: {e}")
+        raise ScanError(400, {"status": "error", "message": "Failed to preprocess image"})
+    mark("loaded")
+    tracing.record("load_original", graph.timings()["download"]["ms"], bytes=len(raw))
+    image_hash = graph.result("hash")
+    result_key = scan_result_key(image_hash, first_name)
+
+    def model_image_url(transport=None):
+        # Preprocess the image → upload once (or reuse, or inline) → URL for the model
+        def run(raw):
+            return preprocess_image(image_url, first_name, stats=preprocess_stats, raw=raw,
+                                    image_hash=image_hash, transport=transport)[0]
+        graph.add("preprocess", run, deps=("download",))
+        try:
+            url = graph.result("preprocess")
+            mark("preprocessed")
+            return url
+        except Exception as e:
+            logger.error(f"Image preprocessing failed: {e}")
+            raise ScanError(400, {"status": "error", "message": "Failed to preprocess image"})
+
+    def ask_model(stage, prompt, url, validate, **variables):
+        graph.add(stage, lambda api_key: call_model(prompt, url, validate, api_key=api_key, **variables),
+                  deps=("secret",))
+        content = graph.result(stage)
+        mark(stage)
+        return content
+
+    def done(message, served_from):
+        # One line per scan; grouping on image_hash gives model calls per card
+        logger.info(json.dumps({"metric": "scan", "image_hash": image_hash, "served_from": served_from,
+                                "model_calls": CARD_STATS["model_calls"] - calls_before,
+                                "stages": graph.timings(), "preprocess_ms": preprocess_stats.get("ms")}))
+        return {"message": message, "served_from": served_from}
+
+    local_tried = []
 
+    def local_answer():
+        # Cheap local read before any model call (but after the model caches, which
+        # it must not override); the remote model only sees cards it can't settle
+        local_tried.append(True)
+        for backend in local_backends():
+            cached = api_cache.lookup("scan", local_result_key(image_hash, first_name, backend))
+            if cached is not None:
+                return done(cached, "local_cache")
+        local = try_local_backends(raw, first_name)
+        mark("local")
+        if local is None:
+            return None
+        result, name = local
+        message = render_row(result)
+        api_cache.store("scan", local_result_key(image_hash, first_name, BACKENDS[name]), message)
+        return done(message, name)
+
+    if first_name is not None:
+        cached = graph.result("result_lookup")
+        if cached is not None:
+            return done(cached, "result_cache")
+
+    preprocessed_url = None
+    if EXTRACTION_MODE == "card":
+        card_key = card_result_key(image_hash)
+        cached_rows = graph.result("card_lookup")
+        if cached_rows is not None:
+            rows, served_from, card_valid = json.loads(cached_rows), "card_cache", True
+            CARD_STATS["card_hits"] += 1
+        else:
+            answer = local_answer() if first_name is not None else None
+            if answer is not None:
+                return answer
+            preprocessed_url = model_image_url()
+            content = ask_model("card_model", "card_scores", preprocessed_url, validate_card)
+            rows, served_from = parse_card_rows(content), "card_model"
+            # The cascade's last answer comes back even when it failed validation;
+            # serve it, but only cache answers that passed
+            card_valid = validate_card(content)
+            if card_valid:
+                api_cache.store("scan", card_key, json.dumps(rows))
+            else:
+                logger.info("Card answer failed validation; not caching it")
+
+        if first_name is None:
+            return done(None, served_from)
+        row = match_player(rows, first_name)
+        if row is not None:
+            message = render_row(row)
+            if card_valid:
+                api_cache.store("scan", result_key, message)
+            return done(message, served_from)
+        logger.info(f"No card row matched {first_name} among {[r['name'] for r in rows]}; asking for the row")
+        CARD_STATS["player_fallbacks"] += 1
+    elif first_name is None:
+        # Nothing to ask yet; leave the content-addressed artifact for the scan to reuse
+        model_image_url(transport="url")
+        return done(None, "preprocessed")
+
+    if not local_tried:
+        answer = local_answer()
+        if answer is not None:
+            return answer
+    content = ask_model("player_model", "player_scores", preprocessed_url or model_image_url(),
+                        validate_player_scores, first_name=first_name)
+    if validate_player_scores(content):
+        api_cache.store("scan", result_key, content)
+    else:
+        logger.info(f"Player answer for {first_name} failed validation; not caching it")
+    return done(content, "player_model")
+
+
+def run_scan_job(payload: dict, stages: dict) -> dict:
+    """scan_jobs worker: the same extraction as the synchronous POST, result in the POST body shape."""
+    result = extract_scores(payload["fileUrl"], payload.get("firstName"), stages=stages)
+    return {"status": "success", "message": result["message"], "servedFrom": result["served_from"],
+            "firstName": payload.get("firstName")}
+
+
+def upload_player_name(bucket: str, key: str):
+    """Player from the object's "firstname" metadata, else a "player=<name>" key segment, else None."""
+    try:
+        metadata = aws_clients.s3().head_object(Bucket=bucket, Key=key).get("Metadata") or {}
+    except ClientError as e:
+        logger.warning(f"HEAD s3://{bucket}/{key} failed: {e}")
+        metadata = {}
+    name = metadata.get("firstname")
+    if not name:
+        for segment in key.split("/"):
+            if segment.startswith("player="):
+                name = segment[len("player="):]
+    return name or None
+
+
+def handle_upload_event(event) -> dict:
+    """
+    S3 ObjectCreated trigger: run the extraction for each new scorecard now. Card
+    mode needs no player name; player mode needs one (or, without it, url transport
+    so the preprocessed artifact can be reused).
+    """
+    if not SPECULATION_ENABLED:
+        logger.warning("Upload speculation is off: the scan job store is in-memory, so scan requests "
+                       "could not see the run; set SG_SCAN_JOBS_STORE=dynamodb")
+        return {"speculated": 0}
+    started = 0
+    for bucket, key in scan_jobs.uploaded_objects(event):
+        if not key.startswith(SPECULATION_PREFIX):
+            continue
+        first_name = upload_player_name(bucket, key)
+        if first_name is None and EXTRACTION_MODE != "card" and IMAGE_TRANSPORT != "url":
+            logger.info(f"No player name for s3://{bucket}/{key}; nothing to precompute")
+            continue
+        payload = {"fileUrl": f"https://{bucket}.s3.{REGION}.amazonaws.com/{quote(key)}", "firstName": first_name}
+        if scan_jobs.run_inline(scan_jobs.upload_job_id(bucket, key), payload, run_scan_job):
+            started += 1
+    return {"speculated": started}
+
+
+def attach_speculative(image_url: str, first_name: str):
+    """
+    The upload-triggered result for this object if it was for this player,
+    waiting up to SPECULATION_WAIT_SECONDS while it is still running. None
+    otherwise; the caller then extracts normally, and whatever the speculative
+    run left behind (card rows, artifact) is picked up from the caches.
+    """
+    if not SPECULATION_ENABLED:
+        return None
+    bucket, key = parse_s3_url(image_url or "")
+    if not bucket:
+        return None
+    job_id = scan_jobs.upload_job_id(bucket, key)
+    job = scan_jobs.get_job(job_id)
+    if job is None:
+        SPECULATION_STATS["missed"] += 1
+        return None
+    if job["status"] not in scan_jobs.FINAL_STATES:
+        started = job["stages"].get("started") or job["stages"]["queued"]
+        if time.time() * 1000 - started > SPECULATION_STALE_SECONDS * 1000:
+            SPECULATION_STATS["missed"] += 1
+            return None
+        SPECULATION_STATS["waited"] += 1
+        job = scan_jobs.get_job(job_id, SPECULATION_WAIT_SECONDS)
+
+    result = job.get("result") or {}
+    if job["status"] == "succeeded" and result.get("message") and \
+            normalize_name(result.get("firstName")) == normalize_name(first_name):
+        SPECULATION_STATS["attached"] += 1
+        return result
+    return None
+
+
+def caller_id(event):
+    """The Cognito user id (sub) of the API caller, or None."""
+    return event.get("requestContext", {}).get("authorizer", {}).get("claims", {}).get("sub")
+
+
+def get_job_status(event, origin):
+    user_id = caller_id(event)
+    if not user_id:
+        return {
+            "statusCode": 401,
+            "headers": cors_headers(origin),
+            "body": json.dumps({"status": "error", "message": "User not authenticated"})
+        }
+    params = event.get("queryStringParameters") or {}
+    try:
+        wait_seconds = float(params.get("wait") or 0)
+    except ValueError:
+        wait_seconds = 0
+    # Other users' jobs (and upload-triggered runs) are reported as not found
+    job = scan_jobs.get_job(params["jobId"], wait_seconds, owner=user_id)
+    if job is None:
+        return {
+            "statusCode": 404,
+            "headers": cors_headers(origin),
+            "body": json.dumps({"status": "error", "message": "Job not found"})
+        }
+    return {
+        "statusCode": 200,
+        "headers": cors_headers(origin),
+        "body": json.dumps(job)
+    }
+
+
+def get_secret(event, origin):
+    # Parse request body
+    body = json.loads(event.get("body", "{}"))
+    logger.info(f"Received body keys: {list(body.keys())}")
+
+    imageURL = body.get("fileUrl")  # Keeping your original field name
+    first_name = body.get("firstName", "Unknown")
+
+    logger.info(f"Received imageURL: {('present' if imageURL else 'MISSING')}, firstName={first_name}")
+
+    # Job mode: enqueue and return at once; the client polls GET ?jobId=...&wait=N
+    if body.get("async") and not scan_jobs.ASYNC_ENABLED:
+        logger.warning("Async scan requested but no job queue is configured; scanning synchronously")
+    elif body.get("async"):
+        user_id = caller_id(event)
+        if not user_id:
+            # The job could never be read back
+            return {
+                "statusCode": 401,
+                "headers": cors_headers(origin),
+                "body": json.dumps({"status": "error", "message": "User not authenticated"})
+            }
+        job_id = scan_jobs.submit({"fileUrl": imageURL, "firstName": first_name}, run_scan_job, owner=user_id)
+        return {
+            "statusCode": 202,
+            "headers": cors_headers(origin),
+            "body": json.dumps({"status": "queued", "jobId": job_id})
+        }
+
+    speculative = attach_speculative(imageURL, first_name)
+    if speculative is not None:
         return {
             "statusCode": 200,
             "headers": cors_headers(origin),
-            "body": json.dumps({"status": "success", "message": response.choices[0].message.content})
+            "body": json.dumps({"status": "success", "message": speculative["message"], "speculative": True})
         }
 
-    except Exception as e:
-        logger.error(f"OpenAI call failed: {str(e)}")
+    try:
+        result = extract_scores(imageURL, first_name)
+    except ScanError as e:
         return {
-            "statusCode": 500,
+            "statusCode": e.status_code,
             "headers": cors_headers(origin),
-            "body": json.dumps({"status": "error", "message": "Error occurred"})
+            "body": json.dumps(e.body)
         }
 
+    logger.info(f"Scan cache stats: {json.dumps(scan_cache_stats())}")
+    response_body = {"status": "success", "message": result["message"]}
+    if result["served_from"] in ("result_cache", "card_cache", "local_cache"):
+        response_body["cached"] = True
+    return {
+        "statusCode": 200,
+        "headers": cors_headers(origin),
+        "body": json.dumps(response_body)
+    }
+
 # ---------------------------
 # Lambda entrypoint
 # ---------------------------
 
+@tracing.traced
 def lambda_handler(event, context):
+    model_client.start_invocation(context)
+    # SQS-triggered invocation: run queued scan jobs
+    records = event.get("Records") or []
+    if records and records[0].get("eventSource") == "aws:sqs":
+        return scan_jobs.handle_sqs_event(event, run_scan_job)
+    # S3 upload notification: speculative extraction
+    if records and records[0].get("eventSource") == "aws:s3":
+        return handle_upload_event(event)
+
     # Ensure 'headers' exists
     headers = event.get('headers') or {}
     origin = headers.get('origin', '')
@@ -296,7 +1108,9 @@ def lambda_handler(event, context):
     logger.info(f"Received event with path={event.get('path', '')}, method={event.get('httpMethod', '')}")
 
     http_method = event.get('httpMethod', '')
-    if http_method == 'GET':
+    if http_method == 'GET' and (event.get("queryStringParameters") or {}).get("jobId"):
+        return get_job_status(event, origin)
+    elif http_method == 'GET':
         return {
             'statusCode': 200,
             "headers": cors_headers(origin),
@@ -2,7 +2,9 @@ import json
 import os
 import logging
 import time
-import boto3
+import aws_clients
+import tracing
+import dynamo_scan
 from boto3.dynamodb.conditions import Key
 
 logger = logging.getLogger()
@@ -16,9 +18,9 @@ ALLOWED_ORIGINS = [
 
 
 # Dynamo client & table init (module-level for reuse / caching)
-dynamodb = boto3.resource('dynamodb')
+dynamodb = aws_clients.dynamodb()
 TABLE_NAME = os.environ.get('FLAGS_TABLE', 'sg_feature_flags')
-table = dynamodb.Table(TABLE_NAME)
+table = aws_clients.table(TABLE_NAME)
 
 # In-memory cache
 _CACHE = {}
@@ -43,11 +45,12 @@ def _load_flags(env: str, origin):
             }
 
     # Fetch all flags for this environment
-    resp = table.scan(
+    items = dynamo_scan.scan_items(
+        table,
         FilterExpression=Key('environment').eq(env)
     )
     flags = {}
-    for item in resp.get('Items', []):
+    for item in items:
         flags[item['flagname']] = {
             'isEnabled': item['isEnabled'],
             'config': item.get('config', {})
@@ -65,6 +68,7 @@ def _load_flags(env: str, origin):
                     "body": json.dumps(flags)
                 }
 
+@tracing.traced
 def lambda_handler(event, context):
     
     env = 'dev'
@@ -1,5 +1,7 @@
 import json
-import boto3
+import aws_clients
+import tracing
+import course_names
 import logging
 from decimal import Decimal
 from botocore.exceptions import ClientError
@@ -17,9 +19,9 @@ ALLOWED_ORIGINS = [
 
 
 # Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('sg_user_scores')
-COURSES_TABLE = dynamodb.Table("sg_courses")
+dynamodb = aws_clients.dynamodb()
+users_table = aws_clients.table('sg_user_scores')
+COURSES_TABLE = aws_clients.table("sg_courses")
 
 def decimal_to_native(obj):
     """ Recursively convert Decimal to int or float """
@@ -62,37 +64,9 @@ def get_avg_per_hole(event, origin):
         # get unique course ids
         course_ids = list({ item["courseID"] for item in items })
 
-        # 🚧 TEMPORARY WORKAROUND: Scan full table and filter in-memory
-        if course_ids:
-            course_scan = COURSES_TABLE.scan()
-            all_courses = course_scan.get("Items", [])
-
-            name_map = {
-                course["courseID"]: course["courseName"]
-                for course in all_courses
-                if course["courseID"] in course_ids
-            }
-        else:
-            name_map = {}
-
-         # BatchGetItem to fetch courseName for each courseID
-        # if course_ids:
-        #     keys = [{"courseID": cid} for cid in course_ids]
-        #     batch_resp = dynamodb.batch_get_item(
-        #         RequestItems={
-        #             "sg_courses": {
-        #                 "Keys": keys,
-        #                 "ProjectionExpression": "courseID, courseName"
-        #             }
-        #         }
-        #     )
-        #     name_map = {
-        #         rec["courseID"]: rec["courseName"]
-        #         for rec in batch_resp["Responses"].get("sg_courses", [])
-        #     }
-        # else:
-        #     name_map = {}
-        
+        # Keyed lookups behind a per-container LRU (no full sg_courses scan)
+        name_map = course_names.resolve_course_names(course_ids) if course_ids else {}
+
         logger.info(f"📝 Name map: {name_map}")
         
         # Merge courseName into each score item
@@ -127,6 +101,7 @@ def get_avg_per_hole(event, origin):
         }
 
 
+@tracing.traced
 def lambda_handler(event, context):
     """Main AWS Lambda handler"""
 
@@ -1,8 +1,9 @@
 import logging
 import json
 import sys
-import boto3
 from botocore.exceptions import ClientError
+import secrets_cache
+import tracing
 
 sys.path.append('/opt/python/lib/python3.13/site-packages')  
 
@@ -22,22 +23,10 @@ def get_s3_creds(event):
     logger.info(f"Received event: {json.dumps(event)}")
 
     secret_name = "s3UploadCredentials"
-    region_name = "us-east-2"
-
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
 
     try:
-        secret_response = client.get_secret_value(SecretId=secret_name)  
-        logger.info(f"Retrieved secret: {secret_response}")      
-                
-        # ✅ Parse the JSON string inside "SecretString"        
-        
-        secret_dict = json.loads(secret_response['SecretString'])
+        # ✅ Cached per warm container (see secrets_cache)
+        secret_dict = secrets_cache.get_secret_dict(secret_name)
         logger.info(f"Retrieved secret_dict: {secret_dict}")
         
         return {
@@ -55,6 +44,7 @@ def get_s3_creds(event):
         }          
          
     
+@tracing.traced
 def lambda_handler(event, context):    
    
     # Ensure 'headers' exists in the event before accessing it
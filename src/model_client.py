@@ -0,0 +1,302 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import openai
+import rate_governor
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Every chat completion goes through create(): a per-attempt timeout that never
+# outlives the Lambda invocation, jittered retries on transient errors, an
+# optional hedged second request once an attempt passes the model's p95 (on its
+# own rate_governor permit, so hedges count against the budget), and a
+# per-model circuit breaker that fails fast (ModelUnavailable) while the
+# provider is degraded. Retries are ours, so the SDK's own are turned off.
+MODEL_TIMEOUT_SECONDS = float(os.environ.get("MODEL_TIMEOUT_SECONDS", "25"))
+DEADLINE_MARGIN_SECONDS = float(os.environ.get("MODEL_DEADLINE_MARGIN_SECONDS", "2"))
+MIN_ATTEMPT_SECONDS = 1.0  # not worth starting an attempt with less time left
+MAX_ATTEMPTS = int(os.environ.get("MODEL_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = 0.25
+RETRY_CAP_SECONDS = 2.0
+
+# MODEL_HEDGE=1 sends a second request when the first has run past the model's
+# p95 latency (over the last HEDGE_WINDOW successes, once HEDGE_MIN_SAMPLES exist).
+HEDGE = os.environ.get("MODEL_HEDGE") == "1"
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+BREAKER_FAILURES = int(os.environ.get("MODEL_BREAKER_FAILURES", "5"))  # consecutive
+BREAKER_OPEN_SECONDS = float(os.environ.get("MODEL_BREAKER_OPEN_SECONDS", "30"))
+
+# Timeouts, dropped connections, 429s and 5xx; other API errors are the request's fault
+_RETRYABLE = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+openai.max_retries = 0
+
+_lock = threading.Lock()
+_deadline = None   # epoch seconds by which model calls must be done, per invocation
+_latencies = {}    # model -> deque of recent successful attempt latencies (s)
+_breakers = {}     # model -> CircuitBreaker
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="model")
+STATS = {"calls": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "hedges_shed": 0, "short_circuited": 0,
+         "deadline_exceeded": 0, "failures": 0}
+
+
+class ModelUnavailable(Exception):
+    """The call was not (or no longer) attempted: circuit open or invocation out of time."""
+
+
+def _count(**deltas):
+    with _lock:
+        for k, v in deltas.items():
+            STATS[k] += v
+
+
+# ---------------------------
+# Deadline
+# ---------------------------
+
+def start_invocation(context):
+    """Take the model-call deadline from the Lambda context (none without one)."""
+    global _deadline
+    remaining_ms = getattr(context, "get_remaining_time_in_millis", None)
+    _deadline = time.time() + remaining_ms() / 1000 - DEADLINE_MARGIN_SECONDS if remaining_ms else None
+
+
+def remaining_seconds():
+    return None if _deadline is None else _deadline - time.time()
+
+
+def _attempt_timeout() -> float:
+    remaining = remaining_seconds()
+    if remaining is None:
+        return MODEL_TIMEOUT_SECONDS
+    if remaining < MIN_ATTEMPT_SECONDS:
+        _count(deadline_exceeded=1)
+        raise ModelUnavailable(f"Only {max(remaining, 0):.1f}s left in this invocation; not calling the model")
+    return min(MODEL_TIMEOUT_SECONDS, remaining)
+
+
+# ---------------------------
+# Circuit breaker
+# ---------------------------
+
+class CircuitBreaker:
+    """
+    closed -> open after BREAKER_FAILURES consecutive failures; open rejects
+    calls for BREAKER_OPEN_SECONDS, then lets one trial call through
+    (half_open) whose outcome closes or re-opens it. A trial that ends without
+    saying anything about the provider (shed, out of time, rejected request,
+    429) is released, and one that never reports back is replaced after
+    another BREAKER_OPEN_SECONDS.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.time()
+            if (self.state == "open" and now - self._opened_at >= self.open_seconds) or \
+                    (self.state == "half_open" and now - self._trial_at >= self.open_seconds):
+                self.state = "half_open"
+                self._trial_at = now
+                return True
+            return False
+
+    def release(self):
+        """The call allowed through ended with no verdict on the provider: let the next one be the trial."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self._consecutive = 0
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                if self.state != "open":
+                    logger.warning(f"Model circuit opened after {self._consecutive} consecutive failures")
+                self.state = "open"
+                self._opened_at = time.time()
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker()
+        return breaker
+
+
+# ---------------------------
+# Hedging
+# ---------------------------
+
+def _observe(model: str, seconds: float):
+    with _lock:
+        _latencies.setdefault(model, deque(maxlen=HEDGE_WINDOW)).append(seconds)
+
+
+def p95(model: str):
+    with _lock:
+        samples = sorted(_latencies.get(model) or ())
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def _hedged(call, timeout: float, after: float, model: str, lane: str = None, estimate: int = 0):
+    """
+    call(timeout) now and again after `after` seconds if the first is still out.
+    The second request needs its own governor permit for `lane`; without one
+    (the minute's share is used up) the first is simply waited for.
+    """
+    first = _pool.submit(call, timeout)
+    if wait([first], timeout=after).done:
+        return first.result()
+    ticket = None
+    if lane:
+        try:
+            ticket = rate_governor.acquire(model, lane, estimate, max_wait=0)
+        except rate_governor.Shed:
+            _count(hedges_shed=1)
+            return first.result()
+    _count(hedged=1)
+    second = _pool.submit(call, max(timeout - after, MIN_ATTEMPT_SECONDS))
+    if ticket:
+        # Settled whenever it finishes, including after the first has won
+        second.add_done_callback(lambda f: rate_governor.settle(ticket, _used_tokens(f, estimate)))
+    done = wait([first, second], return_when=FIRST_COMPLETED).done
+    winner = first if first in done else second
+    other = second if winner is first else first
+    if winner.exception() is not None:
+        # The other request may still come back in time
+        try:
+            return other.result()
+        except Exception:
+            raise winner.exception()
+    if winner is second:
+        _count(hedge_wins=1)
+    return winner.result()
+
+
+# ---------------------------
+# Calls
+# ---------------------------
+
+def _used_tokens(future, estimate: int) -> int:
+    """Tokens a finished request used: its reported total, the estimate without one, 0 if it failed."""
+    if future.exception() is not None:
+        return 0
+    usage = getattr(future.result(), "usage", None)
+    return getattr(usage, "total_tokens", None) or estimate
+
+
+def _send(client, model: str, messages: list, timeout: float, lane: str = None, estimate: int = 0):
+    def call(t):
+        return client.chat.completions.create(model=model, messages=messages, timeout=t)
+
+    t0 = time.perf_counter()
+    after = p95(model) if HEDGE else None
+    if after is not None and after < timeout - MIN_ATTEMPT_SECONDS:
+        response = _hedged(call, timeout, after, model, lane, estimate)
+    else:
+        response = call(timeout)
+    _observe(model, time.perf_counter() - t0)
+    return response
+
+
+def create(model: str, messages: list, client=None, lane: str = None):
+    """
+    One chat completion with timeouts, retries, hedging and the breaker applied.
+    Raises ModelUnavailable without calling the provider when the model's circuit
+    is open or the invocation is out of time (judged after any wait for a
+    governor permit), rate_governor.Shed when `lane`'s share of the minute's
+    budget is used up; otherwise the SDK's error.
+    """
+    client = client or openai
+    breaker = breaker_for(model)
+    estimate = rate_governor.estimate_tokens(messages) if lane else 0
+    _count(calls=1)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if not breaker.allow():
+            _count(short_circuited=1)
+            raise ModelUnavailable(f"{model} is failing; circuit open for up to {breaker.open_seconds:.0f}s")
+        ticket = None
+        if lane:
+            # Waiting for the next minute must not eat the time the attempt needs
+            remaining = remaining_seconds()
+            max_wait = None if remaining is None else \
+                min(rate_governor.LANES[lane]["max_wait"], max(remaining - MIN_ATTEMPT_SECONDS, 0))
+            try:
+                ticket = rate_governor.acquire(model, lane, estimate, max_wait=max_wait)
+            except rate_governor.Shed:
+                breaker.release()
+                raise
+        try:
+            timeout = _attempt_timeout()
+        except ModelUnavailable:
+            breaker.release()
+            if ticket:
+                rate_governor.release(ticket)
+            raise
+        try:
+            response = _send(client, model, messages, timeout, lane, estimate)
+        except _RETRYABLE as e:
+            if isinstance(e, openai.RateLimitError):
+                # Our quota running out, not the provider failing
+                breaker.release()
+            else:
+                breaker.failure()
+            if ticket:
+                rate_governor.settle(ticket, 0)
+            delay = random.uniform(0, min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+            remaining = remaining_seconds()
+            if attempt == MAX_ATTEMPTS or (remaining is not None and remaining - delay < MIN_ATTEMPT_SECONDS):
+                _count(failures=1)
+                raise
+            logger.warning(f"{model} attempt {attempt} failed ({type(e).__name__}); retrying in {delay:.2f}s")
+            _count(retries=1)
+            time.sleep(delay)
+            continue
+        except Exception:
+            # Not the provider's health (bad request, auth): no failure counted
+            breaker.release()
+            _count(failures=1)
+            if ticket:
+                rate_governor.settle(ticket, 0)
+            raise
+        breaker.success()
+        if ticket:
+            usage = getattr(response, "usage", None)
+            rate_governor.settle(ticket, getattr(usage, "total_tokens", None) or estimate)
+        return response
+
+
+def get_stats() -> dict:
+    with _lock:
+        stats = dict(STATS)
+        breakers = {m: b.state for m, b in _breakers.items()}
+        models = list(_latencies)
+    stats["breakers"] = breakers
+    stats["p95_ms"] = {m: round(p95(m) * 1000, 1) if p95(m) is not None else None for m in models}
+    return stats
+
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+import openai
+import model_client
+import prompts
+import tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Model cascades per task: models are tried in order (cheapest first) and a
+# response that fails the caller's validator escalates to the next one. The
+# last model's answer is returned even if it fails validation, as before.
+ROUTES = {
+    "extract": os.environ.get("MODEL_ROUTE_EXTRACT", "gpt-4o-mini,chatgpt-4o-latest"),
+    "coaching": os.environ.get("MODEL_ROUTE_COACHING", "gpt-4o-mini,chatgpt-4o-latest"),
+}
+
+# Route -> rate_governor lane; scans are interactive, coaching can wait
+LANES = {"extract": "scan", "coaching": "coaching"}
+
+_lock = threading.Lock()
+MODEL_STATS = {}   # model -> counters
+ROUTE_STATS = {}   # route -> counters
+
+
+def models_for(route: str) -> list:
+    return [m.strip() for m in ROUTES[route].split(",") if m.strip()]
+
+
+def _count_model(model: str, **deltas):
+    with _lock:
+        s = MODEL_STATS.setdefault(model, {"calls": 0, "errors": 0, "rejected": 0, "latency_ms": 0.0,
+                                           "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+        for k, v in deltas.items():
+            s[k] += v
+
+
+def _count_route(route: str, **deltas):
+    with _lock:
+        s = ROUTE_STATS.setdefault(route, {"requests": 0, "escalated": 0})
+        for k, v in deltas.items():
+            s[k] += v
+
+
+def complete(route: str, messages: list, validate=None, client=None, prompt: str = None):
+    """
+    Run the cascade for `route`; returns (content, model). validate(content) -> bool
+    decides whether a non-final model's answer is kept. Errors from a non-final
+    model also escalate; authentication errors and the final model's errors raise.
+    `prompt` names the prompts template the messages were built from, for its token stats.
+    """
+    client = client or openai
+    models = models_for(route)
+    _count_route(route, requests=1)
+    escalated = False
+    for i, model in enumerate(models):
+        final = i == len(models) - 1
+        t0 = time.perf_counter()
+        try:
+            response = model_client.create(model, messages, client=client, lane=LANES.get(route))
+        except openai.AuthenticationError:
+            raise
+        except Exception as e:
+            _count_model(model, calls=1, errors=1, latency_ms=(time.perf_counter() - t0) * 1000)
+            tracing.record("llm", (time.perf_counter() - t0) * 1000, route=route, model=model, error=type(e).__name__)
+            if final:
+                raise
+            logger.warning(f"{route}: {model} failed ({e}); escalating")
+            escalated = True
+            continue
+
+        usage = getattr(response, "usage", None)
+        tokens = {"prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                  "cached_tokens": getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0,
+                  "completion_tokens": getattr(usage, "completion_tokens", 0) or 0}
+        _count_model(model, calls=1, latency_ms=(time.perf_counter() - t0) * 1000, **tokens)
+        tracing.record("llm", (time.perf_counter() - t0) * 1000, route=route, model=model, prompt=prompt, **tokens)
+        if prompt and usage is not None:
+            prompts.record_usage(prompt, usage)
+        content = response.choices[0].message.content
+        if final or validate is None or validate(content):
+            if escalated:
+                _count_route(route, escalated=1)
+            return content, model
+        _count_model(model, rejected=1)
+        logger.info(f"{route}: {model} answer failed validation; escalating")
+        escalated = True
+
+
+def get_stats() -> dict:
+    """Per-model calls, mean latency and tokens; per-route escalation rate; per-prompt tokens."""
+    with _lock:
+        models = {
+            m: dict(s, latency_ms=round(s["latency_ms"], 1),
+                    mean_latency_ms=round(s["latency_ms"] / s["calls"], 1) if s["calls"] else None)
+            for m, s in MODEL_STATS.items()
+        }
+        routes = {
+            r: dict(s, escalation_rate=round(s["escalated"] / s["requests"], 3) if s["requests"] else None)
+            for r, s in ROUTE_STATS.items()
+        }
+    return {"models": models, "routes": routes, "prompts": prompts.get_stats()}
@@ -0,0 +1,162 @@
+import threading
+
+# Versioned prompt templates. Each is a static prefix, byte-identical on every
+# call, plus a tail holding the per-call values, so the provider's prefix cache
+# (and its tokenizer) can reuse everything up to the tail. Message builders put
+# the image between the two: calls for the same card then share prefix + image,
+# which clears the 1024-token minimum for prefix caching. Bump a template's
+# version whenever its text changes; cache keys and token stats include it.
+
+_CARD_LAYOUT = (
+    "This is a photo of a golf scorecard.\n\n"
+    "• The first column contains player names.\n"
+    "• The next 9 columns (cells 1–9) contain scores for holes 1 through 9, in order.\n"
+    "• The next cell may be the total for holes 1–9 (you can ignore it).\n"
+    "• There may also be 1 or 2 blank cells following the total — ignore those as well.\n"
+    "• The next numeric cell after any blanks should be treated as hole 10.\n"
+    "• The final 9 numeric cells (cells 10–18) contain scores for holes 10 through 18.\n\n"
+)
+
+_SCORE_RULES = (
+    "Some important rules:\n\n"
+    "- Each score must be treated independently, even if there are multiple identical scores in a row (e.g. \"4, 4, 4\"). Do not skip, merge, or assume duplicates are an error.\n"
+    "- If the same digit appears multiple times, return each one separately in the correct order.\n"
+    "- If a score is unreadable, unclear, or missing, set it to -1 in the output.\n"
+)
+
+
+class PromptTemplate:
+    def __init__(self, name: str, version: str, prefix: str, tail: str = ""):
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.tail_format = tail
+
+    def tail(self, **variables) -> str:
+        return self.tail_format.format(**variables)
+
+    def render(self, **variables) -> str:
+        """The whole prompt as one string (prefix, then tail), for text-only messages."""
+        return self.prefix + self.tail(**variables)
+
+
+_REGISTRY = {}
+_lock = threading.Lock()
+STATS = {}   # "name@version" -> token counters
+
+
+def register(name: str, version: str, prefix: str, tail: str = "") -> PromptTemplate:
+    """Add a template; the last version registered under a name is the current one."""
+    template = PromptTemplate(name, version, prefix, tail)
+    _REGISTRY[name] = template
+    return template
+
+
+def get(name: str) -> PromptTemplate:
+    return _REGISTRY[name]
+
+
+def version(name: str) -> str:
+    return _REGISTRY[name].version
+
+
+def vision_messages(name: str, image_url: str, **variables) -> list:
+    """Static prefix, then the image, then the tail (if the template has one)."""
+    template = get(name)
+    content = [
+        {"type": "text", "text": template.prefix},
+        {"type": "image_url", "image_url": {"url": image_url}},
+    ]
+    tail = template.tail(**variables)
+    if tail:
+        content.append({"type": "text", "text": tail})
+    return [{"role": "user", "content": content}]
+
+
+def text_messages(name: str, **variables) -> list:
+    return [{"role": "user", "content": get(name).render(**variables)}]
+
+
+def record_usage(name: str, usage):
+    """Add one call's prompt / cached / completion tokens to the template's counters."""
+    template = get(name)
+    details = getattr(usage, "prompt_tokens_details", None)
+    with _lock:
+        s = STATS.setdefault(f"{name}@{template.version}", {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                                                            "completion_tokens": 0})
+        s["calls"] += 1
+        s["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        s["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+        s["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+def get_stats() -> dict:
+    """Per template version: token totals and the share of prompt tokens served from the provider cache."""
+    with _lock:
+        return {
+            key: dict(s, cached_ratio=round(s["cached_tokens"] / s["prompt_tokens"], 3) if s["prompt_tokens"] else None)
+            for key, s in STATS.items()
+        }
+
+
+# ---------------------------
+# Templates
+# ---------------------------
+
+# Per-player extraction (player mode and the card-mode fallback). scores-v2 had
+# the name in the middle of the instructions; v3 names the player at the end.
+register(
+    "player_scores", "scores-v3",
+    _CARD_LAYOUT +
+    "Please extract only the scores from the row where the first column contains the player name given "
+    "after the image.\n"
+    "Ignore all other names and rows. Do not infer values from similar names. Do not return partial rows or best guesses.\n\n"
+    + _SCORE_RULES +
+    "- Do not include the total column or any summary values in the output.\n\n"
+    "Return the scores for the player as a JSON object with string keys for each hole (from \"1\" to \"18\") and integer values.\n\n"
+    "**Example output format:**\n"
+    "```json\n"
+    "{\n"
+    "  \"1\": 4,\n"
+    "  \"2\": 4,\n"
+    "  \"3\": 4,\n"
+    "  \"4\": 2,\n"
+    "  \"5\": 3,\n"
+    "  ...\n"
+    "  \"18\": 5\n"
+    "}```",
+    "Player name: {first_name}",
+)
+
+# Whole card, every player row in one structured response; no per-call values.
+register(
+    "card_scores", "card-v2",
+    _CARD_LAYOUT +
+    "Please extract the scores for every player row on the card. Skip rows that are for par, handicap, "
+    "yardage or hole numbers, and rows without a player name.\n\n"
+    + _SCORE_RULES +
+    "- Do not include the total columns in \"scores\"; report them separately as \"out\" (holes 1–9) "
+    "and \"in\" (holes 10–18) exactly as written, or null when the card has no such total.\n"
+    "- Copy each player name exactly as written on the card.\n\n"
+    "Return a JSON object with a \"players\" list. Each entry has the player \"name\", a \"scores\" "
+    "object with string keys for each hole (from \"1\" to \"18\") and integer values, and \"out\" and \"in\".\n\n"
+    "**Example output format:**\n"
+    "```json\n"
+    "{\n"
+    "  \"players\": [\n"
+    "    {\"name\": \"Mike\", \"scores\": {\"1\": 4, \"2\": 5, ..., \"18\": 5}, \"out\": 42, \"in\": 44},\n"
+    "    {\"name\": \"Sarah\", \"scores\": {\"1\": 3, \"2\": 4, ..., \"18\": 6}, \"out\": null, \"in\": null}\n"
+    "  ]\n"
+    "}```",
+)
+
+# Coaching tips from a player's recent rounds at one course (analyzeCoursePerformance)
+register(
+    "coaching", "coaching-v1",
+    "You are a golf coach helping a recreational golfer.\n\n"
+    "Using the par values for the course and the player's recent rounds given below, give 3 personalized "
+    "tips to help the player improve their game.\n\n",
+    "Here are the par values for the course:\n{pars}\n\n"
+    "And here are the player's last {round_count} rounds of scores:\n{scores}",
+)
+
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from botocore.exceptions import ClientError
+import aws_clients
+import tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Requests- and tokens-per-minute budgets for the OpenAI key. Each model gets
+# one bucket per clock minute, refilled when the minute rolls over; admission
+# is a single conditional atomic ADD on that bucket in DynamoDB (TTL attribute
+# "expiresAt"), so the scan and coaching handlers in every container draw on
+# one budget and concurrent admissions can never overfill it. That holds only
+# with the DynamoDB store, the default: SG_RATE_STORE=memory keeps the buckets
+# in-process, which governs nothing beyond one container and is meant for
+# tests. A Governor can be built on any store; instances sharing a store share
+# its budgets.
+RATE_TABLE_NAME = os.environ.get("SG_RATE_TABLE", "sg_rate_governor")
+RATE_STORE = os.environ.get("SG_RATE_STORE", "dynamodb")
+
+# model -> {"rpm", "tpm"}; OpenAI enforces its limits per model. Set these a
+# little under the organisation's limits so 429s stay rare.
+DEFAULT_BUDGET = {"rpm": 500, "tpm": 200000}
+BUDGETS = json.loads(os.environ.get("OPENAI_BUDGETS", "{}"))
+
+# Priority lanes: the share of each minute's budget a lane may fill, and how
+# long it may wait for the next minute when its share is used up. Coaching
+# stops at 60% so the rest of a burst minute is kept for interactive scans.
+LANES = {
+    "scan": {"share": 1.0, "max_wait": 5.0},
+    "coaching": {"share": 0.6, "max_wait": 0.0},
+}
+
+# Token estimate reserved before a call (settled against real usage after)
+IMAGE_TOKENS = 765        # one high-detail image tile set at ~1024 px
+COMPLETION_TOKENS = 400
+_WINDOW_SECONDS = 60
+
+
+class Shed(Exception):
+    """The lane's budget for this minute is used up; retry after retry_after seconds."""
+
+    def __init__(self, lane: str, model: str, retry_after: float):
+        super().__init__(f"{lane} requests to {model} shed: minute budget used, retry in {retry_after:.0f}s")
+        self.lane = lane
+        self.model = model
+        self.retry_after = retry_after
+
+
+# ---------------------------
+# Counter stores
+# ---------------------------
+
+class MemoryCounterStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, requests: int, tokens: int, limits: tuple = None) -> bool:
+        """Add to the bucket; with limits (rpm, tpm), only if it stays within them."""
+        with self._lock:
+            used = self._buckets.setdefault(key, [0, 0])
+            if limits and (used[0] + requests > limits[0] or used[1] + tokens > limits[1]):
+                return False
+            used[0] += requests
+            used[1] += tokens
+            # Buckets from past minutes are never read again
+            minute = int(key.rsplit("|", 1)[1])
+            for old in [k for k in self._buckets if int(k.rsplit("|", 1)[1]) < minute]:
+                del self._buckets[old]
+            return True
+
+    def get(self, key: str) -> tuple:
+        """(requests, tokens) used in the bucket so far."""
+        with self._lock:
+            return tuple(self._buckets.get(key, (0, 0)))
+
+
+class DynamoCounterStore:
+    def __init__(self, table_name: str):
+        self._table_name = table_name
+
+    def add(self, key: str, requests: int, tokens: int, limits: tuple = None) -> bool:
+        kwargs = {}
+        if limits:
+            kwargs = {
+                "ConditionExpression": "attribute_not_exists(requests) OR (requests <= :rmax AND tokens <= :tmax)",
+                "ExpressionAttributeValues": {":rmax": limits[0] - requests, ":tmax": limits[1] - tokens},
+            }
+        values = dict(kwargs.pop("ExpressionAttributeValues", {}),
+                      **{":r": requests, ":t": tokens, ":exp": int(time.time()) + 2 * _WINDOW_SECONDS})
+        try:
+            aws_clients.table(self._table_name).update_item(
+                Key={"bucket": key},
+                UpdateExpression="ADD requests :r, tokens :t SET expiresAt = if_not_exists(expiresAt, :exp)",
+                ExpressionAttributeValues=values,
+                **kwargs,
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def get(self, key: str) -> tuple:
+        item = aws_clients.table(self._table_name).get_item(Key={"bucket": key}, ConsistentRead=True).get("Item") or {}
+        return int(item.get("requests", 0)), int(item.get("tokens", 0))
+
+
+def make_store(kind: str = RATE_STORE):
+    """The counter store SG_RATE_STORE names: "dynamodb" (shared) or "memory" (this process only)."""
+    if kind == "dynamodb":
+        return DynamoCounterStore(RATE_TABLE_NAME)
+    if kind == "memory":
+        return MemoryCounterStore()
+    raise ValueError(f"Unknown SG_RATE_STORE {kind!r}; expected dynamodb or memory")
+
+
+# ---------------------------
+# Admission
+# ---------------------------
+
+def budget_for(model: str) -> dict:
+    return dict(DEFAULT_BUDGET, **BUDGETS.get(model, {}))
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough reservation: ~4 characters per text token, a fixed cost per image, a typical answer."""
+    chars, images = 0, 0
+    for message in messages:
+        content = message.get("content")
+        for part in content if isinstance(content, list) else [{"type": "text", "text": content or ""}]:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text") or "")
+    return chars // 4 + images * IMAGE_TOKENS + COMPLETION_TOKENS
+
+
+def _bucket_key(model: str, now: float) -> str:
+    return f"{model}|{int(now // _WINDOW_SECONDS)}"
+
+
+class Governor:
+    """
+    Admission against one counter store. `budgets` (model -> {"rpm", "tpm"})
+    defaults to OPENAI_BUDGETS; counts in get_stats() are this instance's own.
+    """
+
+    def __init__(self, store, budgets: dict = None):
+        self.store = store
+        self.budgets = budgets
+        self.stats = {}   # lane -> counters
+        self._lock = threading.Lock()
+
+    def budget_for(self, model: str) -> dict:
+        if self.budgets is None:
+            return budget_for(model)
+        return dict(DEFAULT_BUDGET, **self.budgets.get(model, {}))
+
+    def _count(self, lane: str, **deltas):
+        with self._lock:
+            s = self.stats.setdefault(lane, {"admitted": 0, "waited": 0, "shed": 0, "store_errors": 0})
+            for k, v in deltas.items():
+                s[k] += v
+
+    def acquire(self, model: str, lane: str, tokens: int, max_wait: float = None):
+        """
+        Reserve one request and `tokens` in the current minute for `lane`, waiting
+        for the next minute if the lane allows it (at most max_wait, default the
+        lane's). Returns a ticket for settle(); raises Shed when refused. If the
+        counter store is unreachable the call is admitted (fail open).
+        """
+        config = LANES[lane]
+        budget = self.budget_for(model)
+        limits = (int(budget["rpm"] * config["share"]), int(budget["tpm"] * config["share"]))
+        wait_budget = config["max_wait"] if max_wait is None else max_wait
+        t0 = time.perf_counter()
+        waited = False
+        while True:
+            now = time.time()
+            key = _bucket_key(model, now)
+            try:
+                admitted = self.store.add(key, 1, tokens, limits)
+            except Exception as e:
+                logger.warning(f"Rate governor store unavailable, admitting {lane} request: {e}")
+                self._count(lane, store_errors=1, admitted=1)
+                return (key, tokens)
+            if admitted:
+                self._count(lane, admitted=1, waited=int(waited))
+                tracing.record("governor", (time.perf_counter() - t0) * 1000, lane=lane, model=model, admitted=1)
+                return (key, tokens)
+
+            retry_after = _WINDOW_SECONDS - now % _WINDOW_SECONDS
+            if waited or retry_after > wait_budget:
+                self._count(lane, shed=1)
+                tracing.record("governor", (time.perf_counter() - t0) * 1000, lane=lane, model=model, shed=1)
+                logger.warning(f"Shedding {lane} request to {model}: {limits[0]} rpm / {limits[1]} tpm share used")
+                raise Shed(lane, model, retry_after)
+            waited = True
+            time.sleep(retry_after + 0.01)
+
+    def settle(self, ticket, used_tokens: int):
+        """Correct the ticket's minute by the difference between reserved and actual tokens."""
+        key, reserved = ticket
+        if used_tokens == reserved:
+            return
+        try:
+            self.store.add(key, 0, used_tokens - reserved)
+        except Exception as e:
+            logger.warning(f"Rate governor settle failed: {e}")
+
+    def release(self, ticket):
+        """Give back a ticket whose request was never sent: its request and all its reserved tokens."""
+        key, reserved = ticket
+        try:
+            self.store.add(key, -1, -reserved)
+        except Exception as e:
+            logger.warning(f"Rate governor release failed: {e}")
+
+    def usage(self, model: str, now: float = None) -> dict:
+        """The current minute's requests and tokens for `model` against its budget."""
+        requests, tokens = self.store.get(_bucket_key(model, time.time() if now is None else now))
+        return dict(self.budget_for(model), requests=requests, tokens=tokens)
+
+    def get_stats(self) -> dict:
+        """Per-lane admitted / waited / shed counts and the shed rate."""
+        with self._lock:
+            return {
+                lane: dict(s, shed_rate=round(s["shed"] / (s["admitted"] + s["shed"]), 3)
+                           if s["admitted"] + s["shed"] else None)
+                for lane, s in self.stats.items()
+            }
+
+
+# The process's governor, which model_client goes through
+_governor = Governor(make_store())
+
+
+def acquire(model: str, lane: str, tokens: int, max_wait: float = None):
+    return _governor.acquire(model, lane, tokens, max_wait)
+
+
+def settle(ticket, used_tokens: int):
+    _governor.settle(ticket, used_tokens)
+
+
+def release(ticket):
+    _governor.release(ticket)
+
+
+def get_stats() -> dict:
+    return _governor.get_stats()
+
+
+if __name__ == "__main__":
+    # python rate_governor.py [model ...]: this minute's use of each model's budget
+    # (default: every model routed by model_router), read from the configured store
+    import model_router
+
+    models = sys.argv[1:] or sorted({m for route in model_router.ROUTES for m in model_router.models_for(route)})
+    print(json.dumps({model: _governor.usage(model) for model in models}, indent=2))
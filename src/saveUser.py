@@ -1,5 +1,6 @@
 import json
-import boto3
+import aws_clients
+import tracing
 import logging
 from decimal import Decimal
 from botocore.exceptions import ClientError
@@ -16,8 +17,8 @@ ALLOWED_ORIGINS = [
 
 
 # Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('sg_users')
+dynamodb = aws_clients.dynamodb()
+users_table = aws_clients.table('sg_users')
 users_table.scan(Limit=1)  # Test the connection
 logger.info("Connected to sg_users table")
 
@@ -171,6 +172,7 @@ def save_user_profile(event, origin):
         }
 
 
+@tracing.traced
 def lambda_handler(event, context):
     """Main AWS Lambda handler"""
 
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+import aws_clients
+import tracing
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Asynchronous scan jobs. With SG_SCAN_JOBS_QUEUE_URL set, jobs go to SQS and
+# are run by the SQS-triggered invocation of the scan Lambda (handle_sqs_event)
+# with state in DynamoDB (TTL attribute "expiresAt"). Async jobs need both: the
+# worker and the polling GET may be other containers. An in-process pool would
+# freeze with the Lambda once the 202 went out, so it only runs jobs when
+# SG_SCAN_JOBS_LOCAL_WORKERS=1 (local runs, never in Lambda); otherwise
+# ASYNC_ENABLED is False and callers serve async requests synchronously.
+# SG_SCAN_JOBS_STORE=dynamodb shares state across containers without a queue
+# (upload-triggered runs execute inline and only need the shared state).
+# Jobs record the Cognito sub that submitted them; reads on behalf of a caller
+# (get_job with owner) only see that caller's jobs.
+JOBS_TABLE_NAME = os.environ.get("SG_SCAN_JOBS_TABLE", "sg_scan_jobs")
+QUEUE_URL = os.environ.get("SG_SCAN_JOBS_QUEUE_URL")
+JOB_STORE = os.environ.get("SG_SCAN_JOBS_STORE", "dynamodb" if QUEUE_URL else "memory")
+WORKER_CONCURRENCY = int(os.environ.get("SCAN_JOBS_CONCURRENCY", "4"))
+JOB_TTL_SECONDS = 24 * 3600
+MAX_WAIT_SECONDS = 20  # long-poll cap, well inside the API Gateway 29 s limit
+LOCAL_WORKERS = os.environ.get("SG_SCAN_JOBS_LOCAL_WORKERS") == "1"
+ASYNC_ENABLED = (bool(QUEUE_URL) and JOB_STORE == "dynamodb") or LOCAL_WORKERS
+
+FINAL_STATES = ("succeeded", "failed")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def decimal_to_native(obj):
+    """ Recursively convert Decimal to int or float """
+    if isinstance(obj, list):
+        return [decimal_to_native(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: decimal_to_native(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    else:
+        return obj
+
+
+# ---------------------------
+# Job state
+# ---------------------------
+
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict) -> bool:
+        with self._lock:
+            if job["jobId"] in self._jobs:
+                return False
+            self._jobs[job["jobId"]] = json.loads(json.dumps(job))
+            return True
+
+    def update(self, job_id: str, status: str, stage: str, work_stages: dict = None, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = status
+            job["stages"].update(work_stages or {})
+            job["stages"][stage] = _now_ms()
+            job.update(json.loads(json.dumps(fields)))
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+
+class DynamoJobStore:
+    def __init__(self, table_name: str):
+        self._table_name = table_name
+
+    def _table(self):
+        return aws_clients.table(self._table_name)
+
+    def create(self, job: dict) -> bool:
+        item = dict(job, expiresAt=int(time.time()) + JOB_TTL_SECONDS)
+        try:
+            self._table().put_item(Item=item, ConditionExpression="attribute_not_exists(jobId)")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def update(self, job_id: str, status: str, stage: str, work_stages: dict = None, **fields):
+        names = {"#status": "status", "#stages": "stages"}
+        values = {":status": status}
+        sets = ["#status = :status"]
+        for n, (k, v) in enumerate(dict(work_stages or {}, **{stage: _now_ms()}).items()):
+            names[f"#s{n}"] = k
+            values[f":s{n}"] = v
+            sets.append(f"#stages.#s{n} = :s{n}")
+        for n, (k, v) in enumerate(fields.items()):
+            names[f"#f{n}"] = k
+            values[f":f{n}"] = v
+            sets.append(f"#f{n} = :f{n}")
+        self._table().update_item(
+            Key={"jobId": job_id},
+            UpdateExpression="SET " + ", ".join(sets),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+    def get(self, job_id: str):
+        item = self._table().get_item(Key={"jobId": job_id}, ConsistentRead=True).get("Item")
+        if not item:
+            return None
+        item.pop("expiresAt", None)
+        # DynamoDB hands numbers back as Decimal (stage times, error statusCode, result fields)
+        return decimal_to_native(item)
+
+
+_store = DynamoJobStore(JOBS_TABLE_NAME) if JOB_STORE == "dynamodb" else MemoryJobStore()
+_local_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _local_pool
+    if _local_pool is None:
+        with _pool_lock:
+            if _local_pool is None:
+                _local_pool = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY, thread_name_prefix="scan-job")
+    return _local_pool
+
+
+# ---------------------------
+# Producer / worker
+# ---------------------------
+
+def submit(payload: dict, run, owner: str = None) -> str:
+    """
+    Record a queued job and hand it to the worker; returns the job id at once.
+    run(payload, stages) does the work, may add its own stage timestamps
+    (epoch ms) to `stages`, and returns a JSON-serialisable result. `owner` is
+    the caller allowed to read the job back. Raises RuntimeError unless
+    ASYNC_ENABLED.
+    """
+    if not ASYNC_ENABLED:
+        raise RuntimeError("Async scan jobs need SG_SCAN_JOBS_QUEUE_URL and SG_SCAN_JOBS_STORE=dynamodb")
+    job_id = uuid.uuid4().hex
+    _store.create({"jobId": job_id, "status": "queued", "payload": payload, "owner": owner,
+                   "stages": {"queued": _now_ms()}})
+    if QUEUE_URL:
+        aws_clients.sqs().send_message(QueueUrl=QUEUE_URL,
+                                       MessageBody=json.dumps({"jobId": job_id, "payload": payload}))
+    else:
+        _pool().submit(execute, job_id, payload, run)
+    logger.info(f"Queued scan job {job_id}")
+    return job_id
+
+
+def run_inline(job_id: str, payload: dict, run) -> bool:
+    """
+    Create job_id and run it in the calling thread (upload-triggered runs).
+    Returns False without running if the job already exists, e.g. a redelivered event.
+    The job has no owner, so no caller can read it through get_job(owner=...).
+    """
+    if not _store.create({"jobId": job_id, "status": "queued", "payload": payload, "stages": {"queued": _now_ms()}}):
+        logger.info(f"Scan job {job_id} already exists; skipping")
+        return False
+    execute(job_id, payload, run)
+    return True
+
+
+def execute(job_id: str, payload: dict, run):
+    """Run one job, recording running/succeeded/failed with per-stage timestamps."""
+    _store.update(job_id, "running", "started")
+    stages = {}
+    try:
+        result = run(payload, stages)
+    except Exception as e:
+        logger.error(f"Scan job {job_id} failed: {e}")
+        error = getattr(e, "body", None) or {"status": "error", "message": "Error occurred"}
+        _store.update(job_id, "failed", "finished", work_stages=stages,
+                      error=dict(error, statusCode=getattr(e, "status_code", 500)))
+        return
+    _store.update(job_id, "succeeded", "finished", work_stages=stages, result=result)
+
+
+def handle_sqs_event(event, run) -> dict:
+    """
+    SQS-triggered worker: runs the batch on up to WORKER_CONCURRENCY threads and
+    reports undecodable messages as batch item failures so only they are retried.
+    Job failures are recorded on the job, not retried.
+    """
+    failures = []
+
+    def one(record):
+        try:
+            message = json.loads(record["body"])
+        except (KeyError, ValueError) as e:
+            logger.error(f"Bad scan job message {record.get('messageId')}: {e}")
+            return record.get("messageId")
+        try:
+            execute(message["jobId"], message["payload"], run)
+        except Exception as e:
+            # Job store unreachable: let SQS redeliver the message
+            logger.error(f"Scan job {message.get('jobId')} could not be recorded: {e}")
+            return record.get("messageId")
+        return None
+
+    records = event.get("Records") or []
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKER_CONCURRENCY, len(records)))) as pool:
+        futures = [tracing.run_in_context(pool, one, record) for record in records]
+        for future in futures:
+            failed_id = future.result()
+            if failed_id:
+                failures.append({"itemIdentifier": failed_id})
+    return {"batchItemFailures": failures}
+
+
+# ---------------------------
+# Upload events
+# ---------------------------
+
+def upload_job_id(bucket: str, key: str) -> str:
+    """Deterministic job id for the speculative run of one uploaded object."""
+    return "upload-" + hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()[:32]
+
+
+def uploaded_objects(event):
+    """Yield (bucket, key) for each ObjectCreated record of an S3 notification event."""
+    for record in event.get("Records") or []:
+        if record.get("eventSource") != "aws:s3" or not record.get("eventName", "").startswith("ObjectCreated"):
+            continue
+        s3 = record["s3"]
+        # Keys arrive URL-encoded, with spaces as '+'
+        yield s3["bucket"]["name"], unquote_plus(s3["object"]["key"])
+
+
+def s3_put_event(bucket: str, key: str, size: int = 0) -> dict:
+    """Local stand-in for the S3 ObjectCreated:Put notification the upload trigger receives."""
+    return {"Records": [{
+        "eventVersion": "2.1",
+        "eventSource": "aws:s3",
+        "awsRegion": aws_clients.REGION,
+        "eventTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "eventName": "ObjectCreated:Put",
+        "s3": {
+            "bucket": {"name": bucket, "arn": f"arn:aws:s3:::{bucket}"},
+            "object": {"key": key.replace(" ", "+"), "size": size},
+        },
+    }]}
+
+
+# ---------------------------
+# Results
+# ---------------------------
+
+def get_job(job_id: str, wait_seconds: float = 0, owner: str = None):
+    """
+    Job state, or None if unknown. With wait_seconds the call long-polls
+    (capped at MAX_WAIT_SECONDS) until the job reaches a final state. With
+    owner, a job submitted by anyone else reads as unknown.
+    """
+    deadline = time.time() + min(max(wait_seconds, 0), MAX_WAIT_SECONDS)
+    delay = 0.1
+    while True:
+        job = _store.get(job_id)
+        if job is not None and owner is not None and job.get("owner") != owner:
+            return None
+        if job is None or job["status"] in FINAL_STATES or time.time() + delay > deadline:
+            if job is not None:
+                job.pop("payload", None)
+                job.pop("owner", None)
+            return job
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
@@ -0,0 +1,367 @@
+import hashlib
+import json
+import logging
+import os
+import statistics
+import numpy as np
+from PIL import Image, ImageFont, ImageDraw
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# CPU-only fast path for printed-grid scorecards: find the ruled grid from ink
+# projection profiles, then read each hole cell with a small linear softmax
+# digit classifier. Every hole gets a confidence; the caller escalates to the
+# remote model unless all 18 clear CONFIDENCE_THRESHOLD.
+#
+# Player names are not read (that needs handwriting OCR), so nothing ties a row
+# to first_name: a card is only accepted when exactly one row could be a
+# player's. Printed hole-number, yardage and handicap rows are recognised from
+# their values and dropped. A par row can't be told from a player who only
+# scored 3s, 4s and 5s, so a card with such a row is left to the model. The one
+# row must also pass the OUT/IN check where those cells are readable.
+CONFIDENCE_THRESHOLD = float(os.environ.get("LOCAL_CONFIDENCE_THRESHOLD", "0.9"))
+DIGIT_MODEL_PATH = os.environ.get("DIGIT_MODEL_PATH", os.path.join(os.path.dirname(__file__), "digit_model.npz"))
+
+_LINE_FRACTION = 0.5    # a grid line is a row/column at least this dark across
+_MIN_CELL_PX = 8
+_EMPTY_INK_FRACTION = 0.01
+_FEATURE_PX = 16
+
+
+# ---------------------------
+# Grid detection
+# ---------------------------
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    cum = np.cumsum(hist)
+    cum_mean = np.cumsum(hist * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (cum_mean[-1] * cum - cum_mean * total) ** 2 / (cum * (total - cum))
+    return int(np.nanargmax(between))
+
+
+def _line_centers(profile: np.ndarray, length: int) -> list:
+    """Centers of runs where the ink count reaches _LINE_FRACTION of the line length."""
+    on = profile >= _LINE_FRACTION * length
+    centers, start = [], None
+    for i, v in enumerate(np.append(on, False)):
+        if v and start is None:
+            start = i
+        elif not v and start is not None:
+            centers.append((start + i - 1) // 2)
+            start = None
+    return centers
+
+
+def _spans(centers: list) -> list:
+    return [(a, b) for a, b in zip(centers, centers[1:]) if b - a >= _MIN_CELL_PX]
+
+
+def detect_grid(ink: np.ndarray):
+    """(row spans, column spans) between detected grid lines, or None without a usable grid."""
+    h, w = ink.shape
+    rows = _spans(_line_centers(ink.sum(axis=1), w))
+    cols = _spans(_line_centers(ink.sum(axis=0), h))
+    if len(rows) < 1 or len(cols) < 20:
+        return None
+    return rows, cols
+
+
+def hole_columns(cols: list) -> list:
+    """
+    The narrow columns after the name column: holes 1-9, OUT, then holes 10-18
+    (same layout the model prompt describes; blank spacer cells are skipped per row).
+    """
+    widths = [b - a for a, b in cols]
+    typical = statistics.median(widths)
+    start = next((i for i, wd in enumerate(widths) if wd <= typical * 1.35), None)
+    narrow = []
+    for span, wd in zip(cols[start:], widths[start:]):
+        if wd > typical * 1.35:
+            break
+        narrow.append(span)
+    return narrow
+
+
+# ---------------------------
+# Digit classifier
+# ---------------------------
+
+def trim_border(cell: np.ndarray) -> np.ndarray:
+    """Drop the cell margin, where the grid lines are."""
+    h, w = cell.shape
+    my, mx = max(2, h // 8), max(2, w // 8)
+    return cell[my:h - my, mx:w - mx]
+
+
+def cell_features(cell: np.ndarray, trim: bool = True):
+    """Ink bbox of a cell, scaled into _FEATURE_PX square; None if empty."""
+    if trim:
+        cell = trim_border(cell)
+    if cell.size == 0 or cell.mean() < _EMPTY_INK_FRACTION:
+        return None
+    ys, xs = np.nonzero(cell)
+    crop = cell[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    side = max(crop.shape)
+    square = np.zeros((side, side), dtype=np.uint8)
+    oy, ox = (side - crop.shape[0]) // 2, (side - crop.shape[1]) // 2
+    square[oy:oy + crop.shape[0], ox:ox + crop.shape[1]] = crop * 255
+    scaled = Image.fromarray(square).resize((_FEATURE_PX, _FEATURE_PX), Image.BILINEAR)
+    x = np.asarray(scaled, dtype=np.float32).ravel() / 255.0
+    norm = np.linalg.norm(x)
+    return x / norm if norm else None
+
+
+def _split_two_digits(cell: np.ndarray):
+    """
+    Split a two-digit score at the blank column between the digits, or at the
+    thinnest column of a wide blob; None if it looks like one digit.
+    """
+    ys, xs = np.nonzero(cell)
+    if xs.size == 0:
+        return None
+    x0, x1 = xs.min(), xs.max() + 1
+    y0, y1 = ys.min(), ys.max() + 1
+    profile = cell[y0:y1, x0:x1].sum(axis=0)
+    gaps = np.flatnonzero(profile == 0)
+    if gaps.size:
+        cut = x0 + int(gaps[gaps.size // 2])
+    elif (x1 - x0) >= 1.1 * (y1 - y0):
+        third = (x1 - x0) // 3
+        cut = x0 + third + int(np.argmin(profile[third:2 * third]))
+    else:
+        return None
+    return cell[:, :cut], cell[:, cut:]
+
+
+class DigitClassifier:
+    """Linear softmax over cell_features; weights (10, F) and bias (10,)."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+
+    @classmethod
+    def load(cls, path: str = None):
+        path = path or DIGIT_MODEL_PATH
+        if os.path.exists(path):
+            data = np.load(path)
+            return cls(data["weights"], data["bias"])
+        logger.info("No trained digit model found; using rendered-font prototypes")
+        return cls.from_font()
+
+    @classmethod
+    def from_font(cls, temperature: float = 40.0):
+        """Nearest-prototype classifier over rendered digits, written as a linear layer."""
+        samples = []
+        for size in (20, 28, 36):
+            font = ImageFont.load_default(size=size)
+            for digit in range(10):
+                img = Image.new("L", (size * 2, size * 2), 0)
+                ImageDraw.Draw(img).text((size // 2, size // 4), str(digit), fill=255, font=font)
+                samples.append((cell_features(np.asarray(img) > 127), digit))
+        X = np.stack([x for x, _ in samples])
+        y = np.array([d for _, d in samples])
+        protos = np.stack([X[y == d].mean(axis=0) for d in range(10)])
+        return cls(temperature * protos, -temperature * 0.5 * (protos ** 2).sum(axis=1))
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: np.ndarray, epochs: int = 300, lr: float = 0.5, l2: float = 1e-4):
+        """Full-batch gradient descent on cross-entropy, starting from the font prototypes."""
+        model = cls.from_font()
+        W, b = model.weights.copy(), model.bias.copy()
+        onehot = np.eye(10, dtype=np.float32)[y]
+        for _ in range(epochs):
+            p = _softmax(X @ W.T + b)
+            grad = (p - onehot) / len(X)
+            W -= lr * (grad.T @ X + l2 * W)
+            b -= lr * grad.sum(axis=0)
+        return cls(W, b)
+
+    def save(self, path: str = None):
+        np.savez(path or DIGIT_MODEL_PATH, weights=self.weights, bias=self.bias)
+
+    @property
+    def digest(self) -> str:
+        """Short hash of the weights; changes whenever the model is retrained."""
+        return hashlib.sha256(self.weights.tobytes() + self.bias.tobytes()).hexdigest()[:12]
+
+    def predict(self, X: np.ndarray):
+        """(digits, confidences) for a batch of feature rows."""
+        p = _softmax(X @ self.weights.T + self.bias)
+        return p.argmax(axis=1), p.max(axis=1)
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+# ---------------------------
+# Backend
+# ---------------------------
+
+class LocalGridBackend:
+    """Extraction backend (see extractScores.ExtractionBackend) for clean printed-grid cards."""
+
+    name = "local-grid"
+
+    def __init__(self, classifier: DigitClassifier = None):
+        self._classifier = classifier
+
+    @property
+    def classifier(self) -> DigitClassifier:
+        if self._classifier is None:
+            self._classifier = DigitClassifier.load()
+        return self._classifier
+
+    @property
+    def version(self) -> str:
+        """Grid reader revision plus the digit model's digest, so retraining retires cached reads."""
+        return f"grid-v1+{self.classifier.digest}"
+
+    def read_cell(self, cell: np.ndarray):
+        """(score, confidence) for one cell; (None, 0.0) when empty or unreadable."""
+        cell = trim_border(cell)
+        parts = _split_two_digits(cell) or (cell,)
+        feats = [cell_features(p, trim=False) for p in parts]
+        if any(f is None for f in feats):
+            return None, 0.0
+        digits, conf = self.classifier.predict(np.stack(feats))
+        value = int("".join(str(d) for d in digits))
+        return value, float(np.prod(conf))
+
+    def read_rows(self, image):
+        """
+        [{"scores", "confidence", "out", "in"}] for every grid row with ink in at
+        least 15 hole cells; out/in are the total cells' values (None if unreadable).
+        """
+        gray = np.asarray(image.convert("L"))
+        ink = gray < otsu_threshold(gray)
+        grid = detect_grid(ink)
+        if grid is None:
+            return []
+        rows, cols = grid
+        holes = hole_columns(cols)
+        out = []
+        for y0, y1 in rows:
+            cells = [ink[y0:y1, x0:x1] for x0, x1 in holes]
+            filled = [cell_features(c) is not None for c in cells]
+            if sum(filled) < 15:
+                continue
+            # holes 1-9, OUT, up to two blank spacers, holes 10-18
+            back = 10
+            while back < len(cells) and not filled[back] and back < 12:
+                back += 1
+            picked = cells[:9] + cells[back:back + 9]
+            if len(picked) < 18:
+                continue
+            scores, confidence = {}, {}
+            for hole, cell in enumerate(picked, start=1):
+                value, conf = self.read_cell(cell)
+                scores[str(hole)] = -1 if value is None else value
+                confidence[str(hole)] = round(conf, 3)
+            totals = [self.read_cell(cells[i]) if i < len(cells) else (None, 0.0) for i in (9, back + 9)]
+            out.append({"scores": scores, "confidence": confidence,
+                        "out": totals[0][0] if totals[0][1] >= CONFIDENCE_THRESHOLD else None,
+                        "in": totals[1][0] if totals[1][1] >= CONFIDENCE_THRESHOLD else None})
+        return out
+
+    def extract(self, image, first_name: str):
+        """
+        The card's only player row as {"scores", "confidence"}, or None when the
+        card isn't one this backend can settle: more than one row that could be
+        a player's (names aren't read, so first_name can't pick between them),
+        or a row that could be par.
+        """
+        candidates = [r for r in self.read_rows(image) if not is_reference_row(r["scores"])]
+        if len(candidates) != 1:
+            if len(candidates) > 1:
+                logger.info(f"Local read found {len(candidates)} possible player rows; leaving the card to the model")
+            return None
+        row = candidates[0]
+        if could_be_par(row["scores"]):
+            return None
+        values = [row["scores"][str(h)] for h in range(1, 19)]
+        if (row["out"] is not None and row["out"] != sum(values[:9])) or \
+                (row["in"] is not None and row["in"] != sum(values[9:])):
+            logger.info("Local read failed the OUT/IN check")
+            return None
+        return {"scores": row["scores"], "confidence": row["confidence"]}
+
+
+def is_reference_row(scores: dict) -> bool:
+    """Printed rows no player could have scored: hole numbers, or yardage/handicap (values past 15)."""
+    values = [scores[str(h)] for h in range(1, 19)]
+    if sum(v == h for h, v in enumerate(values, start=1)) >= 15:
+        return True
+    return any(v > 15 for v in values)
+
+
+def could_be_par(scores: dict) -> bool:
+    """Only 3s, 4s and 5s: the par row, or a player who never went outside them."""
+    return all(scores[str(h)] in (3, 4, 5) for h in range(1, 19))
+
+
+# ---------------------------
+# Training
+# ---------------------------
+
+def load_labels(corpus_dir: str) -> dict:
+    """corpus_dir/labels.json: image file name -> {"firstName", "scores": {"1".."18": int}}."""
+    with open(os.path.join(corpus_dir, "labels.json")) as f:
+        return json.load(f)
+
+
+def training_cells(corpus_dir: str, backend: "LocalGridBackend" = None):
+    """
+    (X, y) of single-digit hole cells from a labeled corpus (see load_labels). The
+    labeled row is the grid row whose reading agrees with the label the most.
+    """
+    backend = backend or LocalGridBackend()
+    X, y = [], []
+    for file_name, label in sorted(load_labels(corpus_dir).items()):
+        gray = np.asarray(Image.open(os.path.join(corpus_dir, file_name)).convert("L"))
+        ink = gray < otsu_threshold(gray)
+        grid = detect_grid(ink)
+        if grid is None:
+            continue
+        rows, cols = grid
+        holes = hole_columns(cols)
+        best = None
+        for y0, y1 in rows:
+            cells = [ink[y0:y1, x0:x1] for x0, x1 in holes]
+            if len(cells) < 19:
+                continue
+            # same spacer rule as read_rows
+            back = 10
+            while back < len(cells) and back < 12 and cell_features(cells[back]) is None:
+                back += 1
+            picked = cells[:9] + cells[back:back + 9]
+            if len(picked) < 18:
+                continue
+            agree = sum(backend.read_cell(c)[0] == int(label["scores"][str(h)])
+                        for h, c in enumerate(picked, start=1))
+            if best is None or agree > best[0]:
+                best = (agree, picked)
+        if best is None or best[0] < 9:
+            continue
+        for hole, cell in enumerate(best[1], start=1):
+            value = int(label["scores"][str(hole)])
+            feats = cell_features(cell)
+            if 0 <= value <= 9 and feats is not None and _split_two_digits(trim_border(cell)) is None:
+                X.append(feats)
+                y.append(value)
+    return np.stack(X), np.array(y)
+
+
+def train(corpus_dir: str, path: str = None) -> DigitClassifier:
+    X, y = training_cells(corpus_dir)
+    model = DigitClassifier.fit(X, y)
+    model.save(path)
+    logger.info(f"Trained digit model on {len(y)} cells")
+    return model
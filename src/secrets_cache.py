@@ -0,0 +1,121 @@
+import json
+import logging
+import threading
+import time
+import aws_clients
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Secrets are cached per warm container. Entries older than
+# _TTL_SECONDS - _REFRESH_AHEAD_SECONDS are still served, but a background
+# refresh is kicked off so the next caller never waits on Secrets Manager.
+_TTL_SECONDS = 900
+_REFRESH_AHEAD_SECONDS = 120
+
+_CACHE = {}        # secret_id -> (secret_dict, fetched_at)
+_LOCKS = {}        # secret_id -> lock used to coalesce concurrent fetches
+_REFRESHING = set()
+_GUARD = threading.Lock()
+
+STATS = {"hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0, "errors": 0}
+
+
+def _lock_for(secret_id: str):
+    with _GUARD:
+        lock = _LOCKS.get(secret_id)
+        if lock is None:
+            lock = _LOCKS[secret_id] = threading.Lock()
+        return lock
+
+
+def _fetch(secret_id: str) -> dict:
+    """Read a secret from Secrets Manager and store it in the cache."""
+    try:
+        resp = aws_clients.secretsmanager().get_secret_value(SecretId=secret_id)
+    except Exception:
+        STATS["errors"] += 1
+        raise
+    secret_dict = json.loads(resp["SecretString"])
+    _CACHE[secret_id] = (secret_dict, time.time())
+    return secret_dict
+
+
+def _refresh_in_background(secret_id: str):
+    with _GUARD:
+        if secret_id in _REFRESHING:
+            return
+        _REFRESHING.add(secret_id)
+
+    def run():
+        try:
+            with _lock_for(secret_id):
+                _fetch(secret_id)
+            STATS["refreshes"] += 1
+            logger.info(f"🔑 Refreshed secret {secret_id} ahead of expiry")
+        except Exception as e:
+            # Keep serving the cached value until it actually expires
+            logger.warning(f"Background refresh of {secret_id} failed: {e}")
+        finally:
+            with _GUARD:
+                _REFRESHING.discard(secret_id)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_secret_dict(secret_id: str) -> dict:
+    """
+    Return the parsed SecretString for secret_id.
+    Served from the container cache when fresh; concurrent misses for the same
+    secret share a single Secrets Manager call. ClientError is propagated.
+    """
+    entry = _CACHE.get(secret_id)
+    if entry is not None:
+        secret_dict, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < _TTL_SECONDS:
+            STATS["hits"] += 1
+            if age >= _TTL_SECONDS - _REFRESH_AHEAD_SECONDS:
+                _refresh_in_background(secret_id)
+            return secret_dict
+
+    with _lock_for(secret_id):
+        # Another caller may have filled the cache while we waited on the lock
+        entry = _CACHE.get(secret_id)
+        if entry is not None and time.time() - entry[1] < _TTL_SECONDS:
+            STATS["hits"] += 1
+            return entry[0]
+        STATS["misses"] += 1
+        return _fetch(secret_id)
+
+
+def get_secret_value(secret_id: str, key: str):
+    """Shortcut for a single field inside a JSON secret."""
+    return get_secret_dict(secret_id).get(key)
+
+
+def invalidate(secret_id: str = None):
+    """Drop one cached secret (or all of them) so the next read goes to Secrets Manager."""
+    if secret_id is None:
+        _CACHE.clear()
+    else:
+        _CACHE.pop(secret_id, None)
+    STATS["invalidations"] += 1
+
+
+def is_auth_error(exc: Exception) -> bool:
+    """True for 401/403 style failures from OpenAI or urllib, i.e. a likely rotated key."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status in (401, 403)
+
+
+def invalidate_on_auth_error(secret_id: str, exc: Exception) -> bool:
+    if is_auth_error(exc):
+        logger.warning(f"Auth failure using {secret_id}; invalidating cached secret")
+        invalidate(secret_id)
+        return True
+    return False
+
+
+def get_stats() -> dict:
+    return dict(STATS, cached=len(_CACHE))
@@ -1,5 +1,6 @@
 import json
-import boto3
+import aws_clients
+import tracing
 import logging
 from decimal import Decimal
 from botocore.exceptions import ClientError
@@ -15,18 +16,14 @@ ALLOWED_ORIGINS = [
 ]
 
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+# Initialize DynamoDB resource (shared, tuned client; see aws_clients)
+dynamodb = aws_clients.dynamodb()
+score_table = aws_clients.table('sg_user_scores')
+user_table = aws_clients.table('sg_users')
 
 def add_score(event, origin):
     """Handles POST request to add a golf score"""
     try:
-        score_table = dynamodb.Table('sg_user_scores')
-        user_table = dynamodb.Table('sg_users')
-
-        score_table.scan(Limit=1)  # Test the connection
-        logger.info("Connected to sg_user_scores table")
-
         user_score = json.loads(event.get('body', '{}'))
         logger.debug(f"Processed input: {user_score}")
 
@@ -102,6 +99,7 @@ def add_score(event, origin):
 
 
 
+@tracing.traced
 def lambda_handler(event, context):
     """Main AWS Lambda handler"""
 
@@ -0,0 +1,84 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Shared by every graph in the container. Stages are launched only once their
+# dependencies are done (no thread sits waiting on another stage), so a small
+# pool cannot deadlock however the graph is shaped.
+POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stage")
+
+
+class StageGraph:
+    """
+    A handful of named stages, each started as soon as its dependencies finish.
+    fn receives the dependencies' results as positional arguments; a failed
+    dependency fails its dependants with the same exception.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor = None):
+        self._executor = executor or POOL
+        self._futures = {}
+        self._times = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def add(self, name: str, fn, deps=()):
+        fut = Future()
+        self._futures[name] = fut
+        dep_futs = [self._futures[d] for d in deps]
+        # Stages run in the caller's context (its tracing invocation), captured
+        # now: dependencies finish on pool threads, which have none of their own
+        context = contextvars.copy_context()
+        if not dep_futs:
+            self._executor.submit(context.run, self._run, name, fn, dep_futs, fut)
+            return self
+
+        remaining = [len(dep_futs)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._executor.submit(context.run, self._run, name, fn, dep_futs, fut)
+
+        for d in dep_futs:
+            d.add_done_callback(on_done)
+        return self
+
+    def _run(self, name, fn, dep_futs, fut):
+        for d in dep_futs:
+            if d.exception() is not None:
+                fut.set_exception(d.exception())
+                return
+        start = time.perf_counter()
+        try:
+            result = fn(*[d.result() for d in dep_futs])
+        except BaseException as e:
+            self._finished(name, start)
+            fut.set_exception(e)
+        else:
+            # Timing first, so it is there as soon as a waiter sees the result
+            self._finished(name, start)
+            fut.set_result(result)
+
+    def _finished(self, name, start):
+        with self._lock:
+            self._times[name] = (start, time.perf_counter())
+
+    def result(self, name: str, timeout: float = None):
+        """Block for a stage; re-raises its exception."""
+        return self._futures[name].result(timeout)
+
+    def timings(self) -> dict:
+        """stage -> {"start_ms", "end_ms", "ms"} relative to graph creation, for finished stages."""
+        with self._lock:
+            return {
+                name: {
+                    "start_ms": round((start - self._t0) * 1000, 1),
+                    "end_ms": round((end - self._t0) * 1000, 1),
+                    "ms": round((end - start) * 1000, 1),
+                }
+                for name, (start, end) in sorted(self._times.items(), key=lambda kv: kv[1][0])
+            }
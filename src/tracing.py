@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+# Named spans with duration, byte counts and model token usage, written as
+# CloudWatch Embedded Metric Format lines (one per span) when the handler
+# returns, so they become metrics without any API calls. Handlers opt in with
+# @tracing.traced; outside a traced invocation (including threads that didn't
+# inherit its context), or with SG_TRACING=0, span() hands back a shared no-op
+# and record() returns at once.
+ENABLED = os.environ.get("SG_TRACING", "1") == "1"
+NAMESPACE = os.environ.get("SG_METRICS_NAMESPACE", "GolfSmart")
+
+# span field -> (EMF metric name, unit)
+_METRICS = {
+    "ms": ("DurationMs", "Milliseconds"),
+    "bytes": ("Bytes", "Bytes"),
+    "prompt_tokens": ("PromptTokens", "Count"),
+    "cached_tokens": ("CachedTokens", "Count"),
+    "completion_tokens": ("CompletionTokens", "Count"),
+    "admitted": ("Admitted", "Count"),
+    "shed": ("Shed", "Count"),
+}
+
+# The current invocation's trace, in a ContextVar so spans stay with the
+# invocation that started the work: StageGraph stages and SQS batch records run
+# in a copy of the submitting context (other pools can use run_in_context).
+# Work still running after its invocation flushed (a secret fetch a cache hit
+# didn't wait for) is dropped, not written into the next invocation's trace.
+_current = contextvars.ContextVar("sg_trace", default=None)
+_lock = threading.Lock()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+
+    def set(self, **fields):
+        """Attach counts learned inside the span (bytes read, tokens used)."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        record(self.name, (time.perf_counter() - self._t0) * 1000, **self.fields)
+        return False
+
+
+def span(name: str, **fields):
+    """Context manager timing one named stage; fields are extra counts/properties."""
+    if _current.get() is None:
+        return _NOOP
+    return Span(name, fields)
+
+
+def record(name: str, ms: float, **fields):
+    """Record an already-timed stage (e.g. from StageTimer or StageGraph timings)."""
+    trace = _current.get()
+    if trace is None:
+        return
+    entry = {k: v for k, v in fields.items() if v is not None}
+    entry["ms"] = round(ms, 1)
+    with _lock:
+        if not trace["flushed"]:
+            trace["spans"].append((name, entry))
+
+
+def run_in_context(executor, fn, *args):
+    """executor.submit(fn, *args), run in a copy of the caller's context so its spans join this invocation."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def emf_line(service: str, name: str, fields: dict, timestamp_ms: int = None, request_id: str = None) -> str:
+    """One EMF record: numeric fields in _METRICS become metrics, the rest stay properties."""
+    metrics = [{"Name": _METRICS[k][0], "Unit": _METRICS[k][1]} for k in _METRICS if k in fields]
+    line = {
+        "_aws": {
+            "Timestamp": timestamp_ms or int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [["Service", "Span"]],
+                "Metrics": metrics,
+            }],
+        },
+        "Service": service,
+        "Span": name,
+    }
+    if request_id:
+        line["RequestId"] = request_id
+    for k, v in fields.items():
+        line[_METRICS[k][0] if k in _METRICS else k] = v
+    return json.dumps(line, default=str)
+
+
+def flush():
+    """Print the current invocation's spans as EMF lines and end the trace."""
+    trace = _current.get()
+    if trace is None:
+        return
+    with _lock:
+        if trace["flushed"]:
+            return
+        trace["flushed"] = True
+        spans = list(trace["spans"])
+    now = int(time.time() * 1000)
+    for name, fields in spans:
+        # print, not logger: EMF needs the JSON to start the log line
+        print(emf_line(trace["service"], name, fields, now, trace["request_id"]))
+
+
+def traced(handler):
+    """
+    Lambda handler decorator: collects spans for the invocation, adds a
+    "handler" span and flushes them on return. Without SG_TRACING the handler
+    is returned unwrapped.
+    """
+    if not ENABLED:
+        return handler
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        token = _current.set({
+            "service": getattr(context, "function_name", None) or handler.__module__,
+            "request_id": getattr(context, "aws_request_id", None),
+            "spans": [],
+            "flushed": False,
+        })
+        try:
+            with span("handler"):
+                return handler(event, context)
+        finally:
+            flush()
+            _current.reset(token)
+
+    return wrapper
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The Lambda sources are flat modules under src/ (one handler per file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Never reach real AWS from the suite; moto and the fakes below stand in
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("SG_TRACING", "0")
+# The governor's shared DynamoDB store is the default; tests that need it build their own
+os.environ.setdefault("SG_RATE_STORE", "memory")
+
+
+@pytest.fixture
+def aws():
+    """moto-backed AWS for the duration of one test."""
+    moto = pytest.importorskip("moto")
+    import aws_clients
+
+    with moto.mock_aws():
+        # Drop clients and table handles built outside (or in an earlier) mock
+        for cache in (aws_clients._clients, aws_clients._resources, aws_clients._tables):
+            cache.clear()
+        yield
+        for cache in (aws_clients._clients, aws_clients._resources, aws_clients._tables):
+            cache.clear()
@@ -0,0 +1,138 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for tests and the
+bench scripts: canned replies, injected latency and HTTP errors, and the
+provider's prefix-cache token accounting.
+"""
+import base64
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.request
+
+import openai
+
+STUB_IMAGE_TOKENS = 765
+
+
+class StubModelServer:
+    """
+    Local stand-in for the chat completions endpoint. `replies` maps model name to
+    the reply text (or a callable(body) -> text); images are taken delivery of the
+    way the real service would (data URLs decoded, other URLs fetched).
+    `latency` (seconds) and `errors` (HTTP status) map model name to a value for
+    every request or a list consumed one request at a time (None: no fault).
+    With prefix_cache, prompt tokens shared with an earlier request's prefix are
+    reported as cached (1024-token minimum, 128-token steps, as the provider
+    does), and ms_per_1k_uncached adds latency for the rest.
+    """
+
+    def __init__(self, replies: dict = None, default_reply: str = "stub", latency: dict = None, errors: dict = None,
+                 prefix_cache: bool = False, ms_per_1k_uncached: float = 0.0):
+        self.replies = replies or {}
+        self.default_reply = default_reply
+        self.latency = {m: list(v) if isinstance(v, (list, tuple)) else v for m, v in (latency or {}).items()}
+        self.errors = {m: list(v) if isinstance(v, (list, tuple)) else v for m, v in (errors or {}).items()}
+        self.requests = []
+        self.prefix_cache = prefix_cache
+        self.ms_per_1k_uncached = ms_per_1k_uncached
+        self._seen = []   # segment lists of earlier prompts
+        stub = self
+        fault_lock = threading.Lock()
+
+        def segments(body):
+            # (text or image url, tokens) per content part: ~4 characters a token, images a fixed cost
+            parts = []
+            for message in body["messages"]:
+                content = message["content"]
+                for part in content if isinstance(content, list) else [{"type": "text", "text": content}]:
+                    if part.get("type") == "image_url":
+                        parts.append((part["image_url"]["url"], STUB_IMAGE_TOKENS))
+                    else:
+                        parts.append((part["text"], len(part["text"]) // 4))
+            return parts
+
+        def cached_tokens(parts):
+            best = 0
+            with fault_lock:
+                for earlier in stub._seen:
+                    shared = 0
+                    for (a, tokens), (b, _) in zip(parts, earlier):
+                        if a == b:
+                            shared += tokens
+                            continue
+                        if not a.startswith("data:") and not b.startswith("data:"):
+                            shared += len(os.path.commonprefix([a, b])) // 4
+                        break
+                    best = max(best, shared)
+                stub._seen.append(parts)
+            return best // 128 * 128 if best >= 1024 else 0
+
+        def fault(faults, model):
+            with fault_lock:
+                value = faults.get(model)
+                if isinstance(value, list):
+                    return value.pop(0) if value else None
+                return value
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body)
+                time.sleep(fault(stub.latency, body["model"]) or 0)
+                status = fault(stub.errors, body["model"])
+                if status:
+                    error = json.dumps({"error": {"message": f"injected {status}", "type": "stub"}}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(error)))
+                    self.end_headers()
+                    self.wfile.write(error)
+                    return
+                content = body["messages"][0]["content"]
+                for part in content if isinstance(content, list) else []:
+                    if part.get("type") != "image_url":
+                        continue
+                    url = part["image_url"]["url"]
+                    if url.startswith("data:"):
+                        base64.b64decode(url.split(",", 1)[1])
+                    else:
+                        urllib.request.urlopen(url, timeout=30).read()
+                reply = stub.replies.get(body["model"], stub.default_reply)
+                text = reply(body) if callable(reply) else reply
+                parts = segments(body)
+                prompt_tokens = sum(tokens for _, tokens in parts)
+                cached = cached_tokens(parts) if stub.prefix_cache else 0
+                time.sleep(stub.ms_per_1k_uncached * (prompt_tokens - cached) / 1e6)
+                payload = json.dumps({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4,
+                              "total_tokens": prompt_tokens + len(text) // 4,
+                              "prompt_tokens_details": {"cached_tokens": cached}},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def client(self):
+        return openai.OpenAI(api_key="stub", base_url=self.base_url, max_retries=0)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
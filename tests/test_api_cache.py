@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("boto3")
+from botocore.exceptions import EndpointConnectionError  # noqa: E402
+
+import aws_clients  # noqa: E402
+import api_cache  # noqa: E402
+
+
+@pytest.fixture
+def cache(aws, monkeypatch):
+    """api_cache over a moto table, with empty tiers and counters and a settable clock."""
+    aws_clients.resource("dynamodb").create_table(
+        TableName=api_cache.CACHE_TABLE_NAME,
+        KeySchema=[{"AttributeName": "cacheKey", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "cacheKey", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    monkeypatch.setattr(api_cache, "_LRU", api_cache.OrderedDict())
+    monkeypatch.setattr(api_cache, "_REVALIDATING", set())
+    monkeypatch.setattr(api_cache, "STATS", {})
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(api_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def counted(*values):
+    """A fetch returning values in turn, recording each call."""
+    calls = []
+
+    def fetch():
+        calls.append(len(calls))
+        return values[min(len(calls), len(values)) - 1]
+
+    return fetch, calls
+
+
+def test_negative_result_is_cached_for_the_negative_ttl_only(cache):
+    fetch, calls = counted(None, '{"course": 1}')
+    assert api_cache.get_or_fetch("course", "42", fetch) is None
+    assert api_cache.get_or_fetch("course", "42", fetch) is None
+    assert len(calls) == 1
+
+    # Past negative_ttl a miss is fetched again, never served stale
+    cache.now += api_cache.POLICIES["course"]["negative_ttl"] + 1
+    assert api_cache.get_or_fetch("course", "42", fetch) == '{"course": 1}'
+    assert len(calls) == 2
+    stats = api_cache.get_stats()["course"]
+    assert stats["negative_hits"] == 1 and stats["stale_served"] == 0
+
+
+def test_stale_entry_is_served_while_one_fetch_revalidates(cache):
+    api_cache.get_or_fetch("search", "pebble", lambda: "old")
+    cache.now += api_cache.POLICIES["search"]["ttl"] + 1
+
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    assert api_cache.get_or_fetch("search", "pebble", slow_fetch) == "old"
+    assert api_cache.get_or_fetch("search", "pebble", slow_fetch) == "old"
+    release.set()
+    for _ in range(100):
+        if not api_cache._REVALIDATING:
+            break
+        time.sleep(0.02)
+    assert calls == [1]
+    assert api_cache.get_or_fetch("search", "pebble", slow_fetch) == "new"
+    assert api_cache.get_stats()["search"]["stale_served"] == 2
+
+
+def test_stale_window_ends(cache):
+    api_cache.get_or_fetch("search", "pebble", lambda: "old")
+    policy = api_cache.POLICIES["search"]
+    cache.now += policy["ttl"] + policy["stale"] + 1
+    assert api_cache.get_or_fetch("search", "pebble", lambda: "new") == "new"
+
+
+def test_hit_rate_counts_both_tiers(cache):
+    fetch, calls = counted('{"n": 1}')
+    api_cache.get_or_fetch("course", "1", fetch)          # miss
+    api_cache.get_or_fetch("course", "1", fetch)          # memory
+    api_cache._LRU.clear()                                # another container
+    api_cache.get_or_fetch("course", "1", fetch)          # table
+    api_cache.get_or_fetch("course", "1", fetch)          # memory again
+    stats = api_cache.get_stats()["course"]
+    assert (stats["misses"], stats["memory_hits"], stats["table_hits"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 0.75 and len(calls) == 1
+
+
+def test_unreachable_table_is_a_miss(cache, monkeypatch):
+    def get_item(**kwargs):
+        raise EndpointConnectionError(endpoint_url="https://dynamodb.us-east-2.amazonaws.com")
+
+    monkeypatch.setattr(aws_clients, "table", lambda name: SimpleNamespace(get_item=get_item, put_item=get_item))
+    assert api_cache.get_or_fetch("course", "42", lambda: "fetched") == "fetched"
+    assert api_cache.lookup("scan", "k") is None
+
+
+def test_counters_are_exact_under_threads(cache):
+    def count():
+        for _ in range(2000):
+            api_cache._count("search", "misses")
+
+    threads = [threading.Thread(target=count) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert api_cache.get_stats()["search"]["misses"] == 16000
@@ -0,0 +1,30 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+import aws_clients  # noqa: E402
+
+
+def test_clients_are_built_once_per_container():
+    assert aws_clients.s3() is aws_clients.s3()
+    assert aws_clients.dynamodb() is aws_clients.dynamodb()
+
+
+def test_client_config_is_tuned():
+    config = aws_clients.s3().meta.config
+    assert config.max_pool_connections == 16
+    assert config.tcp_keepalive is True
+    assert config.retries["mode"] == "adaptive"
+    assert config.region_name == aws_clients.REGION
+
+
+def test_concurrent_table_lookups_share_one_handle():
+    handles = []
+    threads = [threading.Thread(target=lambda: handles.append(aws_clients.table("sg_concurrent")))
+               for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(h) for h in handles}) == 1
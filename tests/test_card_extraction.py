@@ -0,0 +1,155 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+
+import extractScores  # noqa: E402
+
+HOLES = {str(h): 4 for h in range(1, 19)}
+
+
+def player(name, scores=None, out=36, in_=36):
+    return {"name": name, "scores": scores or dict(HOLES), "out": out, "in": in_}
+
+
+def card_answer(*players) -> str:
+    return "```json\n" + json.dumps({"players": list(players)}) + "\n```"
+
+
+def test_parse_card_rows_normalizes_each_player():
+    rows = extractScores.parse_card_rows(card_answer(
+        player("Mike", dict(HOLES, **{"7": "5", "8": None}), out="36"),
+        {"name": "No scores"},
+        {"scores": HOLES},
+    ))
+    assert rows == [{"name": "Mike", "scores": dict(HOLES, **{"7": 5, "8": -1}), "out": None, "in": 36}]
+
+
+@pytest.mark.parametrize("content", ["", "not json", "```json\n[1, 2]\n```", '{"players": null}'])
+def test_parse_card_rows_returns_nothing_for_unusable_answers(content):
+    assert extractScores.parse_card_rows(content) == []
+
+
+ROWS = [{"name": name, "scores": HOLES} for name in ("Mike Smith", "Sarah", "Jonathan")]
+
+
+@pytest.mark.parametrize("first_name, expected", [
+    ("Mike", "Mike Smith"),
+    ("sarah", "Sarah"),
+    ("  SARAH ", "Sarah"),
+    ("Sarha", "Sarah"),       # a transposition is one edit
+    ("Sara", "Sarah"),
+    ("Sorrah", None),         # two edits: over the budget for a name under eight letters
+    ("Jonathon", "Jonathan"),
+    ("Dave", None),
+    ("", None),
+])
+def test_match_player(first_name, expected):
+    row = extractScores.match_player(ROWS, first_name)
+    assert (row and row["name"]) == expected
+
+
+def test_match_player_refuses_a_tie():
+    rows = [{"name": "Mike Smith", "scores": HOLES}, {"name": "Mike Jones", "scores": HOLES}]
+    assert extractScores.match_player(rows, "Mike") is None
+    assert extractScores.match_player(rows, "Mike Jones")["name"] == "Mike Jones"
+    # Equal distance from two different names is a tie too
+    assert extractScores.match_player([{"name": "Mika", "scores": HOLES}, {"name": "Mike", "scores": HOLES}],
+                                      "Mikr") is None
+
+
+@pytest.fixture
+def card_scan(monkeypatch):
+    """extract_scores in card mode over a fake model cascade; the cache is a dict and nothing touches AWS."""
+    cache = {}
+    asked = []
+    metrics = []
+    answers = {"card_scores": card_answer(player("Mike"), player("Sarah", dict(HOLES, **{"1": 3}), out=35)),
+               "player_scores": extractScores.render_row({"scores": dict(HOLES, **{"1": 6})})}
+
+    def complete(task, messages, validate=None, prompt=None):
+        asked.append(prompt)
+        return answers[prompt], "stub"
+
+    def info(message):
+        if message.startswith('{"metric": "scan"'):
+            metrics.append(json.loads(message))
+
+    monkeypatch.setattr(extractScores.api_cache, "lookup", lambda ns, key: cache.get(key))
+    monkeypatch.setattr(extractScores.api_cache, "store", lambda ns, key, value: cache.__setitem__(key, value))
+    monkeypatch.setattr(extractScores, "load_original_bytes", lambda url: b"card")
+    monkeypatch.setattr(extractScores, "_openai_key", lambda: "key")
+    monkeypatch.setattr(extractScores, "preprocess_image", lambda *a, **kw: ("https://stub/card.jpg", "k"))
+    monkeypatch.setattr(extractScores.model_router, "complete", complete)
+    monkeypatch.setattr(extractScores, "LOCAL_BACKENDS", [])
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "card")
+    monkeypatch.setattr(extractScores, "CARD_STATS", dict.fromkeys(extractScores.CARD_STATS, 0))
+    monkeypatch.setattr(extractScores.logger, "info", info)
+    return SimpleNamespace(asked=asked, metrics=metrics, cache=cache, answers=answers)
+
+
+def test_one_card_call_serves_every_player(card_scan):
+    asked, metrics = card_scan.asked, card_scan.metrics
+    mike = extractScores.extract_scores("s3://b/card.jpg", "Mike")
+    sarah = extractScores.extract_scores("s3://b/card.jpg", "sarah")
+    assert (mike["served_from"], sarah["served_from"]) == ("card_model", "card_cache")
+    assert extractScores._json_payload(sarah["message"])["1"] == 3
+    assert asked == ["card_scores"]
+    assert [m["model_calls"] for m in metrics] == [1, 0]
+    assert extractScores.CARD_STATS["card_hits"] == 1
+
+
+def test_player_missing_from_the_card_falls_back_to_the_player_prompt(card_scan):
+    asked, metrics = card_scan.asked, card_scan.metrics
+    result = extractScores.extract_scores("s3://b/card.jpg", "Dave")
+    assert result["served_from"] == "player_model"
+    assert asked == ["card_scores", "player_scores"]
+    assert metrics[-1]["model_calls"] == 2
+    assert extractScores.CARD_STATS["player_fallbacks"] == 1
+
+    # The card rows were cached, so the next player on the card costs no call
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "card_cache"
+    assert metrics[-1]["model_calls"] == 0 and len(asked) == 2
+
+
+def test_answers_failing_validation_are_served_but_not_cached(card_scan):
+    # OUT disagrees with the front nine, as the last model in the cascade might still answer
+    card_scan.answers["card_scores"] = card_answer(player("Mike", out=35))
+    card_scan.answers["player_scores"] = extractScores.render_row({"scores": dict(HOLES, **{"1": 40})})
+
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "card_model"
+    assert extractScores.extract_scores("s3://b/card.jpg", "Dave")["served_from"] == "player_model"
+    assert card_scan.cache == {}
+
+    # The next scan asks again rather than serving the bad answers from the cache
+    card_scan.answers["card_scores"] = card_answer(player("Mike"))
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "card_model"
+    assert card_scan.asked == ["card_scores", "card_scores", "player_scores", "card_scores"]
+    assert len(card_scan.cache) == 2
+
+
+def test_validate_player_scores():
+    assert extractScores.validate_player_scores(extractScores.render_row({"scores": HOLES}))
+    assert extractScores.validate_player_scores(json.dumps(HOLES))
+    for bad in (dict(HOLES, **{"18": -1}), dict(HOLES, **{"3": 0}), dict(HOLES, **{"3": 16}),
+                dict(HOLES, **{"3": "4"}), dict(HOLES, **{"3": True}), {k: v for k, v in HOLES.items() if k != "9"}):
+        assert not extractScores.validate_player_scores(json.dumps(bad))
+    assert not extractScores.validate_player_scores("I can't read this card")
+    assert not extractScores.validate_player_scores(None)
+
+
+@pytest.mark.parametrize("players, valid", [
+    ([player("Mike")], True),
+    ([player("Mike", out=None, in_=None)], True),          # totals not read
+    ([player("Mike", out=35)], False),                     # OUT disagrees with holes 1-9
+    ([player("Mike", in_=37)], False),                     # IN disagrees with holes 10-18
+    ([player("Mike"), player("Sarah", dict(HOLES, **{"4": 3}), out=35)], True),
+    ([player("Mike"), player("Sarah", dict(HOLES, **{"4": 3}))], False),  # one bad row fails the card
+    ([player("Mike", dict(HOLES, **{"7": None}), out=None)], False),      # unreadable hole
+    ([], False),
+])
+def test_validate_card(players, valid):
+    assert extractScores.validate_card(card_answer(*players)) is valid
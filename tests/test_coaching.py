@@ -0,0 +1,66 @@
+import importlib.machinery
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("openai")
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ORIGIN = "http://localhost:3000"
+TIPS = "Work on approach shots.\n1. Lag putting\n2. Wedge distances\n3. Tee shots on par 3s"
+
+
+class Courses:
+    def get_item(self, Key):
+        return {"Item": {"courseID": Key["courseID"], "course_data": {}}}
+
+
+@pytest.fixture
+def coaching(aws, monkeypatch):
+    """analyzeCoursePerformance over two stored rounds, with the model call left to each test."""
+    loader = importlib.machinery.SourceFileLoader("analyzeCoursePerformance", os.path.join(SRC, "analyzeCoursePerformance"))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+
+    monkeypatch.setattr(module.dynamo_scan, "query_items", lambda table, **kw: iter([{"Hole1Score": 4}] * 2))
+    monkeypatch.setattr(module, "COURSES_TABLE", Courses())
+    monkeypatch.setattr(module.secrets_cache, "get_secret_dict", lambda name: {"openAI_API2": "test-key"})
+    return module
+
+
+def post(module):
+    event = {"requestContext": {"authorizer": {"claims": {"sub": "u1"}}},
+             "body": json.dumps({"courseID": "c1", "courseName": "Pebble Creek"})}
+    return module.analyze_course_performance(event, ORIGIN)
+
+
+def test_answer_is_returned_in_a_200(coaching, monkeypatch):
+    monkeypatch.setattr(coaching.model_router, "complete", lambda *a, **kw: (TIPS, "stub"))
+    resp = post(coaching)
+    assert resp["statusCode"] == 200
+    assert json.loads(json.loads(resp["body"])["body"])["message"] == TIPS
+
+
+def test_shed_request_is_a_429_with_retry_after(coaching, monkeypatch):
+    def shed(*a, **kw):
+        raise coaching.rate_governor.Shed("coaching", "m", 41.5)
+
+    monkeypatch.setattr(coaching.model_router, "complete", shed)
+    resp = post(coaching)
+    assert resp["statusCode"] == 429
+    assert resp["headers"]["Retry-After"] == "42"
+    assert resp["headers"]["Access-Control-Allow-Origin"] == ORIGIN
+    assert json.loads(resp["body"])["status"] == "error"
+
+
+def test_unavailable_model_is_a_503(coaching, monkeypatch):
+    def unavailable(*a, **kw):
+        raise coaching.model_client.ModelUnavailable("circuit open")
+
+    monkeypatch.setattr(coaching.model_router, "complete", unavailable)
+    resp = post(coaching)
+    assert resp["statusCode"] == 503
+    assert json.loads(resp["body"])["status"] == "error"
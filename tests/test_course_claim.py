@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+import aws_clients  # noqa: E402
+
+
+def _create_table(name, keys):
+    aws_clients.dynamodb().create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": k, "KeyType": t} for k, t in zip(keys, ("HASH", "RANGE"))],
+        AttributeDefinitions=[{"AttributeName": k, "AttributeType": "S"} for k in keys],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return aws_clients.table(name)
+
+
+@pytest.fixture
+def course_api(aws, monkeypatch):
+    """check_or_create_course against moto tables, with a slow counted fetch in place of golfcourseapi."""
+    import check_or_create_course as module
+
+    monkeypatch.setattr(module, "COURSES_TABLE", _create_table("sg_courses", ("courseID", "courseName")))
+    monkeypatch.setattr(module, "EXTERNAL_ID_TABLE", _create_table("sg_course_external_ids", ("externalCourseID",)))
+    monkeypatch.setattr(module, "CLAIM_WAIT_SECONDS", 5)
+    monkeypatch.setattr(module, "_CLAIM_POLL_SECONDS", 0.02)
+    monkeypatch.setattr(module.course_search_index, "add_course", lambda doc: True)
+    module.fetches = []
+
+    def fetch(external_course_id):
+        module.fetches.append(external_course_id)
+        time.sleep(0.2)
+        return {"course": {"club_name": "Pebble Beach", "location": {"city": "Pebble Beach", "state": "CA"}}}
+
+    monkeypatch.setattr(module, "fetch_course_data_from_external_api", fetch)
+    return module
+
+
+def post(module, external_course_id="42", course_name="Pebble Beach"):
+    resp = module.check_create_course({"body": json.dumps({"externalCourseID": external_course_id,
+                                                           "courseName": course_name})})
+    return resp["statusCode"], json.loads(resp["body"])
+
+
+def course_items(module):
+    return module.COURSES_TABLE.scan()["Items"]
+
+
+def test_concurrent_creates_make_one_course(course_api):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(post(course_api))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    codes = sorted(code for code, _ in results)
+    assert codes == [200] * 7 + [201]
+    assert len({body["uuid"] for _, body in results}) == 1
+    assert len(course_items(course_api)) == 1
+    assert course_api.fetches == ["42"]
+
+
+def test_existing_course_is_returned(course_api):
+    _, created = post(course_api)
+    assert post(course_api) == (200, created)
+
+
+def test_fresh_pending_claim_is_reported_as_pending(course_api, monkeypatch):
+    monkeypatch.setattr(course_api, "CLAIM_WAIT_SECONDS", 0.1)
+    assert course_api.claim_external_id("42", "Pebble Beach")
+    code, body = post(course_api)
+    assert code == 202 and body["status"] == "pending"
+    assert course_api.fetches == []
+
+
+def test_stale_claim_is_taken_over(course_api):
+    stale_id = "dead-claim"
+    course_api.EXTERNAL_ID_TABLE.put_item(Item={
+        "externalCourseID": "42", "courseID": stale_id, "courseName": "Pebble Beach",
+        "status": "pending", "claimedAt": int(time.time()) - course_api.CLAIM_LEASE_SECONDS - 1,
+    })
+    course_api.COURSES_TABLE.put_item(Item={"courseID": stale_id, "courseName": "Pebble Beach"})
+
+    code, body = post(course_api)
+    assert code == 201 and body["uuid"] != stale_id
+    assert [item["courseID"] for item in course_items(course_api)] == [body["uuid"]]
+    assert course_api.get_mapping("42")["status"] == "ready"
+
+
+def test_owner_that_lost_its_claim_backs_out(course_api, monkeypatch):
+    def taken_over(external_course_id):
+        # Another request takes the claim over while our fetch is running
+        course_api.EXTERNAL_ID_TABLE.update_item(
+            Key={"externalCourseID": external_course_id},
+            UpdateExpression="SET courseID = :other", ExpressionAttributeValues={":other": "other"})
+        return {"course": {}}
+
+    monkeypatch.setattr(course_api, "fetch_course_data_from_external_api", taken_over)
+    monkeypatch.setattr(course_api, "CLAIM_WAIT_SECONDS", 0)
+    code, _ = post(course_api)
+    assert code == 202
+    assert course_items(course_api) == []
+
+
+def test_failed_put_releases_the_claim(course_api, monkeypatch):
+    def put_item(**kwargs):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(course_api.COURSES_TABLE, "put_item", put_item)
+    code, _ = post(course_api)
+    assert code == 500
+    assert course_api.get_mapping("42") is None
+
+
+def test_failed_fetch_releases_the_claim(course_api, monkeypatch):
+    monkeypatch.setattr(course_api, "fetch_course_data_from_external_api", lambda ext: None)
+    code, _ = post(course_api)
+    assert code == 502
+    assert course_api.get_mapping("42") is None
+
+
+def test_course_created_before_the_mapping_table_is_adopted(course_api):
+    course_api.COURSES_TABLE.put_item(Item={"courseID": "legacy", "courseName": "Pebble Beach",
+                                            "externalCourseID": "42"})
+    assert post(course_api) == (200, {"uuid": "legacy"})
+    assert course_api.get_mapping("42")["courseID"] == "legacy"
+    assert len(course_items(course_api)) == 1 and course_api.fetches == []
+
+
+def test_backfilled_table_skips_the_scan(course_api, monkeypatch):
+    monkeypatch.setattr(course_api, "EXTERNAL_IDS_BACKFILLED", True)
+    monkeypatch.setattr(course_api, "find_unmapped_course", lambda ext: pytest.fail("scanned sg_courses"))
+    assert post(course_api)[0] == 201
+
+
+def test_external_api_call_has_a_timeout(monkeypatch):
+    import check_or_create_course as module
+
+    seen = {}
+
+    def urlopen(req, timeout=None):
+        seen["timeout"] = timeout
+        raise module.urllib.error.URLError("unreachable")
+
+    monkeypatch.setattr(module.secrets_cache, "get_secret_value", lambda name, key: "key")
+    monkeypatch.setattr(module.urllib.request, "urlopen", urlopen)
+    with pytest.raises(module.urllib.error.URLError):
+        module.fetch_course_json("42")
+    assert seen["timeout"] == module.EXTERNAL_API_TIMEOUT_SECONDS
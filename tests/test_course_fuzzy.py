@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("boto3")  # course_fuzzy reads docs through course_search_index
+import course_fuzzy  # noqa: E402
+
+NAMES = ["Pinehurst No. 2", "Pebble Beach Golf Links", "Torrey Pines South", "Bethpage Black",
+         "Whistling Straits", "Pine Valley", "Oakmont Country Club"]
+DOCS = [{"courseID": f"c{i}", "club_name": name} for i, name in enumerate(NAMES)]
+
+
+@pytest.fixture(scope="module")
+def state():
+    return course_fuzzy.build(DOCS)
+
+
+def matched(query, state, limit=25):
+    return [(doc["club_name"], dist) for doc, dist in course_fuzzy.match(query, limit=limit, state=state)]
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("pinehurst", "pinehurst", 0),
+    ("pinehrst", "pinehurst", 1),      # deletion
+    ("pinehursst", "pinehurst", 1),    # insertion
+    ("pinehurts", "pinehurst", 1),     # transposition counts once
+    ("pebbel", "pebble", 1),
+    ("whistlign", "whistling", 1),
+    ("oakmnt", "oakmont", 1),
+])
+def test_edit_distance(a, b, expected):
+    assert course_fuzzy.edit_distance(a, b, 2) == expected
+
+
+def test_edit_distance_stops_past_the_bound():
+    assert course_fuzzy.edit_distance("pinehurst", "bethpage", 2) == 3
+    assert course_fuzzy.edit_distance("a", "abcdef", 2) == 3
+
+
+def test_allowed_distance_grows_with_token_length():
+    assert [course_fuzzy.allowed_distance(t) for t in ("no", "pine", "oakmnt", "pinehrst")] == [0, 1, 1, 2]
+
+
+def test_misspelled_name_finds_the_course(state):
+    assert matched("Pinehrst", state) == [("Pinehurst No. 2", 1)]
+    assert matched("pebbel beach", state) == [("Pebble Beach Golf Links", 1)]
+
+
+def test_every_query_token_must_match(state):
+    assert matched("pebble straits", state) == []
+
+
+def test_exact_matches_rank_first(state):
+    assert matched("pine", state) == [("Pine Valley", 0), ("Torrey Pines South", 1)]
+
+
+def test_short_tokens_must_match_exactly(state):
+    assert matched("nk", state) == []
+
+
+def test_limit(state):
+    assert len(matched("pine", state, limit=1)) == 1
+
+
+def test_long_tokens_beyond_the_delete_prefix(state):
+    # Deletes cover the first 7 characters; the typo sits past them
+    assert matched("whistlinng", state) == [("Whistling Straits", 1)]
+
+
+def test_long_tokens_sharing_a_prefix_are_told_apart():
+    docs = [{"courseID": f"c{i}", "club_name": name}
+            for i, name in enumerate(["Pinehurstbrook", "Pinehurstmeadow", "Pinehurstwillow"])]
+    state = course_fuzzy.build(docs)
+    assert matched("pinehurstmeadw", state) == [("Pinehurstmeadow", 1)]
+    assert [t for t, _ in course_fuzzy.lookup_token("pinehurstwilow", 2, state)] == ["pinehurstwillow"]
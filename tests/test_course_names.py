@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("boto3")
+import aws_clients  # noqa: E402
+import course_names  # noqa: E402
+
+
+@pytest.fixture
+def courses(aws, monkeypatch):
+    """sg_courses with its real key schema (courseID, courseName) and a fresh LRU."""
+    aws_clients.dynamodb().create_table(
+        TableName=course_names.COURSES_TABLE_NAME,
+        KeySchema=[{"AttributeName": "courseID", "KeyType": "HASH"},
+                   {"AttributeName": "courseName", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "courseID", "AttributeType": "S"},
+                              {"AttributeName": "courseName", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table = aws_clients.table(course_names.COURSES_TABLE_NAME)
+    with table.batch_writer() as batch:
+        for i in range(50):
+            batch.put_item(Item={"courseID": f"c{i}", "courseName": f"Course {i}", "par": [4] * 18})
+    monkeypatch.setattr(course_names, "_CACHE", type(course_names._CACHE)())
+    monkeypatch.setattr(course_names, "STATS", {"hits": 0, "misses": 0, "evictions": 0})
+    return table
+
+
+def test_resolves_names_by_course_id(courses):
+    assert course_names.resolve_course_names(["c1", "c7", "c1"]) == {"c1": "Course 1", "c7": "Course 7"}
+
+
+def test_unknown_ids_are_left_out(courses):
+    assert course_names.resolve_course_names(["c2", "nope"]) == {"c2": "Course 2"}
+
+
+def test_second_lookup_is_served_from_the_cache(courses):
+    course_names.resolve_course_names(["c3", "c4"])
+    courses.delete_item(Key={"courseID": "c3", "courseName": "Course 3"})
+    assert course_names.resolve_course_names(["c3", "c4"]) == {"c3": "Course 3", "c4": "Course 4"}
+    assert course_names.get_stats()["hits"] == 2
+
+
+def test_expired_entries_are_looked_up_again(courses, monkeypatch):
+    course_names.resolve_course_names(["c5"])
+    courses.delete_item(Key={"courseID": "c5", "courseName": "Course 5"})
+    monkeypatch.setattr(course_names, "_TTL_SECONDS", 0)
+    assert course_names.resolve_course_names(["c5"]) == {}
+
+
+def test_cache_is_bounded(courses, monkeypatch):
+    monkeypatch.setattr(course_names, "_MAX_ENTRIES", 10)
+    course_names.resolve_course_names([f"c{i}" for i in range(30)])
+    stats = course_names.get_stats()
+    assert stats["cached"] == 10 and stats["evictions"] == 20
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+import course_ranking
+
+
+def legacy_merge_dedup_rank(local_arr, external_arr, query, cap=20):
+    """searchGolfCourses.merge_dedup_rank before course_ranking, verbatim apart from layout."""
+    q = (query or "").strip().lower()
+
+    def key_of(r):
+        return (f"{(r.get('club_name') or '').lower()}|{(r.get('location', {}).get('city') or '').lower()}"
+                f"|{(r.get('location', {}).get('state') or '').lower()}")
+
+    m, seen_keys, seen_extids = {}, set(), set()
+    for r in local_arr:
+        k = key_of(r)
+        m[k] = r
+        seen_keys.add(k)
+        extid = r.get("externalCourseID")
+        if extid:
+            seen_extids.add(str(extid))
+    for r in external_arr:
+        k = key_of(r)
+        extid = r.get("externalCourseID")
+        if k in seen_keys:
+            continue
+        if extid and str(extid) in seen_extids:
+            continue
+        m[k] = r
+        seen_keys.add(k)
+        if extid:
+            seen_extids.add(str(extid))
+
+    def score(r):
+        name = (r.get('club_name') or '').lower()
+        city = (r.get('location', {}).get('city') or '').lower()
+        hay = f"{name} {city} {(r.get('location', {}).get('state') or '').lower()}"
+        if q and (name.startswith(q) or city.startswith(q)):
+            return 3
+        if q and q in hay:
+            return 2
+        return 1
+
+    merged = list(m.values())
+    merged.sort(key=lambda r: (-score(r), 0 if r.get('source') == 'local' else 1, r.get('club_name') or ''))
+    return merged[:cap]
+
+
+def new_merge_dedup_rank(local_arr, external_arr, query, cap=20):
+    return course_ranking.rank(course_ranking.dedup(local_arr, external_arr), query, cap=cap)
+
+
+_NAMES = ["Pebble Beach", "pebble creek", "Pine Valley", "Pinehurst", "Oak Hill", "Oakmont", "Bandon Dunes", ""]
+_CITIES = ["Pebble Beach", "Pinehurst", "Rochester", "Oakmont", "Bandon", ""]
+_STATES = ["CA", "NC", "NY", "PA", "OR", ""]
+
+
+def random_results(rng, n, source):
+    return [{
+        "id": f"{source}-{i}",
+        "source": source,
+        "club_name": rng.choice(_NAMES),
+        "location": {"city": rng.choice(_CITIES), "state": rng.choice(_STATES)},
+        "externalCourseID": rng.choice([None, str(rng.randrange(20))]),
+    } for i in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_default_ranking_matches_the_original(seed):
+    rng = random.Random(seed)
+    local = random_results(rng, rng.randrange(0, 30), "local")
+    external = random_results(rng, rng.randrange(0, 30), "external")
+    query = rng.choice(["pebble", "PINE", " oak ", "bandon dunes", "nc", "", "zzz", "p"])
+    cap = rng.choice([1, 5, 20, 100])
+    assert new_merge_dedup_rank(local, external, query, cap) == legacy_merge_dedup_rank(local, external, query, cap)
+
+
+def record(name, city="", state="", source="local", **extra):
+    return dict({"club_name": name, "location": {"city": city, "state": state}, "source": source}, **extra)
+
+
+def test_dedup_keeps_locals_and_drops_colliding_externals():
+    local = [record("Pebble Beach", "Pebble Beach", "CA", externalCourseID="7")]
+    external = [record("pebble beach", "pebble beach", "ca", "external", externalCourseID="8"),
+                record("Pebble Beach Resort", "", "", "external", externalCourseID="7"),
+                record("Spyglass Hill", "Pebble Beach", "CA", "external", externalCourseID="9")]
+    kept = [c.record["club_name"] for c in course_ranking.dedup(local, external)]
+    assert kept == ["Pebble Beach", "Spyglass Hill"]
+
+
+def test_fuzzy_hits_rank_below_substring_and_by_distance():
+    candidates = course_ranking.dedup([
+        record("Pinehurst No. 4", fuzzy_distance=2),
+        record("Pinehurst No. 2", fuzzy_distance=1),
+        record("The Pinehrst Club"),
+        record("Oak Hill"),
+    ], [])
+    ranked = [r["club_name"] for r in course_ranking.rank(candidates, "pinehrst")]
+    assert ranked == ["The Pinehrst Club", "Pinehurst No. 2", "Pinehurst No. 4", "Oak Hill"]
+
+
+def test_locality_weight_prefers_the_callers_city():
+    candidates = course_ranking.dedup([record("Oak Hill", "Rochester", "NY"), record("Oakmont", "Oakmont", "PA")], [])
+    ranked = course_ranking.rank(candidates, "oak", weights={"tiered": 1.0, "locality": 2.0}, ctx={"city": "Rochester"})
+    assert [r["club_name"] for r in ranked] == ["Oak Hill", "Oakmont"]
+
+
+def test_popularity_breaks_ties_between_equal_matches():
+    candidates = course_ranking.dedup([record("Oak Hill", popularity=0.1), record("Oak Ridge", popularity=0.9)], [])
+    ranked = course_ranking.rank(candidates, "oak", weights={"tiered": 1.0, "popularity": 0.5})
+    assert [r["club_name"] for r in ranked] == ["Oak Ridge", "Oak Hill"]
+
+
+def test_ties_keep_input_order():
+    candidates = course_ranking.dedup([record("Same", "A"), record("Same", "B"), record("Same", "C")], [])
+    assert [r["location"]["city"] for r in course_ranking.rank(candidates, "zzz")] == ["A", "B", "C"]
+
+
+def test_cap():
+    candidates = course_ranking.dedup([record(f"Course {i}") for i in range(50)], [])
+    assert len(course_ranking.rank(candidates, "course", cap=20)) == 20
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+import aws_clients  # noqa: E402
+import course_search_index as index  # noqa: E402
+
+DOCS = [
+    {"courseID": f"c{i}", "courseName": name, "club_name": name, "city": city, "state": state,
+     "externalCourseID": str(i)}
+    for i, (name, city, state) in enumerate([
+        ("Pebble Beach Golf Links", "Pebble Beach", "CA"),
+        ("Torrey Pines South", "La Jolla", "CA"),
+        ("Bethpage Black", "Farmingdale", "NY"),
+    ])
+]
+
+
+def fresh_container(monkeypatch, tmp_path):
+    """Forget everything a warm container would have mapped or cached."""
+    monkeypatch.setattr(index, "_state", {"mm": None, "header": None, "etag": None, "checked_at": 0.0,
+                                          "missing_at": None, "delta": {}, "generation": None,
+                                          "docs": None, "docs_for": None})
+    monkeypatch.setattr(index, "LOCAL_INDEX_PATH", str(tmp_path / "courses.idx"))
+    monkeypatch.setattr(index, "_refresh_thread", None)
+
+
+@pytest.fixture
+def bucket(aws, monkeypatch, tmp_path):
+    aws_clients.s3().create_bucket(Bucket=index.INDEX_BUCKET,
+                                   CreateBucketConfiguration={"LocationConstraint": aws_clients.REGION})
+    fresh_container(monkeypatch, tmp_path)
+    return aws_clients.s3()
+
+
+def names(docs):
+    return sorted(d["courseName"] for d in docs)
+
+
+def test_search_over_published_index(bucket):
+    index.publish_index(index.build_index(DOCS))
+    assert names(index.search("pines")) == ["Torrey Pines South"]
+    assert names(index.search(", ca") or []) == []
+    assert names(index.search("black", field="courseName")) == ["Bethpage Black"]
+
+
+def test_added_course_is_searchable_without_a_rebuild(bucket, monkeypatch, tmp_path):
+    index.publish_index(index.build_index(DOCS))
+    etag = bucket.head_object(Bucket=index.INDEX_BUCKET, Key=index.INDEX_KEY)["ETag"]
+    new = dict(DOCS[0], courseID="c9", courseName="Pinehurst No. 2", club_name="Pinehurst No. 2", city="Pinehurst")
+    assert index.add_course(new)
+
+    assert names(index.search("pine")) == ["Pinehurst No. 2", "Torrey Pines South"]
+    # The published index itself is untouched
+    assert bucket.head_object(Bucket=index.INDEX_BUCKET, Key=index.INDEX_KEY)["ETag"] == etag
+
+    fresh_container(monkeypatch, tmp_path)
+    assert names(index.search("pinehurst")) == ["Pinehurst No. 2"]
+
+
+def test_fuzzy_docs_include_deltas(bucket):
+    index.publish_index(index.build_index(DOCS))
+    index.load_index()
+    before, _ = index.mapped_docs()
+    index.add_course(dict(DOCS[0], courseID="c9", courseName="Pinehurst No. 2"))
+    generation, docs = index.mapped_docs()
+    assert generation is not before
+    assert [d["courseID"] for d in docs] == ["c0", "c1", "c2", "c9"]
+
+
+def test_compaction_keeps_deltas_newer_than_the_build(bucket):
+    def delta_count():
+        return bucket.list_objects_v2(Bucket=index.INDEX_BUCKET, Prefix=index.DELTA_PREFIX)["KeyCount"]
+
+    index.add_course(DOCS[0])
+    index._compact_deltas(time.time() - 60)
+    assert delta_count() == 1
+    index._compact_deltas(time.time() + 60)
+    assert delta_count() == 0
+
+
+def test_missing_index_is_remembered(bucket, monkeypatch):
+    calls = []
+    get_object = bucket.get_object
+    monkeypatch.setattr(bucket, "get_object", lambda **kw: calls.append(kw) or get_object(**kw))
+
+    for _ in range(5):
+        assert index.search("pebble") is None
+    assert len(calls) == 1
+
+    monkeypatch.setattr(index, "_MISSING_RETRY_SECONDS", 0)
+    index.publish_index(index.build_index(DOCS))
+    assert names(index.search("pebble")) == ["Pebble Beach Golf Links"]
+
+
+def test_refresh_runs_off_the_search_path(bucket, monkeypatch):
+    index.publish_index(index.build_index(DOCS))
+    index.load_index()
+    # Another container adds a course; this one sees it once a refresh is due
+    new = dict(DOCS[0], courseID="c9", courseName="Pinehurst No. 2")
+    bucket.put_object(Bucket=index.INDEX_BUCKET, Key=f"{index.DELTA_PREFIX}c9.json", Body=json.dumps(new).encode())
+    index._state["checked_at"] = 0.0
+
+    release = threading.Event()
+    refresh = index._refresh
+    monkeypatch.setattr(index, "_refresh", lambda: release.wait(5) and refresh())
+    started = time.monotonic()
+    assert names(index.search("pinehurst", field="courseName")) == []
+    assert time.monotonic() - started < 1
+    assert index._refresh_thread.is_alive()
+
+    release.set()
+    index._refresh_thread.join(5)
+    assert names(index.search("pinehurst", field="courseName")) == ["Pinehurst No. 2"]
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+from boto3.dynamodb.conditions import Attr, Key  # noqa: E402
+
+import aws_clients  # noqa: E402
+import dynamo_scan  # noqa: E402
+
+
+@pytest.fixture
+def scores(aws):
+    """sg_user_scores-shaped table: 60 rounds for one user, rotating through three courses."""
+    aws_clients.dynamodb().create_table(
+        TableName="sg_user_scores",
+        KeySchema=[{"AttributeName": "userID", "KeyType": "HASH"}, {"AttributeName": "Date", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "userID", "AttributeType": "S"},
+                              {"AttributeName": "Date", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table = aws_clients.table("sg_user_scores")
+    with table.batch_writer() as batch:
+        for day in range(60):
+            batch.put_item(Item={"userID": "u1", "Date": f"2025-01-{day:02d}", "courseID": f"c{day % 3}"})
+    return table
+
+
+def test_scan_follows_every_page(scores):
+    assert len(list(dynamo_scan.scan_items(scores, Limit=7))) == 60
+
+
+def test_query_stops_once_enough_items_are_read(scores):
+    pages = []
+    query = scores.query
+    scores.query = lambda **kwargs: pages.append(kwargs) or query(**kwargs)
+    items = dynamo_scan.query_items(scores, KeyConditionExpression=Key("userID").eq("u1"),
+                                    FilterExpression=Attr("courseID").eq("c2"), ScanIndexForward=False, Limit=6)
+    newest = [next(items)["Date"] for _ in range(4)]
+    assert newest == ["2025-01-59", "2025-01-56", "2025-01-53", "2025-01-50"]
+    assert len(pages) == 2  # 12 items evaluated for 4 matches; the rest are never read
+
+
+def test_parallel_scan_reads_each_item_once(scores):
+    dates = [item["Date"] for item in dynamo_scan.parallel_scan(scores, total_segments=4, Limit=5)]
+    assert sorted(dates) == sorted(f"2025-01-{day:02d}" for day in range(60))
+
+
+def test_parallel_scan_stops_workers_when_the_consumer_does(scores):
+    before = threading.active_count()
+    items = dynamo_scan.parallel_scan(scores, total_segments=4, max_buffered_pages=1, Limit=1)
+    next(items)
+    items.close()
+    assert threading.active_count() == before
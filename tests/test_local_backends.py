@@ -0,0 +1,119 @@
+import json
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+
+from PIL import Image  # noqa: E402
+
+import extractScores  # noqa: E402
+
+
+def _card() -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (80, 60), (230, 225, 210)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+CARD = _card()
+SCORES = {str(h): 4 for h in range(1, 19)}
+MODEL_SCORES = {str(h): 5 for h in range(1, 19)}
+
+
+class FakeBackend(extractScores.ExtractionBackend):
+    name = "fake"
+    version = "1"
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, image, first_name):
+        self.calls += 1
+        return {"scores": SCORES, "confidence": {h: 0.99 for h in SCORES}}
+
+
+@pytest.fixture
+def scan(monkeypatch):
+    """extract_scores with a dict for the scan cache, one fake local backend and no S3 or model."""
+    cache = {}
+    backend = FakeBackend()
+    model_calls = []
+
+    def call_model(prompt, url, validate=None, api_key=None, **variables):
+        model_calls.append(prompt)
+        if prompt == "card_scores":
+            return json.dumps({"players": [{"name": "Mike", "scores": MODEL_SCORES, "out": None, "in": None}]})
+        return extractScores.render_row({"scores": MODEL_SCORES})
+
+    monkeypatch.setattr(extractScores.api_cache, "lookup", lambda ns, key: cache.get(key))
+    monkeypatch.setattr(extractScores.api_cache, "store", lambda ns, key, value: cache.__setitem__(key, value))
+    monkeypatch.setattr(extractScores, "load_original_bytes", lambda url: CARD)
+    monkeypatch.setattr(extractScores, "_openai_key", lambda: "key")
+    monkeypatch.setattr(extractScores, "preprocess_image", lambda *a, **kw: ("https://stub/card.jpg", "k"))
+    monkeypatch.setattr(extractScores, "call_model", call_model)
+    monkeypatch.setattr(extractScores, "BACKENDS", {backend.name: backend})
+    monkeypatch.setattr(extractScores, "LOCAL_BACKENDS", [backend.name])
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "player")
+    return cache, backend, model_calls
+
+
+def test_local_reads_are_cached_apart_from_model_results(scan):
+    cache, backend, model_calls = scan
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "fake"
+    image_hash = extractScores.content_hash(CARD)
+    assert extractScores.scan_result_key(image_hash, "Mike") not in cache
+    assert cache[extractScores.local_result_key(image_hash, "Mike", backend)] == extractScores.render_row({"scores": SCORES})
+
+    assert extractScores.extract_scores("s3://b/card.jpg", "mike")["served_from"] == "local_cache"
+    assert backend.calls == 1 and model_calls == []
+
+
+def test_new_backend_version_misses_the_local_cache(scan):
+    cache, backend, _ = scan
+    extractScores.extract_scores("s3://b/card.jpg", "Mike")
+    backend.version = "2"
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "fake"
+    assert backend.calls == 2
+
+
+def test_cached_card_rows_win_over_the_local_backend(scan, monkeypatch):
+    cache, backend, model_calls = scan
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "card")
+    image_hash = extractScores.content_hash(CARD)
+    cache[extractScores.card_result_key(image_hash)] = json.dumps(
+        [{"name": "Mike", "scores": MODEL_SCORES, "out": None, "in": None}])
+
+    result = extractScores.extract_scores("s3://b/card.jpg", "Mike")
+    assert result["served_from"] == "card_cache"
+    assert result["message"] == extractScores.render_row({"scores": MODEL_SCORES})
+    assert backend.calls == 0 and model_calls == []
+
+
+def test_cached_model_result_wins_over_the_local_backend(scan):
+    cache, backend, _ = scan
+    image_hash = extractScores.content_hash(CARD)
+    cache[extractScores.scan_result_key(image_hash, "Mike")] = "model"
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike") == {"message": "model",
+                                                                        "served_from": "result_cache"}
+    assert backend.calls == 0
+
+
+def test_local_backend_is_tried_before_a_card_model_call(scan, monkeypatch):
+    _, backend, model_calls = scan
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "card")
+    assert extractScores.extract_scores("s3://b/card.jpg", "Mike")["served_from"] == "fake"
+    assert model_calls == []
+
+
+def test_backends_must_implement_the_interface():
+    class Incomplete(extractScores.ExtractionBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    with pytest.raises(TypeError):
+        extractScores.register_backend(object())
+    if extractScores.scorecard_local is not None:
+        assert isinstance(extractScores.BACKENDS["local-grid"], extractScores.ExtractionBackend)
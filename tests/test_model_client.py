@@ -0,0 +1,175 @@
+from collections import deque
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+import model_client  # noqa: E402
+from stub_model_server import StubModelServer  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Per-test breakers, latency windows and counters; no invocation deadline."""
+    monkeypatch.setattr(model_client, "_breakers", {})
+    monkeypatch.setattr(model_client, "_latencies", {})
+    monkeypatch.setattr(model_client, "STATS", {k: 0 for k in model_client.STATS})
+    monkeypatch.setattr(model_client, "_deadline", None)
+    monkeypatch.setattr(model_client, "RETRY_BASE_SECONDS", 0.01)
+
+
+def test_transient_errors_are_retried():
+    with StubModelServer({"m": "ok"}, errors={"m": [500, 503]}) as server:
+        response = model_client.create("m", MESSAGES, client=server.client())
+    assert response.choices[0].message.content == "ok"
+    assert model_client.STATS["retries"] == 2
+
+
+def test_slow_attempt_is_hedged(monkeypatch):
+    monkeypatch.setattr(model_client, "HEDGE", True)
+    model_client._latencies["h"] = deque([0.01] * model_client.HEDGE_MIN_SAMPLES, maxlen=model_client.HEDGE_WINDOW)
+    with StubModelServer({"h": "ok"}, latency={"h": [1.0, 0.01]}) as server:
+        response = model_client.create("h", MESSAGES, client=server.client())
+    assert response.choices[0].message.content == "ok"
+    assert model_client.STATS["hedged"] == 1 and model_client.STATS["hedge_wins"] == 1
+
+
+def test_breaker_opens_and_fails_fast():
+    with StubModelServer({"down": "ok"}, errors={"down": [500] * 100}) as server:
+        for _ in range(model_client.BREAKER_FAILURES):
+            with pytest.raises((model_client.ModelUnavailable, openai.InternalServerError)):
+                model_client.create("down", MESSAGES, client=server.client())
+        requests = len(server.requests)
+        with pytest.raises(model_client.ModelUnavailable):
+            model_client.create("down", MESSAGES, client=server.client())
+        assert len(server.requests) == requests
+    assert model_client.get_stats()["breakers"]["down"] == "open"
+
+
+def test_no_attempt_without_time_left(monkeypatch):
+    monkeypatch.setattr(model_client, "_deadline", model_client.time.time() + 0.5)
+    with StubModelServer({"m": "ok"}) as server:
+        with pytest.raises(model_client.ModelUnavailable):
+            model_client.create("m", MESSAGES, client=server.client())
+        assert server.requests == []
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """A fresh in-process governor with a tiny budget for model "g"."""
+    import rate_governor
+
+    governor = rate_governor.Governor(rate_governor.MemoryCounterStore(), budgets={"g": {"rpm": 1, "tpm": 100000}})
+    monkeypatch.setattr(rate_governor, "_governor", governor)
+    return governor
+
+
+def test_timeout_is_judged_after_waiting_for_a_permit(governor, monkeypatch):
+    monkeypatch.setattr(model_client, "_deadline", model_client.time.time() + 5)
+    released = []
+
+    def slow_acquire(model, lane, tokens, max_wait=None):
+        assert max_wait is not None and max_wait <= 5 - model_client.MIN_ATTEMPT_SECONDS
+        monkeypatch.setattr(model_client, "_deadline", model_client.time.time() + 0.5)  # the wait used it up
+        return ("g|0", tokens)
+
+    monkeypatch.setattr(governor, "acquire", slow_acquire)
+    monkeypatch.setattr(governor, "release", released.append)
+    with StubModelServer({"g": "ok"}) as server:
+        with pytest.raises(model_client.ModelUnavailable):
+            model_client.create("g", MESSAGES, client=server.client(), lane="scan")
+        assert server.requests == []
+    assert len(released) == 1 and model_client.STATS["deadline_exceeded"] == 1
+
+
+def test_hedge_needs_its_own_permit(governor, monkeypatch):
+    monkeypatch.setattr(model_client, "HEDGE", True)
+    model_client._latencies["g"] = deque([0.01] * model_client.HEDGE_MIN_SAMPLES, maxlen=model_client.HEDGE_WINDOW)
+    with StubModelServer({"g": "ok"}, latency={"g": [0.3, 0.01]}) as server:
+        response = model_client.create("g", MESSAGES, client=server.client(), lane="scan")
+        assert response.choices[0].message.content == "ok"
+        assert len(server.requests) == 1
+    assert model_client.STATS["hedges_shed"] == 1 and model_client.STATS["hedged"] == 0
+    assert governor.get_stats()["scan"]["admitted"] == 1
+
+
+def test_hedge_with_a_permit_is_counted_and_settled(governor, monkeypatch):
+    governor.budgets = {"g": {"rpm": 10, "tpm": 100000}}
+    monkeypatch.setattr(model_client, "HEDGE", True)
+    model_client._latencies["g"] = deque([0.01] * model_client.HEDGE_MIN_SAMPLES, maxlen=model_client.HEDGE_WINDOW)
+    with StubModelServer({"g": "ok"}, latency={"g": [0.5, 0.01]}) as server:
+        model_client.create("g", MESSAGES, client=server.client(), lane="scan")
+        model_client.time.sleep(0.6)  # let the losing first request finish
+    assert model_client.STATS["hedge_wins"] == 1
+    assert governor.get_stats()["scan"]["admitted"] == 2
+    assert governor.usage("g")["requests"] == 2
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """Model "g"'s breaker, opened by one failure and due a trial."""
+    breaker = model_client.CircuitBreaker(failures=1, open_seconds=60)
+    breaker.failure()
+    breaker._opened_at -= 60
+    model_client._breakers["g"] = breaker
+    return breaker
+
+
+def assert_next_call_is_the_trial(breaker):
+    with StubModelServer({"g": "ok"}) as server:
+        assert model_client.create("g", MESSAGES, client=server.client()).choices[0].message.content == "ok"
+    assert breaker.state == "closed"
+
+
+def test_shed_trial_is_released(half_open, governor, monkeypatch):
+    def shed(model, lane, tokens, max_wait=None):
+        raise model_client.rate_governor.Shed(lane, model, 30)
+
+    monkeypatch.setattr(governor, "acquire", shed)
+    with pytest.raises(model_client.rate_governor.Shed):
+        model_client.create("g", MESSAGES, lane="scan")
+    assert half_open.state == "open"
+    assert_next_call_is_the_trial(half_open)
+
+
+def test_trial_out_of_time_is_released(half_open, monkeypatch):
+    monkeypatch.setattr(model_client, "_deadline", model_client.time.time() + 0.5)
+    with pytest.raises(model_client.ModelUnavailable):
+        model_client.create("g", MESSAGES)
+    assert half_open.state == "open"
+    monkeypatch.setattr(model_client, "_deadline", None)
+    assert_next_call_is_the_trial(half_open)
+
+
+def test_rejected_trial_is_released(half_open):
+    with StubModelServer({"g": "ok"}, errors={"g": [400]}) as server:
+        with pytest.raises(openai.BadRequestError):
+            model_client.create("g", MESSAGES, client=server.client())
+    assert half_open.state == "open"
+    assert_next_call_is_the_trial(half_open)
+
+
+def test_trial_that_never_reports_back_is_replaced(half_open, monkeypatch):
+    assert half_open.allow() and half_open.state == "half_open"
+    assert not half_open.allow()
+    monkeypatch.setattr(half_open, "_trial_at", half_open._trial_at - half_open.open_seconds)
+    assert_next_call_is_the_trial(half_open)
+
+
+def test_rate_limits_do_not_open_the_breaker():
+    with StubModelServer({"m": "ok"}, errors={"m": [429] * 100}) as server:
+        for _ in range(model_client.BREAKER_FAILURES + 1):
+            with pytest.raises(openai.RateLimitError):
+                model_client.create("m", MESSAGES, client=server.client())
+        assert len(server.requests) == (model_client.BREAKER_FAILURES + 1) * model_client.MAX_ATTEMPTS
+    assert model_client.get_stats()["breakers"]["m"] == "closed"
+
+
+def test_rate_limited_trial_is_released(half_open):
+    with StubModelServer({"g": "ok"}, errors={"g": [429] * model_client.MAX_ATTEMPTS}) as server:
+        with pytest.raises(openai.RateLimitError):
+            model_client.create("g", MESSAGES, client=server.client())
+    assert half_open.state == "open"
+    assert_next_call_is_the_trial(half_open)
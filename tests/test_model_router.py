@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+pytest.importorskip("openai")
+
+import model_router  # noqa: E402
+from stub_model_server import StubModelServer  # noqa: E402
+
+
+def is_json(text):
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+def test_invalid_answer_escalates_to_the_next_model():
+    cheap, large = model_router.models_for("extract")[0], model_router.models_for("extract")[-1]
+    with StubModelServer({cheap: "not json", large: '{"ok": true}'}) as server:
+        messages = [{"role": "user", "content": "hi"}]
+        assert model_router.complete("extract", messages, is_json, client=server.client()) == ('{"ok": true}', large)
+        assert model_router.complete("extract", messages, client=server.client())[1] == cheap
+    routes = model_router.get_stats()["routes"]
+    assert routes["extract"]["escalated"] >= 1
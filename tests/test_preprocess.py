@@ -0,0 +1,196 @@
+import base64
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+from PIL import Image, ImageDraw  # noqa: E402
+
+import extractScores  # noqa: E402
+
+
+def photo(size=(600, 800), fmt="JPEG") -> bytes:
+    """A small portrait 'photo' of a grid with some dark strokes."""
+    image = Image.new("RGB", size, (230, 225, 210))
+    draw = ImageDraw.Draw(image)
+    for x in range(0, size[0], 40):
+        draw.line([(x, 0), (x, size[1])], fill=(60, 60, 60), width=3)
+    for y in range(0, size[1], 50):
+        draw.line([(0, y), (size[0], y)], fill=(60, 60, 60), width=3)
+    draw.text((100, 120), "4 5 3 4", fill=(20, 20, 20))
+    buf = BytesIO()
+    image.save(buf, fmt, **({"quality": 92} if fmt == "JPEG" else {}))
+    return buf.getvalue()
+
+
+@pytest.fixture
+def small_target(monkeypatch):
+    monkeypatch.setattr(extractScores, "TARGET_LONG_EDGE", 256)
+
+
+def run(raw, mode):
+    image = extractScores.decode_image(raw, mode)
+    image = extractScores.enhance_image(image, mode)
+    return image, extractScores.encode_image(image, mode)
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "PNG"])
+def test_resized_mode_downsizes_and_turns_portrait_to_landscape(small_target, fmt):
+    image, _ = run(photo(fmt=fmt), "resized")
+    assert image.mode == "L"
+    assert image.size == (256, 192)
+
+
+def test_png_mode_keeps_full_resolution(small_target):
+    image, (buf, info) = run(photo(), "png")
+    assert image.size == (800, 600)
+    assert info["content_type"] == "image/png" and buf.getvalue()[:8] == b"\x89PNG\r\n\x1a\n"
+
+
+def test_small_images_are_not_upscaled(monkeypatch):
+    monkeypatch.setattr(extractScores, "TARGET_LONG_EDGE", 4096)
+    image, _ = run(photo(), "resized")
+    assert image.size == (800, 600)
+
+
+@pytest.mark.parametrize("fmt, content_type, magic", [
+    ("JPEG", "image/jpeg", b"\xff\xd8"),
+    ("WEBP", "image/webp", b"RIFF"),
+])
+def test_lossy_formats(small_target, monkeypatch, fmt, content_type, magic):
+    monkeypatch.setattr(extractScores, "OUTPUT_FORMAT", fmt)
+    _, (buf, info) = run(photo(), "resized")
+    assert info["content_type"] == content_type and buf.getvalue().startswith(magic)
+
+
+def test_preprocess_reports_bytes_and_time_per_stage(small_target, monkeypatch):
+    monkeypatch.setattr(extractScores, "PREPROCESS_MODE", "resized")
+    stats = {}
+    url, key = extractScores.preprocess_image("inline-test", "Mike", stats=stats, raw=photo(), transport="inline")
+    assert key is None and url.startswith("data:image/jpeg;base64,")
+    encoded = base64.b64decode(url.split(",", 1)[1])
+    assert Image.open(BytesIO(encoded)).size == (256, 192)
+    assert stats["transport"] == "inline"
+    assert {"hash", "decode", "enhance", "encode", "inline"} <= set(stats["ms"])
+    assert stats["bytes"]["encode"] == len(encoded)
+
+
+def test_resized_mode_decodes_jpeg_at_the_smallest_sufficient_dct_scale(small_target):
+    # 1/8 would give 150x200, under the 256 target; 1/4 is the smallest that reaches it
+    image = extractScores.decode_image(photo(size=(1200, 1600)), "resized")
+    assert image.mode == "L" and image.size == (300, 400)
+    assert extractScores.decode_image(photo(size=(1200, 1600)), "png").size == (1200, 1600)
+
+
+def endless(chunks_read, size=1024):
+    while True:
+        chunks_read.append(size)
+        yield b"\0" * size
+
+
+class Body:
+    def __init__(self, chunks_read):
+        self.chunks_read = chunks_read
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        return endless(self.chunks_read)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("content_length", [0, 10 ** 9])
+def test_oversize_s3_original_is_rejected_without_reading_it(monkeypatch, content_length):
+    monkeypatch.setattr(extractScores, "MAX_ORIGINAL_BYTES", 4096)
+    chunks_read = []
+    body = Body(chunks_read)
+    s3 = SimpleNamespace(get_object=lambda **kw: {"ContentLength": content_length, "Body": body})
+    monkeypatch.setattr(extractScores.aws_clients, "s3", lambda: s3)
+
+    with pytest.raises(Exception, match="4096"):
+        extractScores.load_original_bytes("https://b.s3.us-east-2.amazonaws.com/card.jpg")
+    # Declared too large: closed unread. Undeclared: stops one chunk past the limit.
+    assert len(chunks_read) == (0 if content_length else 5)
+    assert body.closed == bool(content_length)
+
+
+def test_oversize_https_original_is_rejected_without_reading_it(monkeypatch):
+    monkeypatch.setattr(extractScores, "MAX_ORIGINAL_BYTES", 4096)
+    chunks_read = []
+
+    class Response:
+        status_code = 200
+        headers = {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def iter_content(self, chunk_size):
+            return endless(chunks_read)
+
+    monkeypatch.setattr(extractScores._HTTP, "get", lambda url, **kw: Response())
+    with pytest.raises(Exception, match="4096"):
+        extractScores.load_original_bytes("https://example.com/card.jpg")
+    assert len(chunks_read) == 5
+
+
+@pytest.fixture
+def scorecards_bucket(aws, small_target, monkeypatch):
+    import aws_clients
+
+    monkeypatch.setattr(extractScores, "PREPROCESS_MODE", "resized")
+    monkeypatch.setattr(extractScores, "SCAN_CACHE_STATS", {"artifact_hits": 0, "artifact_misses": 0})
+    aws_clients.s3().create_bucket(Bucket=extractScores.BUCKET,
+                                   CreateBucketConfiguration={"LocationConstraint": extractScores.REGION})
+    return aws_clients.s3()
+
+
+def stored_keys(s3):
+    return [o["Key"] for o in s3.list_objects_v2(Bucket=extractScores.BUCKET).get("Contents", [])]
+
+
+def encoded_size():
+    _, (buf, _) = run(photo(), "resized")
+    return buf.getbuffer().nbytes
+
+
+def test_inline_transport_sends_a_data_url_without_touching_s3(scorecards_bucket):
+    stats = {}
+    url, key = extractScores.preprocess_image("u", "Mike", stats=stats, raw=photo(), transport="inline")
+    assert url.startswith("data:image/jpeg;base64,") and key is None
+    assert stats["transport"] == "inline" and "upload" not in stats["ms"] and "lookup" not in stats["ms"]
+    assert stored_keys(scorecards_bucket) == []
+
+
+@pytest.mark.parametrize("slack, transport", [(0, "inline"), (-1, "url")])
+def test_inline_threshold_is_inclusive(scorecards_bucket, monkeypatch, slack, transport):
+    monkeypatch.setattr(extractScores, "INLINE_MAX_BYTES", encoded_size() + slack)
+    stats = {}
+    extractScores.preprocess_image("u", "Mike", stats=stats, raw=photo(), transport="inline")
+    assert stats["transport"] == transport
+
+
+def test_oversize_inline_image_falls_back_to_a_presigned_url(scorecards_bucket, monkeypatch):
+    monkeypatch.setattr(extractScores, "INLINE_MAX_BYTES", 0)
+    stats = {}
+    url, key = extractScores.preprocess_image("u", "Mike", stats=stats, raw=photo(), transport="inline")
+    assert url.startswith("https://") and "X-Amz-Signature" in url and key in url
+    assert stored_keys(scorecards_bucket) == [key]
+    assert stats["transport"] == "url" and {"upload", "presign"} <= set(stats["ms"])
+    # The fallback doesn't HEAD for a reusable artifact; only url transport does
+    assert extractScores.SCAN_CACHE_STATS == {"artifact_hits": 0, "artifact_misses": 0}
+
+
+def test_url_transport_reuses_the_uploaded_artifact(scorecards_bucket):
+    raw = photo()
+    _, first = extractScores.preprocess_image("u", "Mike", raw=raw, transport="url")
+    stats = {}
+    _, second = extractScores.preprocess_image("u", "Sarah", stats=stats, raw=raw, transport="url")
+    assert first == second and "upload" not in stats["ms"]
+    assert extractScores.SCAN_CACHE_STATS == {"artifact_hits": 1, "artifact_misses": 1}
@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+from PIL import Image  # noqa: E402
+
+import extractScores  # noqa: E402
+
+
+def scan(size, seed):
+    """Grey 'photo': smooth lighting, hard-edged strokes and noise, so both filters have work to do."""
+    rng = np.random.default_rng(seed)
+    h, w = size
+    yy, xx = np.mgrid[0:h, 0:w]
+    a = 120 + 80 * (xx / w) - 40 * (yy / h) + rng.normal(0, 12, size)
+    a[(xx // 9) % 5 == 0] -= 90
+    a[(yy // 7) % 6 == 0] += 60
+    return Image.fromarray(np.clip(a, 0, 255).astype(np.uint8), "L")
+
+
+@pytest.mark.parametrize("size", [(300, 200), (200, 300), (3, 3), (2, 7), (1, 1)])
+@pytest.mark.parametrize("seed", range(3))
+def test_fused_pipeline_matches_pillow_within_one_grey_level(size, seed):
+    image = scan(size, seed)
+    expected = np.asarray(extractScores.enhance_image(image, "png"), dtype=np.int16)
+    actual = np.asarray(extractScores.enhance_image_numpy(image, "png"), dtype=np.int16)
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() <= 1
+
+
+def test_fused_pipeline_converts_colour_input():
+    rgb = Image.merge("RGB", [scan((120, 90), 0)] * 3)
+    expected = np.asarray(extractScores.enhance_image(rgb, "png"), dtype=np.int16)
+    actual = np.asarray(extractScores.enhance_image_numpy(rgb, "png"), dtype=np.int16)
+    assert np.abs(actual - expected).max() <= 1
+
+
+def test_fused_pipeline_downsizes_like_pillow(monkeypatch):
+    monkeypatch.setattr(extractScores, "TARGET_LONG_EDGE", 128)
+    image = scan((400, 300), 1)
+    assert extractScores.enhance_image_numpy(image, "resized").size == \
+        extractScores.enhance_image(image, "resized").size == (128, 96)
+
+
+@pytest.mark.parametrize("strip_rows", [1, 2, 7])
+def test_strip_boundaries_do_not_show(monkeypatch, strip_rows):
+    monkeypatch.setattr(extractScores, "_STRIP_ROWS", strip_rows)
+    image = scan((50, 40), 2)
+    expected = np.asarray(extractScores.enhance_image(image, "png"), dtype=np.int16)
+    actual = np.asarray(extractScores.enhance_image_numpy(image, "png"), dtype=np.int16)
+    assert np.abs(actual - expected).max() <= 1
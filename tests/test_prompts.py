@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+import prompts
+
+URL = "https://stub/card.jpg"
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(prompts, "STATS", {})
+
+
+def usage(prompt_tokens, cached_tokens=None, completion_tokens=5):
+    details = None if cached_tokens is None else SimpleNamespace(cached_tokens=cached_tokens)
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           prompt_tokens_details=details)
+
+
+def test_player_prompts_share_prefix_and_image_byte_for_byte():
+    mike, sarah = (prompts.vision_messages("player_scores", URL, first_name=name) for name in ("Mike", "Sarah"))
+    assert mike[0]["content"][:2] == sarah[0]["content"][:2]
+    assert mike[0]["content"][0]["text"].encode() == prompts.get("player_scores").prefix.encode()
+    assert mike[0]["content"][1] == {"type": "image_url", "image_url": {"url": URL}}
+    assert [part["text"] for part in (mike[0]["content"][2], sarah[0]["content"][2])] == \
+        ["Player name: Mike", "Player name: Sarah"]
+
+
+def test_per_call_values_only_appear_in_the_tail():
+    template = prompts.get("coaching")
+    text = template.render(pars="{}", round_count=7, scores="[]")
+    assert text.startswith(template.prefix) and "7 rounds" in text[len(template.prefix):]
+    assert "{" not in template.prefix
+
+
+def test_a_template_without_tail_sends_no_tail_part():
+    messages = prompts.vision_messages("card_scores", URL)
+    assert [part["type"] for part in messages[0]["content"]] == ["text", "image_url"]
+
+
+def test_record_usage_counts_cached_tokens_per_version():
+    prompts.record_usage("player_scores", usage(2000, cached_tokens=1536))
+    prompts.record_usage("player_scores", usage(2000, cached_tokens=0))
+    prompts.record_usage("player_scores", usage(1000))  # no prompt_tokens_details
+    prompts.record_usage("card_scores", usage(1800, cached_tokens=1024))
+
+    stats = prompts.get_stats()
+    assert stats[f"player_scores@{prompts.version('player_scores')}"] == {
+        "calls": 3, "prompt_tokens": 5000, "cached_tokens": 1536, "completion_tokens": 15, "cached_ratio": 0.307,
+    }
+    assert stats[f"card_scores@{prompts.version('card_scores')}"]["cached_ratio"] == 0.569
+
+
+def test_cached_ratio_is_none_without_prompt_tokens():
+    prompts.record_usage("card_scores", None)
+    assert prompts.get_stats()[f"card_scores@{prompts.version('card_scores')}"] == {
+        "calls": 1, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cached_ratio": None,
+    }
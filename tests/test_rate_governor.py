@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("botocore")
+
+import rate_governor  # noqa: E402
+
+BUDGET = {"m": {"rpm": 20, "tpm": 10000}}
+
+
+@pytest.fixture(autouse=True)
+def one_minute():
+    """Keep each test inside one budget minute."""
+    left = 60 - time.time() % 60
+    if left < 3:
+        time.sleep(left + 0.1)
+
+
+@pytest.fixture
+def table(aws):
+    import aws_clients
+
+    aws_clients.resource("dynamodb").create_table(
+        TableName=rate_governor.RATE_TABLE_NAME,
+        KeySchema=[{"AttributeName": "bucket", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "bucket", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return rate_governor.RATE_TABLE_NAME
+
+
+def admit_all(governors, lane="scan", tokens=100, per_governor=30):
+    """Each governor tries per_governor acquisitions on its own thread; admitted count per governor."""
+    admitted = [0] * len(governors)
+
+    def run(i):
+        for _ in range(per_governor):
+            try:
+                governors[i].acquire("m", lane, tokens, max_wait=0)
+                admitted[i] += 1
+            except rate_governor.Shed:
+                pass
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(governors))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return admitted
+
+
+def test_store_kinds():
+    assert isinstance(rate_governor.make_store("dynamodb"), rate_governor.DynamoCounterStore)
+    with pytest.raises(ValueError):
+        rate_governor.make_store("redis")
+
+
+def test_governors_sharing_a_memory_store_split_one_budget():
+    store = rate_governor.MemoryCounterStore()
+    a, b = (rate_governor.Governor(store, BUDGET) for _ in range(2))
+    for _ in range(10):
+        a.acquire("m", "scan", 100)
+        b.acquire("m", "scan", 100)
+    for governor in (a, b):
+        with pytest.raises(rate_governor.Shed):
+            governor.acquire("m", "scan", 100, max_wait=0)
+    assert a.usage("m")["requests"] == b.usage("m")["requests"] == 20
+
+
+def test_governors_sharing_the_dynamodb_table_split_one_budget(table):
+    # Two containers: separate governors and store objects over one table. Calls
+    # take turns; moto doesn't serialise concurrent conditional writes as DynamoDB does.
+    a, b = (rate_governor.Governor(rate_governor.DynamoCounterStore(table), BUDGET) for _ in range(2))
+    for _ in range(10):
+        a.acquire("m", "scan", 100)
+        b.acquire("m", "scan", 100)
+    for governor in (a, b):
+        with pytest.raises(rate_governor.Shed):
+            governor.acquire("m", "scan", 100, max_wait=0)
+    assert a.usage("m") == dict(BUDGET["m"], requests=20, tokens=2000)
+
+
+def test_concurrent_admissions_never_overfill_the_bucket():
+    store = rate_governor.MemoryCounterStore()
+    assert sum(admit_all([rate_governor.Governor(store, BUDGET) for _ in range(4)])) == 20
+
+
+def test_separate_stores_do_not_share_a_budget():
+    a, b = (rate_governor.Governor(rate_governor.MemoryCounterStore(), BUDGET) for _ in range(2))
+    assert admit_all([a, b]) == [20, 20]
+
+
+def test_token_budget_and_lane_share(table):
+    governor = rate_governor.Governor(rate_governor.DynamoCounterStore(table), {"m": {"rpm": 1000, "tpm": 1000}})
+    # Coaching may fill 60% of the minute's tokens
+    assert admit_all([governor], lane="coaching", tokens=100) == [6]
+    assert admit_all([governor], lane="scan", tokens=100) == [4]
+
+
+def test_settle_and_release_correct_the_bucket(table):
+    governor = rate_governor.Governor(rate_governor.DynamoCounterStore(table), BUDGET)
+    ticket = governor.acquire("m", "scan", 500)
+    governor.settle(ticket, 200)
+    assert governor.usage("m")["tokens"] == 200
+    governor.release(governor.acquire("m", "scan", 300))
+    assert governor.usage("m")["requests"] == 1 and governor.usage("m")["tokens"] == 200
+
+
+def test_unreachable_store_fails_open(aws):
+    governor = rate_governor.Governor(rate_governor.DynamoCounterStore("missing"), BUDGET)
+    governor.acquire("m", "scan", 100)
+    assert governor.get_stats()["scan"]["store_errors"] == 1
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("openai")
+
+import extractScores  # noqa: E402
+import scan_jobs  # noqa: E402
+
+BUCKET = "sg-scorecards"
+
+
+def api_event(method, sub=None, params=None, body=None):
+    event = {"httpMethod": method, "headers": {"origin": extractScores.ALLOWED_ORIGINS[0]},
+             "queryStringParameters": params, "requestContext": {}}
+    if sub:
+        event["requestContext"] = {"authorizer": {"claims": {"sub": sub}}}
+    if body is not None:
+        event["body"] = json.dumps(body)
+    return event
+
+
+def fake_run(payload, stages):
+    return {"status": "success", "message": {"1": 4}, "servedFrom": "model", "firstName": payload.get("firstName")}
+
+
+@pytest.fixture
+def memory_store(monkeypatch):
+    """Async jobs on the in-process pool, as in a local run (SG_SCAN_JOBS_LOCAL_WORKERS=1)."""
+    monkeypatch.setattr(scan_jobs, "_store", scan_jobs.MemoryJobStore())
+    monkeypatch.setattr(scan_jobs, "QUEUE_URL", None)
+    monkeypatch.setattr(scan_jobs, "ASYNC_ENABLED", True)
+    monkeypatch.setattr(extractScores, "run_scan_job", fake_run)
+
+
+@pytest.fixture
+def dynamo_store(aws, monkeypatch):
+    import aws_clients
+
+    aws_clients.resource("dynamodb").create_table(
+        TableName=scan_jobs.JOBS_TABLE_NAME,
+        KeySchema=[{"AttributeName": "jobId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "jobId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    monkeypatch.setattr(scan_jobs, "_store", scan_jobs.DynamoJobStore(scan_jobs.JOBS_TABLE_NAME))
+    monkeypatch.setattr(extractScores, "SPECULATION_ENABLED", True)
+    monkeypatch.setattr(extractScores, "run_scan_job", fake_run)
+
+
+def test_get_job_with_owner_hides_other_callers_jobs(memory_store):
+    job_id = scan_jobs.submit({"fileUrl": "u"}, fake_run, owner="alice")
+    assert scan_jobs.get_job(job_id, 5, owner="alice")["status"] == "succeeded"
+    assert scan_jobs.get_job(job_id, owner="bob") is None
+    assert "owner" not in scan_jobs.get_job(job_id)
+
+
+def test_job_status_is_scoped_to_the_submitting_user(memory_store):
+    queued = extractScores.lambda_handler(api_event("POST", "alice", body={"fileUrl": "u", "async": True}), None)
+    job_id = json.loads(queued["body"])["jobId"]
+
+    own = extractScores.lambda_handler(api_event("GET", "alice", {"jobId": job_id, "wait": "5"}), None)
+    assert own["statusCode"] == 200 and json.loads(own["body"])["result"]["message"] == {"1": 4}
+    other = extractScores.lambda_handler(api_event("GET", "bob", {"jobId": job_id}), None)
+    assert other["statusCode"] == 404
+    anonymous = extractScores.lambda_handler(api_event("GET", None, {"jobId": job_id}), None)
+    assert anonymous["statusCode"] == 401
+
+
+def test_async_scan_needs_a_caller(memory_store):
+    response = extractScores.lambda_handler(api_event("POST", body={"fileUrl": "u", "async": True}), None)
+    assert response["statusCode"] == 401
+
+
+def test_upload_job_ids_cannot_be_read_by_guessing_them(dynamo_store):
+    job_id = scan_jobs.upload_job_id(BUCKET, "scorecards/card.jpg")
+    assert scan_jobs.run_inline(job_id, {"fileUrl": "u", "firstName": "Mike"}, fake_run)
+    response = extractScores.lambda_handler(api_event("GET", "mallory", {"jobId": job_id}), None)
+    assert response["statusCode"] == 404
+
+
+def test_speculation_is_off_with_the_memory_store(memory_store, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(extractScores, "SPECULATION_ENABLED", False)
+    monkeypatch.setattr(extractScores.logger, "warning", warnings.append)
+    event = scan_jobs.s3_put_event(BUCKET, "scorecards/player=Mike/card.jpg")
+    assert extractScores.handle_upload_event(event) == {"speculated": 0}
+    assert "SG_SCAN_JOBS_STORE=dynamodb" in warnings[0]
+    url = f"https://{BUCKET}.s3.us-east-2.amazonaws.com/scorecards/player=Mike/card.jpg"
+    assert extractScores.attach_speculative(url, "Mike") is None
+
+
+def test_speculation_attaches_through_the_shared_store(dynamo_store, monkeypatch):
+    import aws_clients
+
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "player")
+    aws_clients.s3().create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    key = "scorecards/card.jpg"
+    aws_clients.s3().put_object(Bucket=BUCKET, Key=key, Body=b"jpeg", Metadata={"firstname": "Mike"})
+
+    assert extractScores.handle_upload_event(scan_jobs.s3_put_event(BUCKET, key)) == {"speculated": 1}
+    url = f"https://{BUCKET}.s3.{extractScores.REGION}.amazonaws.com/{key}"
+    assert extractScores.attach_speculative(url, "Mike")["message"] == {"1": 4}
+    assert extractScores.attach_speculative(url, "Sarah") is None
+
+
+def test_async_request_is_served_synchronously_without_a_queue(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(scan_jobs, "_store", scan_jobs.MemoryJobStore())
+    monkeypatch.setattr(scan_jobs, "ASYNC_ENABLED", False)
+    monkeypatch.setattr(extractScores, "SPECULATION_ENABLED", False)
+    monkeypatch.setattr(extractScores, "extract_scores", lambda url, name: {"message": "scores",
+                                                                          "served_from": "player_model"})
+    monkeypatch.setattr(extractScores.logger, "warning", warnings.append)
+
+    response = extractScores.lambda_handler(api_event("POST", "alice", body={"fileUrl": "u", "async": True}), None)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"status": "success", "message": "scores"}
+    assert "no job queue" in warnings[0]
+    with pytest.raises(RuntimeError):
+        scan_jobs.submit({"fileUrl": "u"}, fake_run, owner="alice")
+
+
+def test_queued_job_runs_in_the_sqs_invocation(dynamo_store, monkeypatch):
+    import aws_clients
+
+    queue_url = aws_clients.sqs().create_queue(QueueName="sg-scan-jobs")["QueueUrl"]
+    monkeypatch.setattr(scan_jobs, "QUEUE_URL", queue_url)
+    monkeypatch.setattr(scan_jobs, "ASYNC_ENABLED", True)
+
+    queued = extractScores.lambda_handler(api_event("POST", "alice", body={"fileUrl": "u", "async": True}), None)
+    assert queued["statusCode"] == 202
+    job_id = json.loads(queued["body"])["jobId"]
+    assert scan_jobs.get_job(job_id, owner="alice")["status"] == "queued"
+
+    messages = aws_clients.sqs().receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)["Messages"]
+    records = [{"eventSource": "aws:sqs", "messageId": m["MessageId"], "body": m["Body"]} for m in messages]
+    assert extractScores.lambda_handler({"Records": records}, None) == {"batchItemFailures": []}
+
+    done = extractScores.lambda_handler(api_event("GET", "alice", {"jobId": job_id}), None)
+    assert json.loads(done["body"])["status"] == "succeeded"
@@ -0,0 +1,111 @@
+import os
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+import scorecard_local  # noqa: E402
+
+HOLE_NUMBERS = list(range(1, 19))
+PAR = [4, 4, 3, 5, 4, 4, 3, 4, 5, 4, 4, 3, 5, 4, 4, 3, 4, 5]
+MIKE = [4, 5, 3, 6, 4, 4, 5, 3, 7, 5, 4, 4, 3, 6, 5, 4, 4, 5]
+SARAH = [4, 4, 3, 5, 5, 4, 3, 4, 5, 4, 3, 3, 5, 4, 4, 4, 4, 5]  # only 3s, 4s and 5s
+
+
+def row(holes, out=None, in_=None, totals=True):
+    """Cells after the name column: holes 1-9, OUT, holes 10-18, IN."""
+    if totals:
+        out = sum(holes[:9]) if out is None else out
+        in_ = sum(holes[9:]) if in_ is None else in_
+    return holes[:9] + [out if totals else None] + holes[9:] + [in_ if totals else None]
+
+
+def card(*rows, cell=40, name_width=160, height=44) -> Image.Image:
+    """A clean printed grid: a wide name column, then 20 narrow columns, digits in the default font."""
+    xs = [0, name_width] + [name_width + cell * i for i in range(1, 21)]
+    image = Image.new("L", (xs[-1] + 2, len(rows) * height + 2), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=28)
+    for x in xs:
+        draw.line([(x, 0), (x, image.height - 1)], fill=0, width=2)
+    for r in range(len(rows) + 1):
+        draw.line([(0, r * height), (image.width - 1, r * height)], fill=0, width=2)
+    for r, values in enumerate(rows):
+        for c, value in enumerate(values):
+            if value is not None:
+                text = str(value)
+                draw.text((xs[c + 1] + (cell - draw.textlength(text, font=font)) / 2, r * height + 6),
+                          text, fill=0, font=font)
+    return image
+
+
+def scores(values):
+    return {str(h): v for h, v in enumerate(values, start=1)}
+
+
+@pytest.fixture(scope="module")
+def backend():
+    return scorecard_local.LocalGridBackend(scorecard_local.DigitClassifier.from_font())
+
+
+def test_reads_the_only_player_row(backend):
+    result = backend.extract(card(row(HOLE_NUMBERS, totals=False), row(MIKE)), "Mike")
+    assert result["scores"] == scores(MIKE)
+    assert min(result["confidence"].values()) >= scorecard_local.CONFIDENCE_THRESHOLD
+
+
+def test_refuses_a_card_with_two_player_rows(backend):
+    # Sarah's row is all 3s, 4s and 5s; it must not be mistaken for par and Mike's row returned for her
+    image = card(row(HOLE_NUMBERS, totals=False), row(MIKE), row(SARAH))
+    assert backend.extract(image, "Sarah") is None
+    assert backend.extract(image, "Mike") is None
+
+
+@pytest.mark.parametrize("rows", [
+    [row(HOLE_NUMBERS, totals=False), row(PAR), row(MIKE)],
+    [row(HOLE_NUMBERS, totals=False), row(SARAH)],
+])
+def test_refuses_a_row_that_could_be_par(backend, rows):
+    assert backend.extract(card(*rows), "Sarah") is None
+
+
+def test_refuses_a_row_failing_the_out_check(backend):
+    assert backend.extract(card(row(HOLE_NUMBERS, totals=False), row(MIKE, out=40)), "Mike") is None
+
+
+def test_reference_rows():
+    assert scorecard_local.is_reference_row(scores(HOLE_NUMBERS))
+    assert scorecard_local.is_reference_row(scores([380] * 18))
+    assert not scorecard_local.is_reference_row(scores(PAR))
+    assert scorecard_local.could_be_par(scores(SARAH)) and not scorecard_local.could_be_par(scores(MIKE))
+
+
+def test_extract_scores_serves_the_real_backend(backend, monkeypatch):
+    pytest.importorskip("openai")
+    import extractScores
+
+    buf = BytesIO()
+    card(row(HOLE_NUMBERS, totals=False), row(MIKE)).save(buf, "PNG")
+    cache = {}
+    monkeypatch.setattr(extractScores.api_cache, "lookup", lambda ns, key: cache.get(key))
+    monkeypatch.setattr(extractScores.api_cache, "store", lambda ns, key, value: cache.__setitem__(key, value))
+    monkeypatch.setattr(extractScores, "load_original_bytes", lambda url: buf.getvalue())
+    monkeypatch.setattr(extractScores, "_openai_key", lambda: "key")
+    monkeypatch.setattr(extractScores, "call_model", lambda *a, **kw: pytest.fail("asked the model"))
+    monkeypatch.setattr(extractScores, "BACKENDS", {backend.name: backend})
+    monkeypatch.setattr(extractScores, "LOCAL_BACKENDS", [backend.name])
+    monkeypatch.setattr(extractScores, "EXTRACTION_MODE", "player")
+
+    result = extractScores.extract_scores("s3://b/card.png", "Mike")
+    assert result == {"message": extractScores.render_row({"scores": scores(MIKE)}), "served_from": "local-grid"}
+
+
+def test_local_backends_are_off_by_default():
+    pytest.importorskip("openai")
+    import extractScores
+
+    if "EXTRACTION_BACKENDS" not in os.environ:
+        assert extractScores.LOCAL_BACKENDS == []
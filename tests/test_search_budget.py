@@ -0,0 +1,122 @@
+import http.server
+import importlib.machinery
+import importlib.util
+import json
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+import aws_clients  # noqa: E402
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+BUDGET_MS = 300
+
+
+class SlowCourseApi:
+    """Local golfcourseapi stand-in; every `slow_every`-th search sleeps `slow_seconds` before answering."""
+
+    def __init__(self, slow_every: int, slow_seconds: float):
+        self.calls = 0
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.calls += 1
+                if api.calls % slow_every == 0:
+                    time.sleep(slow_seconds)
+                body = json.dumps({"courses": [
+                    {"id": 7, "club_name": "Pebble Beach Golf Links", "location": {"city": "Pebble Beach", "state": "CA"}},
+                ]}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up on us
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+@pytest.fixture
+def search(aws, monkeypatch):
+    """searchGolfCourses with a local sg_courses table, no search index and api_cache passed through."""
+    loader = importlib.machinery.SourceFileLoader("searchGolfCourses", os.path.join(SRC, "searchGolfCourses"))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+
+    aws_clients.dynamodb().create_table(
+        TableName="sg_courses",
+        KeySchema=[{"AttributeName": "courseID", "KeyType": "HASH"}, {"AttributeName": "courseName", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "courseID", "AttributeType": "S"},
+                              {"AttributeName": "courseName", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table = aws_clients.table("sg_courses")
+    table.put_item(Item={"courseID": "c1", "courseName": "Pebble Creek", "externalCourseID": "99",
+                         "course_data": {"course": {"club_name": "Pebble Creek", "location": {"city": "Taylors", "state": "SC"}}}})
+    monkeypatch.setattr(module, "courses_table", table)
+    monkeypatch.setattr(module, "SEARCH_BUDGET_MS", BUDGET_MS)
+    monkeypatch.setattr(module.secrets_cache, "get_secret_value", lambda name, key: "test-key")
+    monkeypatch.setattr(module.api_cache, "get_or_fetch", lambda namespace, key, fetch: fetch())
+    return module
+
+
+def get(module, query):
+    event = {"requestContext": {"authorizer": {"claims": {"sub": "u1"}}},
+             "queryStringParameters": {"search_query": query}}
+    t0 = time.perf_counter()
+    resp = module.searchCourseByName(event, "http://localhost:3000", Context())
+    return time.perf_counter() - t0, resp["statusCode"], json.loads(resp["body"])
+
+
+def test_fast_external_api_gives_complete_results(search, monkeypatch):
+    with SlowCourseApi(slow_every=10 ** 9, slow_seconds=0) as api:
+        monkeypatch.setattr(search, "GOLFCOURSEAPI_URL", api.url)
+        _, code, body = get(search, "pebble")
+    assert code == 200 and body["partial"] is False
+    assert {c["source"] for c in body["courses"]} == {"local", "external"}
+
+
+def test_slow_external_api_returns_local_results_as_partial(search, monkeypatch):
+    with SlowCourseApi(slow_every=1, slow_seconds=2) as api:
+        monkeypatch.setattr(search, "GOLFCOURSEAPI_URL", api.url)
+        elapsed, code, body = get(search, "pebble")
+    assert code == 200 and body["partial"] is True
+    assert [c["club_name"] for c in body["courses"]] == ["Pebble Creek"]
+    assert elapsed < BUDGET_MS / 1000 + 0.2
+
+
+def test_p99_is_bounded_by_the_budget(search, monkeypatch):
+    # One search in four hangs for 1.5 s, far past the 300 ms budget. Timed-out
+    # calls keep running in the external pool while later requests arrive.
+    with SlowCourseApi(slow_every=4, slow_seconds=1.5) as api:
+        monkeypatch.setattr(search, "GOLFCOURSEAPI_URL", api.url)
+        results = [get(search, "pebble") for _ in range(40)]
+
+    latencies = sorted(elapsed for elapsed, _, _ in results)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < BUDGET_MS / 1000 + 0.2, latencies
+    assert all(code == 200 for _, code, _ in results)
+    assert sum(body["partial"] for _, _, body in results) == 10
+    # Local results come back on every request, partial or not
+    assert all(any(c["source"] == "local" for c in body["courses"]) for _, _, body in results)
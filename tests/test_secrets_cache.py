@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+import secrets_cache  # noqa: E402
+
+
+class FakeSecretsManager:
+    """Local stand-in for the Secrets Manager client: counts calls, optional latency."""
+
+    def __init__(self, secrets, delay=0.0):
+        self.secrets = secrets
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_secret_value(self, SecretId):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"SecretString": json.dumps(self.secrets[SecretId])}
+
+
+@pytest.fixture
+def fake_sm(monkeypatch):
+    sm = FakeSecretsManager({"openAI_API2": {"openAI_API2": "sk-1"}}, delay=0.05)
+    monkeypatch.setattr(secrets_cache.aws_clients, "secretsmanager", lambda: sm)
+    secrets_cache.invalidate()
+    for k in secrets_cache.STATS:
+        secrets_cache.STATS[k] = 0
+    return sm
+
+
+def test_second_read_is_served_from_cache(fake_sm):
+    assert secrets_cache.get_secret_value("openAI_API2", "openAI_API2") == "sk-1"
+    assert secrets_cache.get_secret_value("openAI_API2", "openAI_API2") == "sk-1"
+    assert fake_sm.calls == 1
+    assert secrets_cache.get_stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_fetch(fake_sm):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(secrets_cache.get_secret_dict("openAI_API2")))
+               for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fake_sm.calls == 1
+    assert len(results) == 16
+
+
+def test_expired_entry_is_refetched(fake_sm, monkeypatch):
+    secrets_cache.get_secret_dict("openAI_API2")
+    fake_sm.secrets["openAI_API2"] = {"openAI_API2": "sk-2"}
+    secret, fetched_at = secrets_cache._CACHE["openAI_API2"]
+    secrets_cache._CACHE["openAI_API2"] = (secret, fetched_at - secrets_cache._TTL_SECONDS - 1)
+    assert secrets_cache.get_secret_value("openAI_API2", "openAI_API2") == "sk-2"
+    assert fake_sm.calls == 2
+
+
+def test_refresh_ahead_serves_cached_value_and_refreshes_in_background(fake_sm):
+    secrets_cache.get_secret_dict("openAI_API2")
+    fake_sm.secrets["openAI_API2"] = {"openAI_API2": "sk-2"}
+    secret, fetched_at = secrets_cache._CACHE["openAI_API2"]
+    secrets_cache._CACHE["openAI_API2"] = (secret, fetched_at - secrets_cache._TTL_SECONDS + 60)
+    # Inside the refresh-ahead window: old value now, new value once the refresh lands
+    assert secrets_cache.get_secret_value("openAI_API2", "openAI_API2") == "sk-1"
+    deadline = time.time() + 2
+    while secrets_cache.get_secret_value("openAI_API2", "openAI_API2") != "sk-2" and time.time() < deadline:
+        time.sleep(0.01)
+    assert secrets_cache.get_secret_value("openAI_API2", "openAI_API2") == "sk-2"
+    assert fake_sm.calls == 2
+
+
+def test_auth_error_invalidates(fake_sm):
+    secrets_cache.get_secret_dict("openAI_API2")
+
+    class Unauthorized(Exception):
+        status_code = 401
+
+    assert not secrets_cache.invalidate_on_auth_error("openAI_API2", ValueError("boom"))
+    assert "openAI_API2" in secrets_cache._CACHE
+    assert secrets_cache.invalidate_on_auth_error("openAI_API2", Unauthorized())
+    assert "openAI_API2" not in secrets_cache._CACHE
+    secrets_cache.get_secret_dict("openAI_API2")
+    assert fake_sm.calls == 2
@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stage_graph import StageGraph
+
+
+def sleeper(ms, result=None):
+    def fn(*args):
+        time.sleep(ms / 1000)
+        return result
+    return fn
+
+
+def test_stages_start_after_their_dependencies_and_independent_ones_overlap():
+    graph = StageGraph()
+    graph.add("secret", sleeper(100, "key"))
+    graph.add("download", sleeper(50, b"raw"))
+    graph.add("hash", lambda raw: raw.upper(), deps=("download",))
+    graph.add("model", lambda key, digest: (key, digest), deps=("secret", "hash"))
+
+    assert graph.result("model") == ("key", b"RAW")
+    t = graph.timings()
+    assert list(t)[2:] == ["hash", "model"]
+    assert t["hash"]["start_ms"] >= t["download"]["end_ms"]
+    assert t["model"]["start_ms"] >= max(t["secret"]["end_ms"], t["hash"]["end_ms"])
+    # secret and download ran side by side
+    assert t["download"]["start_ms"] < t["secret"]["end_ms"]
+
+
+def test_a_failed_dependency_fails_its_dependants_without_running_them():
+    ran = []
+    graph = StageGraph()
+    graph.add("download", lambda: 1 / 0)
+    graph.add("hash", lambda raw: ran.append("hash"), deps=("download",))
+    graph.add("lookup", lambda digest: ran.append("lookup"), deps=("hash",))
+    graph.add("secret", lambda: "key")
+
+    for stage in ("download", "hash", "lookup"):
+        with pytest.raises(ZeroDivisionError):
+            graph.result(stage, timeout=1)
+    assert graph.result("secret") == "key"
+    assert ran == []
+    # Only stages that ran are timed; the failed one is
+    assert set(graph.timings()) == {"download", "secret"}
+
+
+def test_timings_cover_finished_stages_only():
+    release = threading.Event()
+    graph = StageGraph()
+    graph.add("quick", sleeper(20))
+    graph.add("slow", lambda: release.wait(5))
+    graph.result("quick")
+    t = graph.timings()
+    assert set(t) == {"quick"}
+    assert t["quick"]["ms"] >= 15 and t["quick"]["end_ms"] >= t["quick"]["start_ms"] + 15
+    release.set()
+    graph.result("slow")
+    assert set(graph.timings()) == {"quick", "slow"}
+
+
+def test_a_chain_longer_than_the_pool_does_not_deadlock():
+    graph = StageGraph(ThreadPoolExecutor(max_workers=1))
+    graph.add("s0", lambda: 0)
+    for i in range(1, 20):
+        graph.add(f"s{i}", lambda prev: prev + 1, deps=(f"s{i - 1}",))
+    assert graph.result("s19", timeout=5) == 19
@@ -0,0 +1,119 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import tracing
+from stage_graph import StageGraph
+
+CONTEXT = SimpleNamespace(function_name="extractScores", aws_request_id="req-1")
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", True)
+
+
+def emitted(capsys) -> list:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_traced_handler_flushes_its_spans_as_emf(enabled, capsys):
+    @tracing.traced
+    def handler(event, context):
+        with tracing.span("secret") as s:
+            s.set(bytes=12)
+        tracing.record("llm", 812.345, model="gpt", prompt_tokens=900, cached_tokens=None)
+        return "ok"
+
+    assert handler({}, CONTEXT) == "ok"
+    lines = emitted(capsys)
+    assert [line["Span"] for line in lines] == ["secret", "llm", "handler"]
+    assert {line["Service"] for line in lines} == {"extractScores"}
+    assert {line["RequestId"] for line in lines} == {"req-1"}
+    llm = lines[1]
+    assert llm["DurationMs"] == 812.3 and llm["PromptTokens"] == 900 and llm["model"] == "gpt"
+    assert "CachedTokens" not in llm
+    assert lines[0]["Bytes"] == 12
+
+
+def test_span_records_the_error_and_reraises(enabled, capsys):
+    @tracing.traced
+    def handler(event, context):
+        with tracing.span("download"):
+            raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        handler({}, CONTEXT)
+    assert [(line["Span"], line["error"]) for line in emitted(capsys)] == [("download", "KeyError"),
+                                                                           ("handler", "KeyError")]
+
+
+def test_emf_line():
+    line = json.loads(tracing.emf_line("svc", "preprocess", {"ms": 5.0, "bytes": 2048, "transport": "inline"},
+                                       timestamp_ms=1700000000000, request_id="r"))
+    cw = line["_aws"]["CloudWatchMetrics"][0]
+    assert line["_aws"]["Timestamp"] == 1700000000000
+    assert cw["Namespace"] == tracing.NAMESPACE and cw["Dimensions"] == [["Service", "Span"]]
+    assert cw["Metrics"] == [{"Name": "DurationMs", "Unit": "Milliseconds"}, {"Name": "Bytes", "Unit": "Bytes"}]
+    assert (line["Service"], line["Span"], line["RequestId"]) == ("svc", "preprocess", "r")
+    assert (line["DurationMs"], line["Bytes"], line["transport"]) == (5.0, 2048, "inline")
+
+
+def test_disabled_tracing_is_a_no_op(monkeypatch, capsys):
+    monkeypatch.setattr(tracing, "ENABLED", False)
+
+    def handler(event, context):
+        with tracing.span("secret") as s:
+            s.set(bytes=1)
+        tracing.record("llm", 1.0)
+        tracing.flush()
+        return "ok"
+
+    assert tracing.traced(handler) is handler
+    assert tracing.span("secret") is tracing._NOOP
+    assert handler({}, CONTEXT) == "ok"
+    assert capsys.readouterr().out == ""
+
+
+def test_stage_graph_and_pool_spans_join_the_invocation(enabled, capsys):
+    @tracing.traced
+    def handler(event, context):
+        graph = StageGraph()
+        graph.add("secret", lambda: tracing.record("secret", 1.0))
+        graph.add("model", lambda _: tracing.record("model", 2.0), deps=("secret",))
+        graph.result("model")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            tracing.run_in_context(pool, tracing.record, "sqs_record", 3.0).result()
+            pool.submit(tracing.record, "untraced", 4.0).result()
+
+    handler({}, CONTEXT)
+    assert [line["Span"] for line in emitted(capsys)] == ["secret", "model", "sqs_record", "handler"]
+
+
+def test_late_worker_spans_do_not_leak_into_the_next_invocation(enabled, capsys):
+    release, finished = threading.Event(), threading.Event()
+
+    def slow_secret():
+        release.wait(5)
+        tracing.record("secret", 1.0)
+        finished.set()
+
+    @tracing.traced
+    def first(event, context):
+        # A cache hit returns without waiting for the secret stage
+        StageGraph().add("secret", slow_secret)
+
+    @tracing.traced
+    def second(event, context):
+        release.set()
+        finished.wait(5)
+        tracing.record("lookup", 1.0)
+
+    first({}, CONTEXT)
+    second({}, SimpleNamespace(function_name="extractScores", aws_request_id="req-2"))
+    lines = emitted(capsys)
+    assert [(line["Span"], line["RequestId"]) for line in lines] == [("handler", "req-1"), ("lookup", "req-2"),
+                                                                     ("handler", "req-2")]